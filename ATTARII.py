@@ -1,24 +1,137 @@
 from config import parse_args
-from dataextractiontools import amazon_tabular_info_scraper, amazon_textual_info_scraper
+from dataextractiontools.metrics import get_metrics, start_metrics_exporters
+from dataextractiontools.output_sinks import close_output_sinks
 
 
 def main():
     """
     Main function for scraping textual and tabular information from an Amazon product page.
-    This function parses command-line arguments, determines the type of information to extract (tabular or textual),
+    This function parses command-line arguments, determines the type of information to extract (tabular, textual or all),
     and initiates the appropriate scraping process based on the provided URL and arguments.
+    When a file of URLs or ASINs is provided, all the listed pages are scraped in batch mode, either by a pool of
+    webdrivers, by the asyncio crawler, by the incremental re-crawl or by a memory-bounded worker. With --from-store, the extractors are replayed over the stored pages.
+    The products of the file can be expanded into their pages on several marketplaces and into their variants, all
+    scraped by one asyncio crawl. The pages can also be enqueued in a work queue shared by the workers of a distributed crawl.
+    The timers of the scraping stages and the counters of the scrapers are exported if requested.
     """
 
     args = parse_args()
+    start_metrics_exporters(args)
+
+    try:
+        run(args)
+    finally:
+        if args.metrics_log_interval > 0:
+            # the sinks are closed first, so the stats include the dump of the last records
+            close_output_sinks()
+            print(f'stats:\n{get_metrics().format_stats()}')
+
+
+def run(args):
+    """runs the scraping mode requested in args
+
+    Parameters
+    ----------
+    args : namedtuple
+        the namespace variable that contains the config for the scraper
+    """
+
+    # the module of each scraping mode, and the selenium, requests and BeautifulSoup backends behind it, are only
+    # imported when the mode is requested
+    if args.enqueue_enabled:
+        from dataextractiontools.work_queue import create_work_queue, get_current_epoch
+        from dataextractiontools.utils import read_URL_file
+        from dataextractiontools.worker import iter_stdin_URLs
+
+        from dataextractiontools.crawl_planner import create_crawl_planner
+
+        epoch = get_current_epoch() if args.crawl_epoch is None else args.crawl_epoch
+        URLs = read_URL_file(args.URL_file) if args.URL_file else iter_stdin_URLs()
+        crawl_planner = create_crawl_planner(args)
+        if crawl_planner is not None:
+            # the variants are only discovered by the crawls downloading the pages
+            URLs = crawl_planner.plan(URLs)
+        work_queue = create_work_queue(args)
+        num_tasks = work_queue.enqueue(URLs, epoch)
+        print(f'enqueued {num_tasks} pages for the fetch epoch {epoch}')
+        work_queue.close()
+        return
+
+    if args.distributed_worker_enabled:
+        from dataextractiontools.distributed_crawler import DistributedWorker
+
+        DistributedWorker(args).run()
+        return
+
+    if args.worker_enabled:
+        from dataextractiontools.utils import read_URL_file
+        from dataextractiontools.worker import MemoryBoundedWorker, iter_stdin_URLs
+
+        MemoryBoundedWorker(args).run(read_URL_file(args.URL_file) if args.URL_file else iter_stdin_URLs())
+        return
+
+    if args.from_store and not args.URL_file:
+        from dataextractiontools.page_store import get_page_store
+
+        URLs = get_page_store(args).get_URLs()
+        if args.async_crawl_enabled:
+            from dataextractiontools.async_crawler import AsyncCrawler
+
+            AsyncCrawler(args).run(URLs)
+        else:
+            from dataextractiontools.batch_scraper import BatchScraper
+
+            BatchScraper(args).run(URLs)
+        return
+
+    if args.URL_file and args.incremental_enabled:
+        from dataextractiontools.incremental_crawler import IncrementalCrawler
+        from dataextractiontools.utils import read_URL_file
+
+        IncrementalCrawler(args).run(read_URL_file(args.URL_file))
+        return
+
+    if args.URL_file and (args.marketplaces is not None or args.variants_enabled):
+        from dataextractiontools.async_crawler import AsyncCrawler
+        from dataextractiontools.crawl_planner import create_crawl_planner
+        from dataextractiontools.utils import read_URL_file
+
+        crawl_planner = create_crawl_planner(args)
+        URLs = crawl_planner.plan(read_URL_file(args.URL_file))
+        AsyncCrawler(args, page_handler=crawl_planner.discover).run(URLs)
+        crawl_planner.report()
+        return
+
+    if args.URL_file and args.async_crawl_enabled:
+        from dataextractiontools.async_crawler import AsyncCrawler
+        from dataextractiontools.utils import read_URL_file
+
+        AsyncCrawler(args).run(read_URL_file(args.URL_file))
+        return
+
+    if args.URL_file:
+        from dataextractiontools.batch_scraper import BatchScraper
+
+        BatchScraper(args).run()
+        return
 
     if args.info_type == "tabular":
-        tabular_info_extraction = amazon_tabular_info_scraper.AmazonTabularInfoExtraction(args)
+        from dataextractiontools.amazon_tabular_info_scraper import AmazonTabularInfoExtraction
+
+        tabular_info_extraction = AmazonTabularInfoExtraction(args)
         tabular_info_extraction.extract(args.URL)
 
     if args.info_type == "textual":
-        textual_info_extraction = amazon_textual_info_scraper.AmazonTextualInfoExtraction(args)
+        from dataextractiontools.amazon_textual_info_scraper import AmazonTextualInfoExtraction
+
+        textual_info_extraction = AmazonTextualInfoExtraction(args)
         textual_info_extraction.extract(args.URL)
 
+    if args.info_type == "all":
+        from dataextractiontools.amazon_product_info_scraper import AmazonProductInfoExtraction
+
+        product_info_extraction = AmazonProductInfoExtraction(args)
+        product_info_extraction.extract(args.URL)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,16 +1,72 @@
 import argparse
 
 
-def parse_args():
+def parse_args(argv=None):
     parser = argparse.ArgumentParser()
     add_arg = parser.add_argument
     add_arg("--URL", default="https://www.amazon.com/dp/B08KHR6B3W/", help="URL of the Amazon product web page")
-    add_arg("--info-type", default="tabular", choices=["tabular","textual"], help="specify the type of information for extraction by ATTARII", type=str)
+    add_arg("--URL-file", help="scrape a batch of Amazon product web pages listed in a file of URLs or ASINs, one per line", type=str)
+    add_arg("--num-drivers", default=4, help="the number of long-lived headless webdrivers used in batch mode", type=int)
+    add_arg("--driver-max-pages", default=100, help="the number of pages a webdriver serves before it is recycled in batch mode", type=int)
+    add_arg("--browser-profile", default="scrape", choices=["scrape","default"], help="scrape blocks the images, media, fonts, stylesheets and third-party domains in the webdrivers and stops loading the pages once the product info exists, default loads the pages as a regular browser", type=str)
+    add_arg("--browser-allowed-domains", default=None, help="the comma-separated domains the scrape profile loads resources from, the domains of all the Amazon marketplaces and the CDNs if not given, an empty string does not filter any domain", type=str)
+    add_arg("--browser-container-timeout", default=10, help="the maximum time in seconds the scrape profile waits for the product info after the DOM is parsed", type=float)
+    add_arg("--checkpoint-enabled", action="store_true", help="record the pages done, failed and skipped of the batch in a journal, running the batch again resumes it")
+    add_arg("--checkpoint-path", default="batch_checkpoint.tsv", help="the checkpoint journal of the batch, one per batch job", type=str)
+    add_arg("--checkpoint-max-attempts", default=3, help="the number of runs a page of the batch fails before it is skipped, the failed pages are retried by the next runs", type=int)
+    add_arg("--checkpoint-compact-interval", default=100000, help="the number of outdated lines of the checkpoint journal after which it is compacted", type=int)
+    add_arg("--marketplaces", default=None, help="expand each product of --URL-file into its pages on these comma-separated marketplaces, e.g. com,co.uk,de,co.jp, the pages are scraped by the asyncio crawler", type=str)
+    add_arg("--marketplace-URL-template", default="https://www.amazon.{marketplace}/dp/{asin}/", help="the template of the URL of a product page on a marketplace", type=str)
+    add_arg("--variants-enabled", action="store_true", help="add the variants listed on the scraped pages, e.g. the other colors and sizes of the products, to the batch scraped by the asyncio crawler")
+    add_arg("--max-variants-per-page", default=100, help="the maximum number of variants added to the batch per scraped page, 0 does not limit them", type=int)
+    add_arg("--async-crawl-enabled", action="store_true", help="scrape the batch with the asyncio crawler and the http backend instead of the pool of webdrivers")
+    add_arg("--max-concurrency", default=16, help="the maximum number of pages downloaded at the same time by the asyncio crawler", type=int)
+    add_arg("--per-host-concurrency", default=4, help="the maximum number of pages downloaded at the same time from the same host by the asyncio crawler", type=int)
+    add_arg("--rate-limit", default=0, help="the maximum number of requests per second sent by the asyncio crawler, 0 disables the limit", type=float)
+    add_arg("--max-retries", default=3, help="the number of times the asyncio crawler downloads a page again after a 503 or a captcha page", type=int)
+    add_arg("--retry-backoff", default=1.0, help="the base delay in seconds of the jittered exponential backoff between the retries", type=float)
+    add_arg("--parse-backend", default="thread", choices=["thread","process"], help="parse the pages in the downloading threads, or in a pool of worker processes to use all the cores", type=str)
+    add_arg("--parse-workers", default=0, help="the number of workers parsing the pages, 0 uses the number of CPUs", type=int)
+    add_arg("--parse-queue-size", default=64, help="the maximum number of downloaded pages waiting for the worker processes", type=int)
+    add_arg("--stats-interval", default=10, help="the interval in seconds between two reports of the crawl statistics, 0 disables them", type=float)
+    add_arg("--fetch-backend", default="http", choices=["http","selenium"], help="the backend used to download the pages, http only downloads the server-rendered HTML", type=str)
+    add_arg("--selenium-fallback-disabled", action="store_true", help="do not download a page again with Selenium when the http backend returns a page with no product info")
+    add_arg("--http-pool-size", default=10, help="the number of keep-alive connections pooled per host by the http backend", type=int)
+    add_arg("--http-timeout", default=30, help="the timeout of a request of the http backend in seconds", type=float)
+    add_arg("--store-pages-enabled", action="store_true", help="persist the downloaded pages in the page store")
+    add_arg("--from-store", action="store_true", help="replay the extractors over the pages of the page store instead of downloading them")
+    add_arg("--page-store-path", default="page_store", help="the directory of the page store", type=str)
+    add_arg("--store-codec", default="gzip", choices=["gzip","zstd"], help="the compression of the stored pages, zstd requires the zstandard package", type=str)
+    add_arg("--store-ttl-days", default=30, help="the number of days a page is kept in the page store, 0 keeps the pages forever", type=float)
+    add_arg("--store-max-pages-per-asin", default=3, help="the number of fetches of the same ASIN kept in the page store, 0 keeps all of them", type=int)
+    add_arg("--store-max-size-mb", default=0, help="the maximum size of the page store in megabytes, 0 does not limit the size", type=float)
+    add_arg("--store-evict-interval", default=1000, help="the number of pages stored between two evictions of the page store, 0 only evicts when the store is opened", type=int)
+    add_arg("--worker-enabled", action="store_true", help="scrape the pages of --URL-file, or the URLs or ASINs read from the standard input, in a long-running worker recycled when it exceeds its memory budget")
+    add_arg("--max-rss-mb", default=1024, help="the RSS budget of the worker process in megabytes", type=float)
+    add_arg("--worker-page-timeout", default=120, help="the time in seconds after which a page hanging the worker is failed and the worker is replaced", type=float)
+    add_arg("--incremental-enabled", action="store_true", help="re-crawl the batch incrementally, only emitting the products whose extracted info changed since the previous run")
+    add_arg("--crawl-state-path", default="crawl_state.jsonl", help="the file of the per-ASIN validators, fingerprints and volatility of the incremental re-crawl", type=str)
+    add_arg("--recrawl-max-pages", default=0, help="the number of pages re-crawled per incremental run, the most stale and volatile first, 0 re-crawls all of them", type=int)
+    add_arg("--enqueue-enabled", action="store_true", help="add the pages of --URL-file, or the URLs or ASINs read from the standard input, to the work queue of the distributed crawl for the fetch epoch, then exit")
+    add_arg("--distributed-worker-enabled", action="store_true", help="scrape the pages of the work queue of the distributed crawl until it is empty, several workers can share the queue")
+    add_arg("--queue-path", default="crawl_queue.sqlite", help="the SQLite database of the work queue and the deduplicated results of the distributed crawl", type=str)
+    add_arg("--crawl-epoch", default=None, help="the fetch epoch of the distributed crawl, the results are deduplicated by ASIN and epoch, the current UTC day if not given", type=int)
+    add_arg("--lease-timeout", default=300, help="the time in seconds after which a page leased by a crashed or hanging worker is leased again", type=float)
+    add_arg("--queue-max-attempts", default=3, help="the number of times a page of the work queue is leased before it is failed for good", type=int)
+    add_arg("--queue-wait", default=0, help="the time in seconds a distributed worker waits for new pages once the work queue is empty", type=float)
+    add_arg("--soup-parser", default="partial", choices=["partial","full"], help="partial only materializes the containers read by the extractors as BeautifulSoup objects, full the whole page", type=str)
+    add_arg("--info-type", default="tabular", choices=["tabular","textual","all"], help="specify the type of information for extraction by ATTARII, all fetches and parses each page once for both", type=str)
     add_arg("--verbosity-enabled", action="store_true", help="display the extracted info")
-    add_arg("--dump-info-enabled", action="store_true", help="dump the extracted info as a json file")
+    add_arg("--dump-info-enabled", action="store_true", help="stream the extracted info to an output file, one record per product")
     add_arg("--dump-info-path", help="take the directory to dump the extracted info", default="extracted_info", type=str)
+    add_arg("--output-format", default="jsonl", choices=["jsonl","parquet","sqlite"], help="the format of the output file, parquet requires the pyarrow package, sqlite is an indexed database of the products and of their attributes and ranks", type=str)
+    add_arg("--fsync-interval", default=5, help="the interval in seconds between two syncs of the jsonl output file to disk", type=float)
+    add_arg("--metrics-port", default=0, help="serve the timers of the scraping stages and the counters of the scrapers in the Prometheus text format on this port, 0 disables the endpoint", type=int)
+    add_arg("--metrics-log-interval", default=0, help="the interval in seconds between two stats logs of the timers and the counters, 0 disables the stats log", type=float)
+    add_arg("--sqlite-batch-size", default=1000, help="the number of records inserted per transaction into the sqlite output database", type=int)
+    add_arg("--parquet-row-group-size", default=1000, help="the number of records per row group of the parquet output file", type=int)
 
-    return parser.parse_args()
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,159 @@
+import json
+
+from dataextractiontools.amazon_tabular_info_scraper import AmazonTabularInfoExtraction
+from dataextractiontools.amazon_textual_info_scraper import AmazonTextualInfoExtraction
+from dataextractiontools.output_sinks import OUTPUT_NAMES, get_output_sink, make_record
+from dataextractiontools.page_acquisition import PageAcquisition
+from dataextractiontools.soup_builder import release_soup
+
+
+class AmazonProductInfoExtraction():
+    """A class used to download Amazon e-commerce product web pages once and extract both the tabular and the textual info
+
+    The page is downloaded and parsed once, then all the extractors of AmazonTabularInfoExtraction and
+    AmazonTextualInfoExtraction run on the same BeautifulSoup object, and their outputs are merged into one record.
+
+    ...
+
+    Attributes
+    ----------
+    URL : str
+        the URL of the product web page
+    verbosity_enabled : bool
+        display the extracted info
+    dump_info_enabled : bool
+        dump the extracted info to the output file
+    dump_info_path : str
+        the directory to dump the extracted info
+    page_acquisition : PageAcquisition
+        downloads the product web pages and parses them
+    tabular_info_extraction : AmazonTabularInfoExtraction
+        the extractor of the tabular info
+    textual_info_extraction : AmazonTextualInfoExtraction
+        the extractor of the textual info
+    soup_obj : BeautifulSoup
+        an instance of BeautifulSoup using the page_content
+    product_info_dict : dict
+        a dictionary containing both the tabular and the textual info extracted from the Amazon product web page
+    output_name : str
+        the name of the file in which the product_info_dict is streamed, one record per product (default ./extracted_info/product_info.jsonl)
+
+    Methods
+    -------
+    dl_page()
+        downloads the product web pages and create a BeautifulSoup object
+    release_page()
+        frees the page source and the BeautifulSoup object shared with the extractors once the info is extracted
+    extract_product_info()
+        runs all the tabular and textual extractors on the already parsed Amazon product web page
+    dump_info_dict(info_dict)
+        streams the extracted info_dict as one record of the output file
+    extract(URL)
+        extracts both the tabular and the textual information from a Amazon product webpage using the URL of the page
+    """
+
+    def __init__(self, args, driver_pool=None):
+        """
+        Parameters
+        ----------
+        args : namedtuple
+            the namespace variable that contains the config for the scraper
+        driver_pool : WebDriverPool, optional
+            a pool of long-lived webdrivers to download the pages with, a new webdriver is started for each page if None
+        """
+
+        self.args = args
+        self.verbosity_enabled = args.verbosity_enabled
+        self.dump_info_enabled = args.dump_info_enabled
+        self.dump_info_path = args.dump_info_path
+        self.page_acquisition = PageAcquisition(args, driver_pool)
+
+        # the page is only acquired here, the extractors below are fed with the shared BeautifulSoup object
+        self.tabular_info_extraction = AmazonTabularInfoExtraction(args)
+        self.textual_info_extraction = AmazonTextualInfoExtraction(args)
+
+        self.URL = None
+        self.page_source = None
+        self.soup_obj = None
+        self.product_info_dict = dict()
+        self.output_name = OUTPUT_NAMES["all"]
+
+    def dl_page(self):
+        """downloads the product web pages and create a BeautifulSoup object
+        """
+
+        self.page_source, self.soup_obj = self.page_acquisition.acquire(self.URL)
+
+    def release_page(self):
+        """frees the page source and the BeautifulSoup object shared with the extractors once the info is extracted
+        """
+
+        release_soup(self.soup_obj)
+        self.page_source = None
+        self.soup_obj = None
+        for extraction in [self.tabular_info_extraction, self.textual_info_extraction]:
+            extraction.page_source = None
+            extraction.soup_obj = None
+
+    def extract_product_info(self):
+        """runs all the tabular and textual extractors on the already parsed Amazon product web page
+
+        Returns
+        -------
+        dict
+            the tabular and textual info merged into one record
+        """
+
+        for extraction in [self.tabular_info_extraction, self.textual_info_extraction]:
+            extraction.URL = self.URL
+            extraction.soup_obj = self.soup_obj
+
+        product_info_dict = dict()
+        product_info_dict.update(self.tabular_info_extraction.extract_tabular_info())
+        product_info_dict.update(self.textual_info_extraction.extract_textual_info())
+
+        self.product_info_dict = product_info_dict
+
+        return self.product_info_dict
+
+    def dump_info_dict(self, info_dict):
+        """streams the extracted info_dict as one record of the output file
+
+        Parameters
+        ----------
+        info_dict : dict
+            tabular and textual data extracted from the Amazon product web page in a dictionary format
+        """
+
+        get_output_sink(self.args, self.output_name).write(make_record(self.URL, info_dict))
+
+    def extract(self, URL):
+        """extracts both the tabular and the textual information from a Amazon product webpage using the URL of the page
+
+        Parameters
+        ----------
+        URL : str
+            the URL of a Amazon product web page
+
+        Returns
+        -------
+        dict
+            the extracted tabular and textual info
+        """
+
+        self.URL = URL
+        self.dl_page()
+
+        try:
+            self.extract_product_info()
+        finally:
+            self.release_page()
+
+        if self.verbosity_enabled:
+            print('product_info:')
+            print(json.dumps(self.product_info_dict, indent=4))
+
+        if self.dump_info_enabled:
+            self.dump_info_dict(self.product_info_dict)
+
+        return self.product_info_dict
@@ -1,13 +1,11 @@
-import re
-import os
 import json
-import sys
-from pathlib import Path
 
-from bs4 import BeautifulSoup
-from selenium import webdriver
-
-from dataextractiontools.utils import remove_unicode_chars
+from dataextractiontools.metrics import get_metrics
+from dataextractiontools.output_sinks import OUTPUT_NAMES, get_output_sink, make_record
+from dataextractiontools.page_acquisition import PageAcquisition
+from dataextractiontools.selector_registry import PRODUCT_DETAIL_TABLE_LAYOUTS, get_layout_rule_name, get_selector_matches
+from dataextractiontools.soup_builder import release_soup
+from dataextractiontools.utils import remove_direction_marks, remove_unicode_chars, split_best_sellers_rank
 
 
 class AmazonTabularInfoExtraction():
@@ -24,138 +22,194 @@ class AmazonTabularInfoExtraction():
     verbosity_enabled : bool
         display the extracted tabular info
     dump_info_enabled : bool
-        dump the extracted info as a json file
+        dump the extracted info to the output file
     dump_info_path : str
         the directory to dump the extracted info
+    page_acquisition : PageAcquisition
+        downloads the product web pages and parses them
     soup_obj : BeautifulSoup
         An instance of BeautifulSoup using the page_content
     product_detail_table_dict : dict
         A dictionary containing the product detail tables extracted from the Amazon product web page
+    product_detail_table_layout : str
+        the layout of the extracted product detail table, type1, type2, type3 or NA when there is none
     product_overview_table_dict : dict
         A dictionary containing the product overview tables extracted from the Amazon product web page
-    product_detail_table_write_path : os.PathLike
-        the path of json file in which the product detail tables are written (default ./extracted_info/product_detail_table.json)
-    product_overview_table_write_path : os.PathLike
-        the path of json file in which the product overview tables are written (default ./extracted_info/product_overview_table.json)
+    output_name : str
+        the name of the file in which the tabular info is streamed, one record per product (default ./extracted_info/product_tabular_info.jsonl)
 
     Methods
     -------
     dl_page()
         downloads the product web pages and create a BeautifulSoup object
+    release_page()
+        frees the page source and the BeautifulSoup object once the info is extracted
     get_product_overview_table()
         extracts the product overview tables from the Amazon product web page
+    detect_product_detail_table_layouts()
+        detects the layouts of the product detail tables present in the Amazon product web page
+    get_product_detail_table(layout)
+        extracts a layout of product detail tables from the Amazon product web page
     get_product_detail_table_all_types()
         extracts all types of product detail tables from the Amazon product web page
-    get_product_detail_table_type1()
-        extracts type1 of product detail tables from the Amazon product web page
-    get_product_details_table_type2()
-        extracts type2 of product detail tables from the Amazon product web page
-    get_product_details_table_type3()
-        extracts type3 of product detail tables from the Amazon product web page
+    parse_header_cells_table(parts)
+        parses a table of header cells and value cells, e.g. the product detail tables type1
+    parse_bullet_list_table(parts)
+        parses a list of "key: value" bullets, e.g. the product detail tables type2
+    parse_alternating_cells_table(parts)
+        parses a table whose cells alternate keys and values, e.g. the product detail tables type3
+    extract_tabular_info()
+        extracts all the tabular information from the already parsed Amazon product web page
     print_dict_indented(dict_)
         prints a dictionary in an indented format
-    create_empty_info_dict(path)
-        creates a empty json file in which our extracted tables are written in dictionary format
-    dump_info_dict_to_json(self, info_dict, path)
-        dumps the extracted info_dict into an already generated json file
+    dump_info_dict(info_dict)
+        streams the extracted info_dict as one record of the output file
     extract(URL)
         extract tabular information from a Amazon product webpage using the URL of the page
     """
 
-    def __init__(self, args):
+    # the parser of each kind of table of the layouts of the product detail tables in the selector registry
+    TABLE_PARSERS = {
+        'header_cells': 'parse_header_cells_table',
+        'bullet_list': 'parse_bullet_list_table',
+        'alternating_cells': 'parse_alternating_cells_table',
+    }
+
+    def __init__(self, args, driver_pool=None):
         """
         Parameters
         ----------
         args : namedtuple
             the namespace variable that contains the config for the scraper
+        driver_pool : WebDriverPool, optional
+            a pool of long-lived webdrivers to download the pages with, a new webdriver is started for each page if None
         """
 
+        self.args = args
         self.verbosity_enabled = args.verbosity_enabled
         self.dump_info_enabled = args.dump_info_enabled
         self.dump_info_path = args.dump_info_path
 
+        self.page_acquisition = PageAcquisition(args, driver_pool)
+
         self.URL = None
+        self.page_source = None
         self.soup_obj = None
         self.product_detail_table_dict = dict()
+        self.product_detail_table_layout = None
         self.product_overview_table_dict = dict()
-
-        path = Path()
-        self.product_detail_table_write_path = path.cwd() / self.dump_info_path / 'product_detail_table.json'
-        self.product_overview_table_write_path = path.cwd() / self.dump_info_path / 'product_overview_table.json'
+        self.output_name = OUTPUT_NAMES["tabular"]
 
     def dl_page(self):
         """downloads the product web pages and create a BeautifulSoup object
         """
 
-        driver = webdriver.Firefox()
-        driver.get(self.URL)
-        self.page_source = driver.page_source
-        self.soup_obj = BeautifulSoup(self.page_source,"lxml")
-        driver.close()
+        self.page_source, self.soup_obj = self.page_acquisition.acquire(self.URL)
+
+    def release_page(self):
+        """frees the page source and the BeautifulSoup object once the info is extracted
+        """
+
+        release_soup(self.soup_obj)
+        self.page_source = None
+        self.soup_obj = None
 
     def get_product_overview_table(self):
         """extracts the product overview tables from the Amazon product web page
         """
 
         try:
-            _product_overview_table = {}
-            my_keys = []
-            my_values = []
-            count = 0
+            matches = get_selector_matches(self.soup_obj)
+            _product_overview_table = self.parse_alternating_cells_table({'cells': matches['product_overview_table.cells']})
 
-            for item in self.soup_obj.select('div#productOverview_feature_div tr td'):
-                item = item.get_text().strip()
-                if count%2 == 0: my_keys.append(item)
-                if count%2 == 1: my_values.append(item)
-                count += 1
-
-            _product_overview_table = {my_keys[i]:my_values[i] for i in range(len(my_keys))}
-        
         except:
             _product_overview_table = {}
 
         self.product_overview_table_dict = _product_overview_table
 
-    def get_product_detail_table_all_types(self):
-        """extracts all types of product detail tables from the Amazon product web page
+    def detect_product_detail_table_layouts(self):
+        """detects the layouts of the product detail tables present in the Amazon product web page
+
+        A layout is present whenever the selector of any of its parts matches an element of the page, the selectors of
+        all the layouts being evaluated in a single traversal of the page.
+
+        Yields
+        ------
+        str
+            the layouts present in the page, in the order of priority
+        """
+
+        matches = get_selector_matches(self.soup_obj)
+        for layout, _, parts in PRODUCT_DETAIL_TABLE_LAYOUTS:
+            if any(matches.get(get_layout_rule_name(layout, part)) for part in parts):
+                yield layout
+
+    def get_product_detail_table(self, layout):
+        """extracts a layout of product detail tables from the Amazon product web page
+
+        Parameters
+        ----------
+        layout : str
+            the name of a layout of the registry
+
+        Returns
+        -------
+        dict
+            the product detail table, empty if the page does not contain the layout
         """
 
-        # type1:
-        if len(self.get_product_detail_table_type1()) > 0:
-            _product_detail_table = self.get_product_detail_table_type1()
+        matches = get_selector_matches(self.soup_obj)
+        for _layout, kind, parts in PRODUCT_DETAIL_TABLE_LAYOUTS:
+            if _layout == layout:
+                parser = getattr(self, self.TABLE_PARSERS[kind])
+                return parser({part: matches.get(get_layout_rule_name(layout, part), []) for part in parts})
 
-        # type2
-        elif len(self.get_product_details_table_type2()) > 0:
-            _product_detail_table = self.get_product_details_table_type2()
+        raise ValueError(f'unknown product detail table layout: {layout}')
+
+    def get_product_detail_table_all_types(self):
+        """extracts all types of product detail tables from the Amazon product web page
 
-        # type3
-        elif len(self.get_product_detail_table_type3()) > 0:
-            _product_detail_table = self.get_product_detail_table_type3()
+        Only the extractor of the detected layout runs, the extractor of the next detected layout only runs if it
+        finds nothing.
+        """
 
         # when there is any kind of product detail table
-        else:
-            _product_detail_table = {'NA':'NA'}
+        _product_detail_table = {'NA':'NA'}
+        self.product_detail_table_layout = 'NA'
+
+        for layout in self.detect_product_detail_table_layouts():
+            _table = self.get_product_detail_table(layout)
+            if len(_table) > 0:
+                _product_detail_table = _table
+                self.product_detail_table_layout = layout
+                break
 
         self.product_detail_table_dict = _product_detail_table
 
-    def get_product_detail_table_type1(self):
-        """extracts type1 of product detail tables from the Amazon product web page
+    @staticmethod
+    def parse_header_cells_table(parts):
+        """parses a table of header cells and value cells, e.g. the product detail tables type1
+
+        Parameters
+        ----------
+        parts : dict
+            the header cells (th tags) and the value cells (td tags) of the table
 
         Returns
         -------
         dict
-            product detail table type1
+            the product detail table
         """
 
         my_keys = [] # with th tags
         my_values = [] # with td tags
 
-        for item in self.soup_obj.select('div#prodDetails tr th'):
+        for item in parts['headers']:
             item = item.get_text().strip()
             item = remove_unicode_chars(item)
             my_keys.append(item)
 
-        for item in self.soup_obj.select('div#prodDetails tr td'):
+        for item in parts['cells']:
             item = item.get_text().strip()
             item = remove_unicode_chars(item)
             my_values.append(item)
@@ -164,41 +218,39 @@ class AmazonTabularInfoExtraction():
 
         # if there is a 'Best Sellers Rank' attribute, it processes the attribute and returns the value as a list of ranks
         if 'Best Sellers Rank' in _product_detail_table.keys():
-            Best_Sellers_Rank = [] # Best_Sellers_Rank attributes
-            subitem = _product_detail_table['Best Sellers Rank']
-            subitem = subitem.split("#")[1:]
-
-            for sub_subitem in subitem:
-                sub_subitem = re.sub('\(See .*\)','', sub_subitem).strip()
-                Best_Sellers_Rank.append("#" + sub_subitem)
-            
-            _product_detail_table['Best Sellers Rank'] = Best_Sellers_Rank
+            _product_detail_table['Best Sellers Rank'] = split_best_sellers_rank(_product_detail_table['Best Sellers Rank'])
 
         return _product_detail_table
 
-    def get_product_details_table_type2(self):
-        """extracts type2 of product detail tables from the Amazon product web page
+    @staticmethod
+    def parse_bullet_list_table(parts):
+        """parses a list of "key: value" bullets, e.g. the product detail tables type2
+
+        Parameters
+        ----------
+        parts : dict
+            the bullets (li tags) of the list, and the bullets of the list holding the Best Sellers Rank
 
         Returns
         -------
         dict
-            product detail table type2
+            the product detail table
         """
 
         _product_detail_table = {}
-        for item in self.soup_obj.select('#detailBullets_feature_div li'):
+        for item in parts['bullets']:
             item = item.select('.a-list-item')[0].get_text().strip()
             item = item.split(':')
 
             if len(item) > 1:
-                my_key = item[0].replace('\n                                    \u200f\n                                        ', '').strip()
-                my_value = item[1].replace('\n                                    \u200e\n                                 ', '').strip()
+                my_key = remove_direction_marks(item[0])
+                my_value = remove_direction_marks(item[1])
                 _product_detail_table[my_key] = my_value
 
         check_Best_Sellers_Rank = False 
         Best_Sellers_Rank = [] # Best_Sellers_Rank attributes
 
-        for item in self.soup_obj.select('.a-unordered-list.a-nostyle.a-vertical.a-spacing-none.detail-bullet-list li'):
+        for item in parts['best_sellers_rank']:
             item = item.get_text().strip()
             item = item.split(':')
 
@@ -207,24 +259,26 @@ class AmazonTabularInfoExtraction():
 
                 for subitem in item:
                     if "#" in subitem: # only if a subitem has "#" character
-                        subitem = subitem.split("#")[1:]
-                        for sub_subitem in subitem:
-                            sub_subitem = re.sub('\(See .*\)','', sub_subitem).strip()
-                            # print(sub_subitem)
-                            Best_Sellers_Rank.append("#" + sub_subitem)
+                        Best_Sellers_Rank.extend(split_best_sellers_rank(subitem))
         
         if check_Best_Sellers_Rank:
             _product_detail_table['Best_Sellers_Rank'] = Best_Sellers_Rank
 
         return _product_detail_table
 
-    def get_product_detail_table_type3(self):
-        """extracts type3 of product detail tables from the Amazon product web page
+    @staticmethod
+    def parse_alternating_cells_table(parts):
+        """parses a table whose cells alternate keys and values, e.g. the product detail tables type3
+
+        Parameters
+        ----------
+        parts : dict
+            the cells (td tags) of the table
 
         Returns
         -------
         dict
-            product detail table type3
+            the product detail table
         """
 
         _product_detail_table = {}
@@ -232,7 +286,7 @@ class AmazonTabularInfoExtraction():
         my_values = []
         count = 0
 
-        for item in self.soup_obj.select('div#tech.content-grid-alternate-styles.mako-v2 tr td'):
+        for item in parts['cells']:
             item = item.get_text().strip()
             if count%2 == 0: my_keys.append(item)
             if count%2 == 1: my_values.append(item)
@@ -242,6 +296,35 @@ class AmazonTabularInfoExtraction():
 
         return _product_detail_table
 
+    def extract_tabular_info(self):
+        """extracts all the tabular information from the already parsed Amazon product web page
+
+        Returns
+        -------
+        dict
+            the product detail table, its layout and the product overview table
+        """
+
+        metrics = get_metrics()
+
+        with metrics.timer('extract', extractor='product_detail_table'):
+            self.get_product_detail_table_all_types()
+        metrics.increment('product_detail_table_layouts', layout=self.product_detail_table_layout)
+        if self.product_detail_table_layout == 'NA':
+            # the page has no product detail table, or none of the extractors found anything in it
+            metrics.increment('product_detail_table_na_fallbacks')
+
+        with metrics.timer('extract', extractor='product_overview_table'):
+            self.get_product_overview_table()
+        if not self.product_overview_table_dict:
+            metrics.increment('empty_extractions', extractor='product_overview_table')
+
+        return {
+            'product_detail_table': self.product_detail_table_dict,
+            'product_detail_table_layout': self.product_detail_table_layout,
+            'product_overview_table': self.product_overview_table_dict,
+        }
+
     @staticmethod
     def print_dict_indented(dict_):
         """prints a dictionary in an indented format
@@ -254,34 +337,16 @@ class AmazonTabularInfoExtraction():
 
         print(json.dumps(dict_, indent=4))
 
-    @staticmethod
-    def create_empty_info_dict(path):
-        """creates a empty json file in which our extracted tables are written in dictionary format
-        
-        Parameters
-        ----------
-        path : str
-            the path of a json file in which our extracted tables are written
-        """
-
-        dict_temp = dict()
-        with path.open('w') as fh:
-            json.dump(dict_temp, fh, indent=4)
-
-    def dump_info_dict_to_json(self, info_dict, path):
-        """dumps the extracted info_dict into an already generated json file
+    def dump_info_dict(self, info_dict):
+        """streams the extracted info_dict as one record of the output file
 
         Parameters
         ----------
         info_dict : dict
             tabular data extracted from the Amazon product web page in a dictionary format
-        path : str
-            the path of a json file in which our extracted tables are written
         """
 
-        print(f'dumped in {path}.')
-        with path.open('r+') as fh:
-            json.dump(info_dict, fh, indent=4)
+        get_output_sink(self.args, self.output_name).write(make_record(self.URL, info_dict))
 
     def extract(self, URL):
         """extract tabular information from a Amazon product webpage using the URL of the page
@@ -290,28 +355,29 @@ class AmazonTabularInfoExtraction():
         ----------
         URL : str
             the URL of a Amazon product web page
+
+        Returns
+        -------
+        dict
+            the extracted tabular info
         """
 
         self.URL = URL
         self.dl_page()
 
-        self.get_product_detail_table_all_types()
+        try:
+            tabular_info_dict = self.extract_tabular_info()
+        finally:
+            self.release_page()
 
         if self.verbosity_enabled:
-            print('product_detail_table:')
+            print(f'product_detail_table ({self.product_detail_table_layout}):')
             self.print_dict_indented(self.product_detail_table_dict)
-
-        if self.dump_info_enabled:
-            self.create_empty_info_dict(self.product_detail_table_write_path)
-            self.dump_info_dict_to_json(self.product_detail_table_dict, self.product_detail_table_write_path)
-
-        self.get_product_overview_table()
-
-        if self.verbosity_enabled:
             print('\n','*'*20)
             print('product_overview_table:')
             self.print_dict_indented(self.product_overview_table_dict)
 
         if self.dump_info_enabled:
-            self.create_empty_info_dict(self.product_overview_table_write_path)
-            self.dump_info_dict_to_json(self.product_overview_table_dict, self.product_overview_table_write_path)
\ No newline at end of file
+            self.dump_info_dict(tabular_info_dict)
+
+        return tabular_info_dict
@@ -1,12 +1,10 @@
-import re
-import os
 import json
-import sys
-from pathlib import Path
-
-from bs4 import BeautifulSoup
-from selenium import webdriver
 
+from dataextractiontools.metrics import get_metrics
+from dataextractiontools.output_sinks import OUTPUT_NAMES, get_output_sink, make_record
+from dataextractiontools.page_acquisition import PageAcquisition
+from dataextractiontools.selector_registry import get_selector_matches
+from dataextractiontools.soup_builder import release_soup
 from dataextractiontools import utils
 
 
@@ -24,66 +22,82 @@ class AmazonTextualInfoExtraction():
     verbosity_enabled : bool
         display the extracted tabular info
     dump_info_enabled : bool
-        dump the extracted info as a json file
+        dump the extracted info to the output file
     dump_info_path : str
         the directory to dump the extracted info
+    page_acquisition : PageAcquisition
+        downloads the product web pages and parses them
     soup_obj : BeautifulSoup
         an instance of BeautifulSoup using the page_content
     product_textual_info_dict : dict
         a dictionary containing the product textual information extracted from the Amazon product web page
-    product_textual_info_write_path : os.PathLike
-        the path of json file in which the product_textual_info_dict is written
+    output_name : str
+        the name of the file in which the product_textual_info_dict is streamed, one record per product (default ./extracted_info/product_textual_info.jsonl)
 
 
     Methods
     -------
     dl_page()
         downloads the product web pages and create a BeautifulSoup object
+    release_page()
+        frees the page source and the BeautifulSoup object once the info is extracted
     extract_title()
         extracts the product title from the Amazon product web page
     extract_bullet_points()
         extracts the bullet points from the Amazon product web page
     extract_product_description()
         extracts the product description from the Amazon product web page
+    extract_textual_info()
+        extracts all the textual information from the already parsed Amazon product web page
+    dump_info_dict(info_dict)
+        streams the extracted info_dict as one record of the output file
     extract(URL)
         extracts the textual information from a Amazon product webpage using the URL of the page
     """
 
-    def __init__(self, args):
+    def __init__(self, args, driver_pool=None):
         """
         Parameters
         ----------
         args : namedtuple
             the namespace variable that contains the config for the scraper
+        driver_pool : WebDriverPool, optional
+            a pool of long-lived webdrivers to download the pages with, a new webdriver is started for each page if None
         """
 
+        self.args = args
         self.verbosity_enabled = args.verbosity_enabled
         self.dump_info_enabled = args.dump_info_enabled
         self.dump_info_path = args.dump_info_path
 
+        self.page_acquisition = PageAcquisition(args, driver_pool)
+
         self.URL = None
+        self.page_source = None
         self.soup_obj = None
         self.product_textual_info_dict = dict()
-
-        path = Path()
-        self.product_textual_info_write_path = path.cwd() / self.dump_info_path / 'product_textual_info.json'
+        self.output_name = OUTPUT_NAMES["textual"]
 
     def dl_page(self):
         """downloads the product web pages and create a BeautifulSoup object
         """
 
-        driver = webdriver.Firefox()
-        driver.get(self.URL)
-        self.page_source = driver.page_source
-        self.soup_obj = BeautifulSoup(self.page_source,"lxml")
-        driver.close()
+        self.page_source, self.soup_obj = self.page_acquisition.acquire(self.URL)
+
+    def release_page(self):
+        """frees the page source and the BeautifulSoup object once the info is extracted
+        """
+
+        release_soup(self.soup_obj)
+        self.page_source = None
+        self.soup_obj = None
 
     def extract_title(self):
         """extracts the product title from the Amazon product web page
         """
 
         try:
-            _title = self.soup_obj.select('div#title_feature_div')[0].getText().strip()
+            _title = get_selector_matches(self.soup_obj)['title'][0].getText().strip()
             _title = utils.remove_unicode_chars(_title)
 
         except:
@@ -97,7 +111,7 @@ class AmazonTextualInfoExtraction():
 
         try:
             _list = []  # save each bullet point as an item of _list
-            for item in self.soup_obj.select('#feature-bullets li'):
+            for item in get_selector_matches(self.soup_obj)['bullet_points']:
                 item = item.select('.a-list-item')[0].get_text().strip()
 
                 # to remove template instructions, e.g. "Make sure this fits by entering your model number.", from the extracted bullet points.
@@ -120,7 +134,7 @@ class AmazonTextualInfoExtraction():
 
         try:
             # variant 1
-            descriptions = self.soup_obj.select('#productDescription p')
+            descriptions = get_selector_matches(self.soup_obj)['product_description']
             _product_descriptions_list = []
             for description in descriptions:
                 description = description.get_text().strip()
@@ -129,7 +143,7 @@ class AmazonTextualInfoExtraction():
 
             # variant 2
             if len(_product_descriptions_list) == 0:
-                descriptions = self.soup_obj.select('#productDescription_feature_div p')
+                descriptions = get_selector_matches(self.soup_obj)['product_description.feature_div']
                 _product_descriptions_list = []
                 for description in descriptions:
                     description = description.get_text().strip()
@@ -147,6 +161,29 @@ class AmazonTextualInfoExtraction():
 
         self.product_textual_info_dict['product_description'] = _product_descriptions
 
+    def extract_textual_info(self):
+        """extracts all the textual information from the already parsed Amazon product web page
+
+        Returns
+        -------
+        dict
+            the product title, bullet points and product description
+        """
+
+        metrics = get_metrics()
+
+        for key, extractor in [
+            ('title', self.extract_title),
+            ('bullet_points', self.extract_bullet_points),
+            ('product_description', self.extract_product_description),
+        ]:
+            with metrics.timer('extract', extractor=key):
+                extractor()
+            if not any(self.product_textual_info_dict[key]):
+                metrics.increment('empty_extractions', extractor=key)
+
+        return self.product_textual_info_dict
+
     @staticmethod
     def print_dict_indented(dict_):
         """prints a dictionary in an indented format
@@ -159,34 +196,16 @@ class AmazonTextualInfoExtraction():
 
         print(json.dumps(dict_, indent=4))
 
-    @staticmethod
-    def create_empty_info_dict(path):
-        """creates a empty json file in which our extracted tables are written in dictionary format
-        
-        Parameters
-        ----------
-        path : os.PathLike
-            the path of a json file in which our extracted tables are written
-        """
-
-        dict_temp = dict()
-        with path.open('w') as fh:
-            json.dump(dict_temp, fh, indent=4)
-
-    def dump_info_dict_to_json(self, info_dict, path):
-        """dumps the extracted info_dict into an already generated json file
+    def dump_info_dict(self, info_dict):
+        """streams the extracted info_dict as one record of the output file
 
         Parameters
         ----------
         info_dict : dict
-            tabular data extracted from the Amazon product web page in a dictionary format
-        path : os.PathLike
-            the path of a json file in which our extracted tables are written
+            textual data extracted from the Amazon product web page in a dictionary format
         """
 
-        print(f'dumped in {path}.')
-        with path.open('r+') as fh:
-            json.dump(info_dict, fh, indent=4)
+        get_output_sink(self.args, self.output_name).write(make_record(self.URL, info_dict))
 
     def extract(self, URL):
         """extracts the textual information from a Amazon product webpage using the URL of the page
@@ -195,19 +214,26 @@ class AmazonTextualInfoExtraction():
         ----------
         URL : str
             the URL of a Amazon product web page
+
+        Returns
+        -------
+        dict
+            the extracted textual info
         """
 
         self.URL = URL
         self.dl_page()
 
-        self.extract_title()
-        self.extract_bullet_points()
-        self.extract_product_description()
+        try:
+            self.extract_textual_info()
+        finally:
+            self.release_page()
 
         if self.verbosity_enabled:
             print('product_detail_table:')
             self.print_dict_indented(self.product_textual_info_dict)
 
         if self.dump_info_enabled:
-            self.create_empty_info_dict(self.product_textual_info_write_path)
-            self.dump_info_dict_to_json(self.product_textual_info_dict, self.product_textual_info_write_path)
\ No newline at end of file
+            self.dump_info_dict(dict(self.product_textual_info_dict))
+
+        return dict(self.product_textual_info_dict)
\ No newline at end of file
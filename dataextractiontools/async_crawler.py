@@ -0,0 +1,383 @@
+import asyncio
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlsplit
+
+from dataextractiontools.checkpoint import create_checkpoint_journal, resume_from_checkpoint
+from dataextractiontools.fetchers import PageFetchError, is_captcha_page
+from dataextractiontools.metrics import get_metrics
+from dataextractiontools.output_sinks import OUTPUT_NAMES, close_output_sinks, get_output_sink, make_record
+from dataextractiontools.page_acquisition import PageAcquisition
+from dataextractiontools.parsing_stage import create_parse_executor, extract_info_and_metrics_from_page_source, extract_info_from_page_source
+
+
+# the HTTP status codes after which a page is downloaded again
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket():
+    """A token bucket limiting the rate of the requests sent by the crawler
+
+    ...
+
+    Attributes
+    ----------
+    rate : float
+        the number of tokens added to the bucket per second
+    capacity : float
+        the maximum number of tokens in the bucket, i.e. the size of a burst of requests
+
+    Methods
+    -------
+    acquire()
+        waits until a token is available and takes it
+    """
+
+    def __init__(self, rate, capacity):
+        """
+        Parameters
+        ----------
+        rate : float
+            the number of tokens added to the bucket per second
+        capacity : float
+            the maximum number of tokens in the bucket
+        """
+
+        self.rate = rate
+        self.capacity = capacity
+
+        self._tokens = capacity
+        self._last_refill_time = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill_time) * self.rate)
+        self._last_refill_time = now
+
+    async def acquire(self):
+        """waits until a token is available and takes it
+        """
+
+        # the lock makes the waiting requests take the tokens in order
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class AsyncCrawler():
+    """An asyncio crawl engine which drives the scrapers over a queue of Amazon product URLs
+
+    The pages are downloaded in a pool of fetch threads and parsed by the scrapers in a pool of parse workers, so the
+    event loop only schedules the requests and never blocks on the network or on BeautifulSoup. The pages are acquired
+    as in the other modes: by the fetcher of the fetch backend, or from the page store, with the Selenium fallback, and
+    stored in the page store if requested. The retries with backoff are tried before the fallback.
+
+    ...
+
+    Attributes
+    ----------
+    args : namedtuple
+        the arguments pre-defined by the user and imported from config.py
+    max_concurrency : int
+        the maximum number of pages downloaded at the same time
+    per_host_concurrency : int
+        the maximum number of pages downloaded at the same time from the same host
+    token_bucket : TokenBucket
+        limits the rate of the requests, or None if the rate is not limited
+    page_acquisition : PageAcquisition
+        downloads the pages, shared by the fetch threads
+    max_retries : int
+        the number of times a page is downloaded again after a retryable error or a captcha page, 0 when the pages
+        are replayed from the page store
+    retry_backoff : float
+        the base delay in seconds of the exponential backoff between the retries
+    stats_interval : float
+        the interval in seconds between two reports of the crawl statistics, 0 disables the reports
+    verbosity_enabled : bool
+        display the extracted info
+    dump_info_enabled : bool
+        stream the extracted info to the output file
+    result_handler : callable
+        called with the URL and the extracted info of each scraped page
+    page_handler : callable
+        called with the URL and the page source of each downloaded page, returns the URLs of new pages to add to the
+        crawl, e.g. the variants discovered by the crawl planner
+    checkpoint : CheckpointJournal
+        the journal of the pages done, failed and skipped, or None if the checkpoints are disabled
+    num_scraped_pages : int
+        the number of pages scraped successfully
+    num_retries : int
+        the number of downloads retried
+    failed_URLs : list
+        the URLs whose scraping failed
+
+    Methods
+    -------
+    fetch(URL)
+        downloads a web page, retrying with jittered exponential backoff on 503 and captcha pages
+    scrape(URL)
+        downloads a web page and runs the extractors on it in the parse workers
+    add_pages(URLs)
+        adds new pages to the queue of the crawl, e.g. the pages discovered in a downloaded page
+    report()
+        prints the throughput and the queue depth of the crawl
+    crawl(URLs)
+        scrapes all the URLs and returns when the queue is drained
+    run(URLs)
+        runs the crawl in a new event loop
+    """
+
+    def __init__(self, args, result_handler=None, parse_executor=None, page_handler=None):
+        """
+        Parameters
+        ----------
+        args : namedtuple
+            the namespace variable that contains the config for the crawler
+        result_handler : callable, optional
+            called with the URL and the extracted info of each scraped page
+        parse_executor : concurrent.futures.Executor, optional
+            the pool of workers which parse the pages, created according to the parse backend of args if None
+        page_handler : callable, optional
+            called with the URL and the page source of each downloaded page, returns the URLs of new pages to add to
+            the crawl
+        """
+
+        self.args = args
+        self.max_concurrency = args.max_concurrency
+        self.per_host_concurrency = args.per_host_concurrency
+        self.token_bucket = TokenBucket(args.rate_limit, max(1.0, args.rate_limit)) if args.rate_limit > 0 else None
+        # a page missing from the page store is not downloaded again
+        self.max_retries = 0 if args.from_store else args.max_retries
+        self.retry_backoff = args.retry_backoff
+        self.stats_interval = args.stats_interval
+        self.verbosity_enabled = args.verbosity_enabled
+        self.dump_info_enabled = args.dump_info_enabled
+        self.result_handler = result_handler
+        self.page_handler = page_handler
+        self.checkpoint = create_checkpoint_journal(args)
+
+        self.page_acquisition = PageAcquisition(args)
+        self.fetch_executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        self.parse_executor = parse_executor or create_parse_executor(args)
+
+        self.num_scraped_pages = 0
+        self.num_retries = 0
+        self.failed_URLs = []
+
+        self._queue = None
+        self._num_in_flight = 0
+        self._host_semaphores = dict()
+        self._start_time = None
+
+    def _get_host_semaphore(self, URL):
+        host = urlsplit(URL).netloc
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host_concurrency)
+
+        return self._host_semaphores[host]
+
+    def _get_backoff_delay(self, attempt):
+        # full jitter, so the retries of concurrent workers do not hit the host at the same time
+        return random.uniform(0, self.retry_backoff * 2 ** attempt)
+
+    async def _download(self, URL):
+        loop = asyncio.get_running_loop()
+
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                self.num_retries += 1
+                get_metrics().increment('retries')
+                await asyncio.sleep(self._get_backoff_delay(attempt - 1))
+
+            if self.token_bucket is not None:
+                await self.token_bucket.acquire()
+
+            async with self._get_host_semaphore(URL):
+                try:
+                    page_source = await loop.run_in_executor(self.fetch_executor, self.page_acquisition.get_page_source, URL)
+                except PageFetchError as e:
+                    if e.status_code is not None and e.status_code not in RETRYABLE_STATUS_CODES:
+                        raise
+                    error = e
+                    continue
+
+            if is_captcha_page(page_source):
+                error = PageFetchError(URL, 200, 'captcha page')
+                continue
+
+            return page_source
+
+        raise error
+
+    async def fetch(self, URL):
+        """downloads a web page, retrying with jittered exponential backoff on 503 and captcha pages
+
+        A page which still fails after the retries, or which has no product info, is downloaded again with Selenium,
+        unless the fallback is disabled.
+
+        Parameters
+        ----------
+        URL : str
+            the URL of a web page
+
+        Returns
+        -------
+        str
+            the page source of the web page
+        """
+
+        loop = asyncio.get_running_loop()
+
+        try:
+            page_source = await self._download(URL)
+        except PageFetchError:
+            if self.page_acquisition.fallback_fetcher is None:
+                raise
+            page_source = None
+
+        return await loop.run_in_executor(self.fetch_executor, self.page_acquisition.fall_back_on_page_source, URL, page_source)
+
+    async def scrape(self, URL):
+        """downloads a web page and runs the extractors on it in the parse workers
+
+        Parameters
+        ----------
+        URL : str
+            the URL of a Amazon product web page
+        """
+
+        loop = asyncio.get_running_loop()
+        metrics = get_metrics()
+
+        self._num_in_flight += 1
+        try:
+            page_source = await self.fetch(URL)
+            if self.page_handler is not None:
+                self.add_pages(await loop.run_in_executor(self.fetch_executor, self.page_handler, URL, page_source))
+            if self.args.parse_backend == "process":
+                # the metrics recorded in a worker process are sent back with the extracted info
+                info_dict, worker_metrics = await loop.run_in_executor(self.parse_executor, extract_info_and_metrics_from_page_source, self.args, URL, page_source)
+                metrics.merge(worker_metrics)
+            else:
+                info_dict = await loop.run_in_executor(self.parse_executor, extract_info_from_page_source, self.args, URL, page_source)
+        except Exception as e:
+            print(f'failed to scrape {URL}: {e!r}')
+            self.failed_URLs.append(URL)
+            metrics.increment('pages', status='failed')
+            if self.checkpoint is not None:
+                self.checkpoint.record_failure(URL, repr(e))
+            return
+        finally:
+            self._num_in_flight -= 1
+
+        self.num_scraped_pages += 1
+        metrics.increment('pages', status='scraped')
+        if self.verbosity_enabled:
+            print(f'{URL}:')
+            print(json.dumps(info_dict, indent=4))
+        if self.result_handler is not None:
+            self.result_handler(URL, info_dict)
+
+        # the page is recorded as done once its record is written
+        on_written = partial(self.checkpoint.record_done, URL) if self.checkpoint is not None else None
+        if self.dump_info_enabled:
+            get_output_sink(self.args, OUTPUT_NAMES[self.args.info_type]).write(make_record(URL, info_dict), on_written)
+        elif on_written is not None:
+            on_written()
+
+    def add_pages(self, URLs):
+        """adds new pages to the queue of the crawl, e.g. the pages discovered in a downloaded page
+
+        Parameters
+        ----------
+        URLs : iterable
+            the URLs of Amazon product web pages
+        """
+
+        if self.checkpoint is not None:
+            # the pages done or skipped by a previous run of the batch are not scraped again
+            URLs = self.checkpoint.get_pending(URLs)
+
+        for URL in URLs:
+            self._queue.put_nowait(URL)
+
+    async def _worker(self):
+        while True:
+            URL = await self._queue.get()
+            try:
+                await self.scrape(URL)
+            finally:
+                self._queue.task_done()
+
+    async def _report_periodically(self):
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            self.report()
+
+    def report(self):
+        """prints the throughput and the queue depth of the crawl
+        """
+
+        elapsed_time = time.perf_counter() - self._start_time
+        pages_per_second = self.num_scraped_pages / elapsed_time if elapsed_time > 0 else 0.0
+        queue_depth = self._queue.qsize() if self._queue is not None else 0
+        print(f'scraped {self.num_scraped_pages} pages ({len(self.failed_URLs)} failed, {self.num_retries} retries) '
+              f'in {elapsed_time:.1f}s: {pages_per_second:.2f} pages/second, '
+              f'queue depth {queue_depth}, {self._num_in_flight} in flight')
+
+    async def crawl(self, URLs):
+        """scrapes all the URLs and returns when the queue is drained
+
+        Parameters
+        ----------
+        URLs : iterable
+            the URLs of Amazon product web pages
+        """
+
+        self._queue = asyncio.Queue()
+        for URL in URLs:
+            self._queue.put_nowait(URL)
+
+        self._start_time = time.perf_counter()
+        tasks = [asyncio.create_task(self._worker()) for _ in range(self.max_concurrency)]
+        if self.stats_interval > 0:
+            tasks.append(asyncio.create_task(self._report_periodically()))
+
+        try:
+            await self._queue.join()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        self.report()
+
+    def run(self, URLs):
+        """runs the crawl in a new event loop
+
+        Parameters
+        ----------
+        URLs : iterable
+            the URLs of Amazon product web pages
+        """
+
+        if self.checkpoint is not None:
+            URLs = resume_from_checkpoint(self.checkpoint, URLs)
+
+        try:
+            asyncio.run(self.crawl(URLs))
+        finally:
+            self.fetch_executor.shutdown()
+            self.parse_executor.shutdown()
+            self.page_acquisition.close()
+            if self.checkpoint is not None:
+                # the buffered records are written first, so their pages are recorded as done
+                close_output_sinks()
+                self.checkpoint.close()
@@ -0,0 +1,236 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from dataextractiontools.browser_profile import create_browser_profile
+from dataextractiontools.checkpoint import create_checkpoint_journal, resume_from_checkpoint
+from dataextractiontools.metrics import get_metrics
+from dataextractiontools.output_sinks import OUTPUT_NAMES, close_output_sinks, get_output_sink, make_record
+from dataextractiontools.page_acquisition import PageAcquisition
+from dataextractiontools.parsing_stage import ParsingStage, create_scraper
+from dataextractiontools.utils import read_URL_file
+from dataextractiontools.webdriver_pool import WebDriverPool
+
+
+class BatchScraper():
+    """A class used to scrape a batch of Amazon product web pages with a pool of long-lived webdrivers
+
+    With checkpoints, the pages done, failed and skipped are recorded in a journal, so a batch run which stopped is
+    resumed by running it again: the pages already done are skipped and the failed ones are retried.
+
+    ...
+
+    Attributes
+    ----------
+    args : namedtuple
+        the arguments pre-defined by the user and imported from config.py
+    info_type : str
+        the type of information for extraction
+    URL_file : str
+        the path of a file of Amazon product URLs or ASINs, one per line
+    driver_pool : WebDriverPool
+        the pool of webdrivers shared by the scrapers of the batch
+    parsing_stage : ParsingStage
+        the pool of worker processes parsing the downloaded pages, or None to parse them in the downloading threads
+    checkpoint : CheckpointJournal
+        the journal of the pages done, failed and skipped, or None if the checkpoints are disabled
+    num_scraped_pages : int
+        the number of pages scraped successfully
+    failed_URLs : list
+        the URLs whose scraping failed
+
+    Methods
+    -------
+    create_scraper()
+        creates a scraper for the requested info type which downloads pages with the pool of webdrivers
+    scrape(URL)
+        scrapes a single Amazon product web page with the scraper of the current thread
+    handle_result(URL, info_dict)
+        counts, displays and dumps a page parsed by the parsing stage
+    dump(URL, info_dict)
+        dumps the record of a scraped page, and records the page as done once its record is written
+    handle_failure(URL, error)
+        keeps and records a failed page
+    report(elapsed_time)
+        prints the throughput of the batch
+    run(URLs=None)
+        scrapes all the Amazon product web pages listed in URL_file, or the given ones
+    """
+
+    def __init__(self, args):
+        """
+        Parameters
+        ----------
+        args : namedtuple
+            the namespace variable that contains the config for the scraper
+        """
+
+        self.args = args
+        self.info_type = args.info_type
+        self.URL_file = args.URL_file
+        self.driver_pool = WebDriverPool(args.num_drivers, args.driver_max_pages, create_browser_profile(args))
+        self.parsing_stage = ParsingStage(args, self.handle_result, self.handle_failure) if args.parse_backend == "process" else None
+        self.checkpoint = create_checkpoint_journal(args)
+
+        self.num_scraped_pages = 0
+        self.failed_URLs = []
+
+        self._lock = threading.Lock()
+        self._thread_local = threading.local()
+
+    def create_scraper(self):
+        """creates a scraper for the requested info type which downloads pages with the pool of webdrivers
+
+        Returns
+        -------
+        AmazonTabularInfoExtraction, AmazonTextualInfoExtraction or AmazonProductInfoExtraction
+            a scraper for the requested info type
+        """
+
+        scraper = create_scraper(self.args, self.driver_pool)
+        # the records are dumped by the batch scraper, which records the pages as done once their records are written
+        scraper.dump_info_enabled = False
+
+        return scraper
+
+    def scrape(self, URL):
+        """scrapes a single Amazon product web page with the scraper of the current thread
+
+        The scrapers keep the extracted info as instance attributes, so each thread uses its own scraper.
+
+        Parameters
+        ----------
+        URL : str
+            the URL of a Amazon product web page
+        """
+
+        try:
+            if self.parsing_stage is not None:
+                page_acquisition = getattr(self._thread_local, 'page_acquisition', None)
+                if page_acquisition is None:
+                    page_acquisition = self._thread_local.page_acquisition = PageAcquisition(self.args, self.driver_pool)
+
+                # the page is counted once the parsing stage has parsed it
+                page_source = page_acquisition.acquire_page_source(URL)
+                self.parsing_stage.submit(URL, page_source.encode())
+                return
+
+            scraper = getattr(self._thread_local, 'scraper', None)
+            if scraper is None:
+                scraper = self._thread_local.scraper = self.create_scraper()
+
+            info_dict = scraper.extract(URL)
+            self.dump(URL, info_dict)
+
+        except Exception as e:
+            print(f'failed to scrape {URL}: {e!r}')
+            self.handle_failure(URL, repr(e))
+            get_metrics().increment('pages', status='failed')
+            return
+
+        with self._lock:
+            self.num_scraped_pages += 1
+        get_metrics().increment('pages', status='scraped')
+
+    def handle_result(self, URL, info_dict):
+        """counts, displays and dumps a page parsed by the parsing stage
+
+        Parameters
+        ----------
+        URL : str
+            the URL of a Amazon product web page
+        info_dict : dict
+            the info extracted from the page
+        """
+
+        with self._lock:
+            self.num_scraped_pages += 1
+        get_metrics().increment('pages', status='scraped')
+
+        if self.args.verbosity_enabled:
+            print(f'{URL}:')
+            print(json.dumps(info_dict, indent=4))
+
+        self.dump(URL, info_dict)
+
+    def dump(self, URL, info_dict):
+        """dumps the record of a scraped page, and records the page as done once its record is written
+
+        A page whose record was still buffered when the batch stopped is scraped again when the batch is resumed.
+
+        Parameters
+        ----------
+        URL : str
+            the URL of a Amazon product web page
+        info_dict : dict
+            the info extracted from the page
+        """
+
+        on_written = partial(self.checkpoint.record_done, URL) if self.checkpoint is not None else None
+
+        if self.args.dump_info_enabled:
+            get_output_sink(self.args, OUTPUT_NAMES[self.info_type]).write(make_record(URL, info_dict), on_written)
+        elif on_written is not None:
+            on_written()
+
+    def handle_failure(self, URL, error):
+        """keeps and records a failed page
+
+        Parameters
+        ----------
+        URL : str
+            the URL of a Amazon product web page
+        error : str
+            the description of the failure
+        """
+
+        with self._lock:
+            self.failed_URLs.append(URL)
+
+        if self.checkpoint is not None:
+            self.checkpoint.record_failure(URL, error)
+
+    def report(self, elapsed_time):
+        """prints the throughput of the batch
+
+        Parameters
+        ----------
+        elapsed_time : float
+            the wall-clock time of the batch in seconds
+        """
+
+        pages_per_second = self.num_scraped_pages / elapsed_time if elapsed_time > 0 else 0.0
+        print(f'scraped {self.num_scraped_pages} pages ({len(self.failed_URLs)} failed) in {elapsed_time:.1f}s: '
+              f'{pages_per_second:.2f} pages/second, {self.driver_pool.num_recycled_drivers} webdrivers recycled')
+
+    def run(self, URLs=None):
+        """scrapes all the Amazon product web pages listed in URL_file, or the given ones
+
+        Parameters
+        ----------
+        URLs : list, optional
+            the URLs of the Amazon product web pages, read from URL_file if None
+        """
+
+        if URLs is None:
+            URLs = read_URL_file(self.URL_file)
+
+        if self.checkpoint is not None:
+            URLs = resume_from_checkpoint(self.checkpoint, URLs)
+
+        start_time = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.driver_pool.num_drivers) as executor:
+                executor.map(self.scrape, URLs)
+        finally:
+            self.driver_pool.close()
+            if self.parsing_stage is not None:
+                self.parsing_stage.close()
+            if self.checkpoint is not None:
+                # the buffered records are written first, so their pages are recorded as done
+                close_output_sinks()
+                self.checkpoint.close()
+
+        self.report(time.perf_counter() - start_time)
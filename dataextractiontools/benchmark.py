@@ -0,0 +1,610 @@
+import argparse
+import gzip
+import json
+import re
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+from config import parse_args
+from dataextractiontools.browser_profile import BrowserProfile
+from dataextractiontools.page_acquisition import has_product_info_containers
+from dataextractiontools.page_store import PageStore
+from dataextractiontools.parsing_stage import create_scraper, run_extractors
+from dataextractiontools.selector_registry import get_selector_matches
+from dataextractiontools.soup_builder import build_soup
+from dataextractiontools.utils import parse_best_sellers_rank, remove_direction_marks, remove_unicode_chars, split_best_sellers_rank
+
+
+def measure_soup_parser(page_sources, soup_parser, scraper, num_repeats=5):
+    """measures the per-page parse time and peak memory of a soup parser, and the info extracted with it
+
+    Parameters
+    ----------
+    page_sources : list
+        the page sources of Amazon product web pages
+    soup_parser : str
+        the soup parser, partial or full
+    scraper : AmazonProductInfoExtraction
+        the scraper running all the extractors
+    num_repeats : int
+        the number of times each page is parsed to measure the parse time
+
+    Returns
+    -------
+    dict
+        the mean parse time per page in milliseconds, the maximum peak memory of a page in megabytes, and the info
+        extracted from each page. The peak memory is the one of the python allocations traced by tracemalloc, it does
+        not include the memory allocated by libxml2 for the lxml tree which the partial parser frees right away.
+    """
+
+    parse_times = []
+    peak_memories = []
+    info_dicts = []
+
+    for page_source in page_sources:
+        start_time = time.perf_counter()
+        for _ in range(num_repeats):
+            soup_obj = build_soup(page_source, soup_parser)
+        parse_times.append((time.perf_counter() - start_time) / num_repeats)
+        del soup_obj
+
+        # the memory is traced in a separate run, tracemalloc slows the parse down
+        tracemalloc.start()
+        scraper.soup_obj = build_soup(page_source, soup_parser)
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_memories.append(peak_memory)
+
+        info_dicts.append(run_extractors(scraper, "all"))
+        scraper.soup_obj = None
+
+    return {
+        'parse_time_ms': 1000 * sum(parse_times) / len(parse_times),
+        'peak_memory_mb': max(peak_memories) / 1024 / 1024,
+        'info_dicts': info_dicts,
+    }
+
+
+def compare_soup_parsers(page_paths, num_repeats=5):
+    """compares the full and the partial soup parsers on saved Amazon product web pages
+
+    Parameters
+    ----------
+    page_paths : list
+        the paths of saved Amazon product web pages
+    num_repeats : int
+        the number of times each page is parsed to measure the parse time
+    """
+
+    page_sources = [Path(page_path).read_text() for page_path in page_paths]
+    scraper = create_scraper(parse_args(["--info-type", "all"]))
+
+    results = {soup_parser: measure_soup_parser(page_sources, soup_parser, scraper, num_repeats) for soup_parser in ["full", "partial"]}
+
+    for soup_parser, result in results.items():
+        print(f'{soup_parser:>8}: {result["parse_time_ms"]:.2f} ms/page, peak memory {result["peak_memory_mb"]:.2f} MB')
+
+    identical = results["full"]['info_dicts'] == results["partial"]['info_dicts']
+    print(f'extracted info identical: {identical}')
+
+
+def collect_text_corpus(page_paths):
+    """collects the strings cleaned by the extractors from saved Amazon product web pages
+
+    Parameters
+    ----------
+    page_paths : list
+        the paths of saved Amazon product web pages
+
+    Returns
+    -------
+    list
+        the texts of the cells, list items and paragraphs of the product info containers
+    """
+
+    corpus = []
+    for page_path in page_paths:
+        soup_obj = build_soup(Path(page_path).read_text(), "partial")
+        corpus.extend(element.get_text() for element in soup_obj.select('th, td, li, p'))
+
+    return corpus
+
+
+def _clean_text_uncompiled(text):
+    # the cleaning of the extractors before the precompiled normalization of utils
+    text = text.encode("ascii", "ignore").decode().strip()
+    text = text.replace('\n                                    \u200f\n                                        ', '').strip()
+    return ["#" + re.sub('\\(See .*\\)', '', rank).strip() for rank in text.split("#")[1:]]
+
+
+def _clean_text_precompiled(text):
+    text = remove_direction_marks(remove_unicode_chars(text))
+    return split_best_sellers_rank(text)
+
+
+def compare_text_normalization(page_paths, num_repeats=20):
+    """compares the uncompiled cleaning of the extractors with the precompiled normalization of utils
+
+    Parameters
+    ----------
+    page_paths : list
+        the paths of saved Amazon product web pages, from which the corpus of strings is collected
+    num_repeats : int
+        the number of times the corpus is cleaned
+    """
+
+    corpus = collect_text_corpus(page_paths)
+    print(f'corpus of {len(corpus)} strings')
+
+    for name, clean_text in [
+        ("uncompiled", _clean_text_uncompiled),
+        ("precompiled", _clean_text_precompiled),
+        ("structured", lambda text: parse_best_sellers_rank(remove_unicode_chars(text))),
+    ]:
+        # re caches the compiled patterns, so it is purged to measure the compilation of the uncompiled patterns
+        re.purge()
+        start_time = time.perf_counter()
+        for _ in range(num_repeats):
+            for text in corpus:
+                clean_text(text)
+        elapsed_time = time.perf_counter() - start_time
+        print(f'{name:>12}: {1e6 * elapsed_time / (num_repeats * max(1, len(corpus))):.2f} us/string')
+
+
+# the extractor methods timed by the extractors benchmark, run on the scraper of all the info
+EXTRACTORS = {
+    # the single traversal of the page evaluating all the selectors, whose matches are shared by the other extractors
+    'match_selectors': lambda scraper: get_selector_matches(scraper.tabular_info_extraction.soup_obj),
+    'detect_product_detail_table_layouts': lambda scraper: list(scraper.tabular_info_extraction.detect_product_detail_table_layouts()),
+    'get_product_detail_table(type1)': lambda scraper: scraper.tabular_info_extraction.get_product_detail_table('type1'),
+    'get_product_detail_table(type2)': lambda scraper: scraper.tabular_info_extraction.get_product_detail_table('type2'),
+    'get_product_detail_table(type3)': lambda scraper: scraper.tabular_info_extraction.get_product_detail_table('type3'),
+    'get_product_detail_table_all_types': lambda scraper: scraper.tabular_info_extraction.get_product_detail_table_all_types(),
+    'get_product_overview_table': lambda scraper: scraper.tabular_info_extraction.get_product_overview_table(),
+    'extract_title': lambda scraper: scraper.textual_info_extraction.extract_title(),
+    'extract_bullet_points': lambda scraper: scraper.textual_info_extraction.extract_bullet_points(),
+    'extract_product_description': lambda scraper: scraper.textual_info_extraction.extract_product_description(),
+}
+
+# the layouts of the product detail tables a corpus should cover, NA being the pages without any table
+CORPUS_LAYOUTS = ['type1', 'type2', 'type3', 'NA']
+
+# the default corpus: small synthetic pages shipped with the package, one per layout
+DEFAULT_CORPUS_PATH = Path(__file__).resolve().parent / 'benchmark_corpus'
+
+
+def load_corpus(corpus_paths):
+    """loads the page sources of a corpus of saved Amazon product web pages
+
+    Parameters
+    ----------
+    corpus_paths : list
+        the paths of saved pages (.html, .htm or .html.gz), of directories of saved pages, or of page stores
+
+    Returns
+    -------
+    list
+        the name and the page source of each page of the corpus
+    """
+
+    corpus = []
+    for corpus_path in map(Path, corpus_paths):
+        if (corpus_path / 'index.jsonl').exists():
+            page_store = PageStore(corpus_path)
+            for asin, asin_entries in sorted(page_store.entries.items()):
+                corpus.append((asin, page_store.get_page_source(asin_entries[-1])))
+            continue
+
+        page_paths = sorted(corpus_path.rglob('*')) if corpus_path.is_dir() else [corpus_path]
+        for page_path in page_paths:
+            if page_path.name.endswith('.html.gz'):
+                corpus.append((page_path.name, gzip.decompress(page_path.read_bytes()).decode()))
+            elif page_path.suffix in ('.html', '.htm'):
+                corpus.append((page_path.name, page_path.read_text()))
+
+    return corpus
+
+
+def percentile(values, q):
+    """returns the q-th percentile of values, by the nearest-rank method
+
+    Parameters
+    ----------
+    values : list
+        the measured values
+    q : float
+        the percentile, between 0 and 100
+
+    Returns
+    -------
+    float
+        the smallest value which is greater than or equal to q percent of the values
+    """
+
+    values = sorted(values)
+    rank = max(1, -(-len(values) * q // 100))
+
+    return values[int(rank) - 1]
+
+
+def get_peak_rss_mb():
+    """returns the peak resident set size of the process in megabytes, or None if it can not be measured
+    """
+
+    if resource is None:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # in bytes on macOS, in kilobytes elsewhere
+    if sys.platform == 'darwin':
+        max_rss /= 1024
+
+    return max_rss / 1024
+
+
+def measure_extractors(corpus, soup_parser="partial", num_repeats=5):
+    """measures the throughput of the scraper and the latency of each extractor method on a corpus of pages
+
+    Parameters
+    ----------
+    corpus : list
+        the name and the page source of each page
+    soup_parser : str
+        the soup parser, partial or full
+    num_repeats : int
+        the number of times the corpus is processed
+
+    Returns
+    -------
+    dict
+        the number of pages, the layout of the product detail table of each page, the pages/sec of the parsing and of
+        all the extractors together, the p50 and p95 latencies in milliseconds of the parsing and of each extractor
+        method, and the peak RSS of the process in megabytes
+    """
+
+    scraper = create_scraper(parse_args(["--info-type", "all", "--soup-parser", soup_parser]))
+
+    # a first pass warms the caches up and records the layout of each page
+    layouts = dict()
+    for name, page_source in corpus:
+        scraper.soup_obj = build_soup(page_source, soup_parser)
+        layouts[name] = run_extractors(scraper, "all")['product_detail_table_layout']
+
+    start_time = time.perf_counter()
+    for _ in range(num_repeats):
+        for name, page_source in corpus:
+            scraper.soup_obj = build_soup(page_source, soup_parser)
+            run_extractors(scraper, "all")
+    elapsed_time = time.perf_counter() - start_time
+
+    latencies = {'build_soup': []}
+    latencies.update({extractor_name: [] for extractor_name in EXTRACTORS})
+    for _ in range(num_repeats):
+        for name, page_source in corpus:
+            start_time = time.perf_counter()
+            soup_obj = build_soup(page_source, soup_parser)
+            latencies['build_soup'].append(time.perf_counter() - start_time)
+
+            scraper.tabular_info_extraction.soup_obj = soup_obj
+            scraper.textual_info_extraction.soup_obj = soup_obj
+            for extractor_name, extractor in EXTRACTORS.items():
+                start_time = time.perf_counter()
+                extractor(scraper)
+                latencies[extractor_name].append(time.perf_counter() - start_time)
+
+    return {
+        'num_pages': len(corpus),
+        'soup_parser': soup_parser,
+        'layouts': layouts,
+        'pages_per_second': num_repeats * len(corpus) / elapsed_time,
+        'latencies_ms': {
+            name: {'p50': 1000 * percentile(values, 50), 'p95': 1000 * percentile(values, 95)}
+            for name, values in latencies.items()
+        },
+        'peak_rss_mb': get_peak_rss_mb(),
+    }
+
+
+def compare_with_baseline(results, baseline, tolerance=0.2):
+    """compares the results of the extractors benchmark with the results of a baseline run
+
+    Parameters
+    ----------
+    results : dict
+        the results of measure_extractors
+    baseline : dict
+        the results of measure_extractors of the baseline run
+    tolerance : float
+        the relative slowdown tolerated before a metric is reported as a regression
+
+    Returns
+    -------
+    list
+        the description of each regression
+    """
+
+    regressions = []
+
+    if results['pages_per_second'] < baseline['pages_per_second'] / (1 + tolerance):
+        regressions.append(f'pages/sec: {results["pages_per_second"]:.1f} < {baseline["pages_per_second"]:.1f}')
+
+    for name, latency in results['latencies_ms'].items():
+        baseline_latency = baseline['latencies_ms'].get(name)
+        if baseline_latency is None:
+            continue
+        for q in ['p50', 'p95']:
+            if latency[q] > baseline_latency[q] * (1 + tolerance):
+                regressions.append(f'{name} {q}: {latency[q]:.3f} ms > {baseline_latency[q]:.3f} ms')
+
+    if results['peak_rss_mb'] and baseline.get('peak_rss_mb') and results['peak_rss_mb'] > baseline['peak_rss_mb'] * (1 + tolerance):
+        regressions.append(f'peak RSS: {results["peak_rss_mb"]:.1f} MB > {baseline["peak_rss_mb"]:.1f} MB')
+
+    return regressions
+
+
+def benchmark_extractors(corpus_paths=None, soup_parser="partial", num_repeats=5, output_path=None, baseline_path=None, tolerance=0.2):
+    """benchmarks the extractors on a corpus of saved Amazon product web pages, fully offline
+
+    Parameters
+    ----------
+    corpus_paths : list, optional
+        the paths of saved pages, of directories of saved pages, or of page stores, the synthetic pages of
+        benchmark_corpus if None
+    soup_parser : str
+        the soup parser, partial or full
+    num_repeats : int
+        the number of times the corpus is processed
+    output_path : str, optional
+        the path of a json file in which the results are written
+    baseline_path : str, optional
+        the path of the json results of a baseline run to compare with
+    tolerance : float
+        the relative slowdown tolerated before a metric is reported as a regression
+
+    Returns
+    -------
+    bool
+        False if a metric regressed compared to the baseline
+    """
+
+    corpus = load_corpus(corpus_paths or [DEFAULT_CORPUS_PATH])
+    if not corpus:
+        raise ValueError('the corpus is empty')
+
+    results = measure_extractors(corpus, soup_parser, num_repeats)
+
+    layout_counts = {layout: list(results['layouts'].values()).count(layout) for layout in CORPUS_LAYOUTS}
+    print(f'corpus of {results["num_pages"]} pages, layouts: ' + ', '.join(f'{layout} {count}' for layout, count in layout_counts.items()))
+    missing_layouts = [layout for layout, count in layout_counts.items() if count == 0]
+    if missing_layouts:
+        print(f'warning: the corpus does not cover the layouts {", ".join(missing_layouts)}')
+
+    print(f'{results["pages_per_second"]:.1f} pages/sec')
+    for name, latency in results['latencies_ms'].items():
+        print(f'{name:>36}: p50 {latency["p50"]:.3f} ms, p95 {latency["p95"]:.3f} ms')
+    if results['peak_rss_mb'] is not None:
+        print(f'peak RSS {results["peak_rss_mb"]:.1f} MB')
+
+    if output_path:
+        Path(output_path).write_text(json.dumps(results, indent=4))
+
+    if not baseline_path:
+        return True
+
+    regressions = compare_with_baseline(results, json.loads(Path(baseline_path).read_text()), tolerance)
+    for regression in regressions:
+        print(f'regression: {regression}')
+    if not regressions:
+        print(f'no regression compared to {baseline_path}')
+
+    return not regressions
+
+
+class _QuietHTTPRequestHandler(SimpleHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+def compare_browser_profiles(page_dir, page_name, num_repeats=5):
+    """compares the load time of a web page served locally by webdrivers with the default and the scrape profiles
+
+    The page is served with its resources from a local HTTP server, e.g. a product web page saved with all its files
+    by the browser. The resources still pointing to other domains are filtered by the scrape profile.
+
+    Parameters
+    ----------
+    page_dir : str
+        the directory served by the local HTTP server
+    page_name : str
+        the path of the page in the served directory
+    num_repeats : int
+        the number of times the page is loaded by each webdriver, after a first load
+    """
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(_QuietHTTPRequestHandler, directory=page_dir))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    URL = f'http://127.0.0.1:{server.server_address[1]}/{page_name}'
+
+    results = dict()
+    try:
+        for browser_profile in [BrowserProfile("default"), BrowserProfile("scrape", ["127.0.0.1", "localhost"])]:
+            driver = browser_profile.create_driver()
+            try:
+                # the first load warms the webdriver up
+                browser_profile.load_page(driver, URL)
+                load_times = []
+                for _ in range(num_repeats):
+                    start_time = time.perf_counter()
+                    page_source = browser_profile.load_page(driver, URL)
+                    load_times.append(time.perf_counter() - start_time)
+            finally:
+                driver.quit()
+
+            results[browser_profile.name] = 1000 * percentile(load_times, 50)
+            has_containers = has_product_info_containers(page_source)
+            print(f'{browser_profile.name:>8}: p50 {results[browser_profile.name]:.0f} ms/page, product info containers loaded: {has_containers}')
+    finally:
+        server.shutdown()
+
+    print(f'load time reduction: {100 * (1 - results["scrape"] / results["default"]):.0f}%')
+
+
+# the slow backends which the CLI only imports once a scraping mode needs them
+DEFERRED_MODULES = ['selenium', 'requests', 'bs4', 'lxml', 'soupsieve', 'pyarrow', 'http.server']
+
+# the script run in a fresh interpreter to time the import of a module
+_IMPORT_TIME_SCRIPT = """
+import json, sys, time
+start_time = time.perf_counter()
+import {module}
+elapsed_time = time.perf_counter() - start_time
+print(json.dumps({{'seconds': elapsed_time, 'modules': sorted(sys.modules)}}))
+"""
+
+
+def measure_import_time(module, num_repeats=10):
+    """measures the import time of a module in fresh interpreters, as paid by each run of the CLI
+
+    Parameters
+    ----------
+    module : str
+        the name of the module, e.g. ATTARII
+    num_repeats : int
+        the number of fresh interpreters importing the module
+
+    Returns
+    -------
+    dict
+        the p50 and p95 import times in milliseconds, the deferred modules imported with the module, and the modules
+        with the largest cumulative import times
+    """
+
+    repo_root = Path(__file__).resolve().parent.parent
+    script = _IMPORT_TIME_SCRIPT.format(module=module)
+
+    import_times = []
+    for _ in range(num_repeats):
+        output = subprocess.run([sys.executable, '-c', script], cwd=repo_root, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.splitlines()[-1])
+        import_times.append(result['seconds'])
+
+    imported_deferred_modules = [deferred_module for deferred_module in DEFERRED_MODULES if deferred_module in result['modules']]
+
+    # -X importtime reports the self and the cumulative import time of each module in microseconds, the modules
+    # imported by the startup of the interpreter itself are left out
+    startup_modules = set(json.loads(subprocess.run([sys.executable, '-c', 'import json, sys; print(json.dumps(sorted(sys.modules)))'], capture_output=True, text=True, check=True).stdout))
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=repo_root, capture_output=True, text=True, check=True).stderr
+    cumulative_times = []
+    for line in stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[1].strip().isdigit() and fields[2].strip() not in startup_modules:
+            cumulative_times.append((int(fields[1]) / 1000, fields[2].strip()))
+
+    return {
+        'p50': 1000 * percentile(import_times, 50),
+        'p95': 1000 * percentile(import_times, 95),
+        'imported_deferred_modules': imported_deferred_modules,
+        'slowest_modules': sorted(cumulative_times, reverse=True)[:10],
+    }
+
+
+def benchmark_import_time(modules, num_repeats=10, budget_ms=50):
+    """measures the import time of the CLI and checks it against a regression budget
+
+    Parameters
+    ----------
+    modules : list
+        the names of the modules to import, each in its own fresh interpreters
+    num_repeats : int
+        the number of fresh interpreters importing each module
+    budget_ms : float
+        the maximum p50 import time of each module in milliseconds
+
+    Returns
+    -------
+    bool
+        True if no module exceeds the budget nor imports a deferred backend
+    """
+
+    is_within_budget = True
+    for module in modules:
+        results = measure_import_time(module, num_repeats)
+        print(f'{module}: p50 {results["p50"]:.1f} ms, p95 {results["p95"]:.1f} ms (budget {budget_ms:g} ms)')
+        for cumulative_time, imported_module in results['slowest_modules']:
+            print(f'{cumulative_time:>10.1f} ms  {imported_module}')
+
+        if results['p50'] > budget_ms:
+            print(f'regression: importing {module} takes {results["p50"]:.1f} ms, more than the budget of {budget_ms:g} ms')
+            is_within_budget = False
+        if results['imported_deferred_modules']:
+            print(f'regression: importing {module} imports {", ".join(results["imported_deferred_modules"])}, which should only be imported when needed')
+            is_within_budget = False
+
+    return is_within_budget
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark the parsing and the extraction of saved Amazon product web pages")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    soup_parsers_parser = subparsers.add_parser("soup-parsers", help="compare the full and the partial soup parsers")
+    soup_parsers_parser.add_argument("pages", nargs="+", help="the paths of saved Amazon product web pages")
+    soup_parsers_parser.add_argument("--num-repeats", default=5, help="the number of times each page is parsed", type=int)
+
+    text_normalization_parser = subparsers.add_parser("text-normalization", help="compare the uncompiled and the precompiled text cleaning")
+    text_normalization_parser.add_argument("pages", nargs="+", help="the paths of saved Amazon product web pages")
+    text_normalization_parser.add_argument("--num-repeats", default=20, help="the number of times the corpus is cleaned", type=int)
+
+    extractors_parser = subparsers.add_parser("extractors", help="measure the throughput and the latency of each extractor on a corpus of pages")
+    extractors_parser.add_argument("corpus", nargs="*", help="the paths of saved Amazon product web pages, of directories of saved pages, or of page stores, the synthetic pages of benchmark_corpus by default")
+    extractors_parser.add_argument("--soup-parser", default="partial", help="the soup parser", choices=["partial", "full"], type=str)
+    extractors_parser.add_argument("--num-repeats", default=5, help="the number of times the corpus is processed", type=int)
+    extractors_parser.add_argument("--output-json", default=None, help="the path of a json file in which the results are written", type=str)
+    extractors_parser.add_argument("--baseline", default=None, help="the path of the json results of a baseline run to compare with", type=str)
+    extractors_parser.add_argument("--tolerance", default=0.2, help="the relative slowdown tolerated before a metric is reported as a regression", type=float)
+
+    browser_profiles_parser = subparsers.add_parser("browser-profiles", help="compare the load time of a locally served page with the default and the scrape browser profiles")
+    browser_profiles_parser.add_argument("page_dir", help="the directory of a saved Amazon product web page and its resources")
+    browser_profiles_parser.add_argument("page_name", help="the path of the page in the directory")
+    browser_profiles_parser.add_argument("--num-repeats", default=5, help="the number of times the page is loaded", type=int)
+
+    import_time_parser = subparsers.add_parser("import-time", help="measure the startup import time of the CLI and check it against a regression budget")
+    import_time_parser.add_argument("modules", nargs="*", default=["ATTARII"], help="the modules to import, the CLI by default")
+    import_time_parser.add_argument("--num-repeats", default=10, help="the number of fresh interpreters importing each module", type=int)
+    import_time_parser.add_argument("--budget-ms", default=50, help="the maximum p50 import time of each module in milliseconds", type=float)
+
+    args = parser.parse_args()
+
+    if args.benchmark == "soup-parsers":
+        compare_soup_parsers(args.pages, args.num_repeats)
+
+    if args.benchmark == "text-normalization":
+        compare_text_normalization(args.pages, args.num_repeats)
+
+    if args.benchmark == "browser-profiles":
+        compare_browser_profiles(args.page_dir, args.page_name, args.num_repeats)
+
+    if args.benchmark == "import-time":
+        if not benchmark_import_time(args.modules, args.num_repeats, args.budget_ms):
+            sys.exit(1)
+
+    if args.benchmark == "extractors":
+        if not benchmark_extractors(args.corpus, args.soup_parser, args.num_repeats, args.output_json, args.baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
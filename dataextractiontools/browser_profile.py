@@ -0,0 +1,228 @@
+import base64
+import json
+
+from dataextractiontools.crawl_planner import MARKETPLACES
+from dataextractiontools.selector_registry import get_product_info_containers
+
+
+# the Firefox preferences of the scrape profile, which only loads what the extractors need: the DOM text
+SCRAPE_PROFILE_PREFERENCES = {
+    # images
+    "permissions.default.image": 2,
+    # stylesheets
+    "permissions.default.stylesheet": 2,
+    # web fonts
+    "gfx.downloadable_fonts.enabled": False,
+    "browser.display.use_document_fonts": 0,
+    # audio and video
+    "media.autoplay.default": 5,
+    "media.preload.default": 0,
+    "media.preload.auto": 0,
+    "media.peerconnection.enabled": False,
+    # background traffic of the browser itself
+    "browser.cache.disk.enable": False,
+    "network.prefetch-next": False,
+    "network.dns.disablePrefetch": True,
+    "network.http.speculative-parallel-limit": 0,
+    "browser.safebrowsing.malware.enabled": False,
+    "browser.safebrowsing.phishing.enabled": False,
+    "datareporting.healthreport.uploadEnabled": False,
+    "toolkit.telemetry.enabled": False,
+}
+
+# the domains the scrape profile loads resources from: the product pages of every marketplace and the scripts of the
+# first-party CDNs
+DEFAULT_ALLOWED_DOMAINS = [f"amazon.{marketplace}" for marketplace in MARKETPLACES] + [
+    "media-amazon.com",
+    "ssl-images-amazon.com",
+]
+
+# the requests to the other domains are sent to a closed local port by the proxy auto-config, so they fail at once
+BLOCKING_PROXY = "PROXY 127.0.0.1:9"
+
+
+def get_product_info_containers_selector():
+    """returns a CSS selector matching any of the containers read by the extractors, in the selector registry
+
+    Returns
+    -------
+    str
+        the CSS selector of the containers
+    """
+
+    container_ids, container_classes = get_product_info_containers()
+
+    return ', '.join([f'#{container_id}' for container_id in container_ids] + [f'.{container_class}' for container_class in container_classes])
+
+
+def make_proxy_auto_config(allowed_domains):
+    """writes a proxy auto-config script which only lets the requests to some domains and their subdomains through
+
+    Parameters
+    ----------
+    allowed_domains : list
+        the allowed domains
+
+    Returns
+    -------
+    str
+        the PAC script
+    """
+
+    return (
+        'function FindProxyForURL(url, host) {\n'
+        f'  var allowed = {json.dumps(list(allowed_domains))};\n'
+        '  for (var i = 0; i < allowed.length; i++) {\n'
+        '    if (host == allowed[i] || dnsDomainIs(host, "." + allowed[i])) return "DIRECT";\n'
+        '  }\n'
+        f'  return "{BLOCKING_PROXY}";\n'
+        '}\n'
+    )
+
+
+class BrowserProfile():
+    """The configuration of the headless Firefox webdrivers downloading the product web pages
+
+    The default profile loads the pages as a regular browser. The scrape profile blocks the images, the media, the
+    fonts and the stylesheets, filters the requests to third-party domains, returns from a navigation as soon as the DOM
+    is parsed (page load strategy eager), and stops loading the page once the containers read by the extractors exist.
+
+    ...
+
+    Attributes
+    ----------
+    name : str
+        the name of the profile, scrape or default
+    allowed_domains : list
+        the domains the scrape profile loads resources from, an empty list does not filter any domain
+    container_timeout : float
+        the maximum time in seconds the scrape profile waits for the containers after the DOM is parsed
+
+    Methods
+    -------
+    create_options()
+        creates the options of a webdriver with this profile
+    create_driver()
+        creates a headless Firefox webdriver with this profile
+    load_page(driver, URL)
+        navigates a webdriver to a web page and returns its page source
+    """
+
+    def __init__(self, name="scrape", allowed_domains=None, container_timeout=10):
+        """
+        Parameters
+        ----------
+        name : str
+            the name of the profile, scrape or default
+        allowed_domains : list, optional
+            the domains the scrape profile loads resources from, DEFAULT_ALLOWED_DOMAINS if None
+        container_timeout : float
+            the maximum time in seconds the scrape profile waits for the containers after the DOM is parsed
+        """
+
+        if name not in ("scrape", "default"):
+            raise ValueError(f'unknown browser profile: {name}')
+
+        self.name = name
+        self.allowed_domains = DEFAULT_ALLOWED_DOMAINS if allowed_domains is None else list(allowed_domains)
+        self.container_timeout = container_timeout
+
+    def create_options(self):
+        """creates the options of a webdriver with this profile
+
+        Returns
+        -------
+        selenium.webdriver.FirefoxOptions
+            the options of the webdriver
+        """
+
+        # selenium is slow to import, it is only imported once a webdriver is needed
+        from selenium import webdriver
+
+        options = webdriver.FirefoxOptions()
+        options.add_argument("-headless")
+
+        if self.name != "scrape":
+            return options
+
+        options.page_load_strategy = "eager"
+        for preference, value in SCRAPE_PROFILE_PREFERENCES.items():
+            options.set_preference(preference, value)
+
+        if self.allowed_domains:
+            proxy_auto_config = base64.b64encode(make_proxy_auto_config(self.allowed_domains).encode()).decode()
+            options.set_preference("network.proxy.type", 2)
+            options.set_preference("network.proxy.autoconfig_url", f"data:application/x-ns-proxy-autoconfig;base64,{proxy_auto_config}")
+
+        return options
+
+    def create_driver(self):
+        """creates a headless Firefox webdriver with this profile
+
+        Returns
+        -------
+        selenium.webdriver.Firefox
+            a headless Firefox webdriver
+        """
+
+        from selenium import webdriver
+
+        return webdriver.Firefox(options=self.create_options())
+
+    def load_page(self, driver, URL):
+        """navigates a webdriver to a web page and returns its page source
+
+        Parameters
+        ----------
+        driver : selenium.webdriver.Firefox
+            a webdriver created with this profile
+        URL : str
+            the URL of a web page
+
+        Returns
+        -------
+        str
+            the page source of the web page
+        """
+
+        from selenium.common.exceptions import TimeoutException, WebDriverException
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        driver.get(URL)
+
+        if self.name == "scrape":
+            containers_selector = get_product_info_containers_selector()
+            try:
+                WebDriverWait(driver, self.container_timeout, poll_frequency=0.1).until(
+                    lambda driver: driver.execute_script("return document.querySelector(arguments[0]) !== null", containers_selector)
+                )
+            except TimeoutException:
+                # e.g. a captcha page, the caller decides what to do with the page without containers
+                pass
+
+            # the scripts and the subresources still loading are not needed anymore
+            try:
+                driver.execute_script("window.stop();")
+            except WebDriverException:
+                pass
+
+        return driver.page_source
+
+
+def create_browser_profile(args):
+    """creates the browser profile requested in args
+
+    Parameters
+    ----------
+    args : namedtuple
+        the namespace variable that contains the config for the scraper
+
+    Returns
+    -------
+    BrowserProfile
+        the profile of the webdrivers
+    """
+
+    allowed_domains = [domain.strip() for domain in args.browser_allowed_domains.split(',') if domain.strip()] if args.browser_allowed_domains is not None else None
+
+    return BrowserProfile(args.browser_profile, allowed_domains, args.browser_container_timeout)
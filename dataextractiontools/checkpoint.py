@@ -0,0 +1,298 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+from dataextractiontools.utils import get_product_key
+
+
+# the statuses of the pages in the checkpoint journal
+CHECKPOINT_STATUSES = ("done", "failed", "skipped")
+
+# the maximum length of the error kept for a failed page
+MAX_ERROR_LENGTH = 200
+
+
+class CheckpointJournal():
+    """The durable journal of a batch run, which records the pages done, failed and skipped so a restart resumes the run
+
+    The journal is an append-only file with one tab-separated line per scraped page: its status, its number of failed
+    attempts, its ASIN and the error of its last failure. The lines are flushed as soon as they are written and synced
+    to disk periodically, so a crash only loses the pages in flight. A page is done once its record is written and
+    flushed to the output file by the output sink, so a crash never loses the record of a page done. A failed page is
+    retried on the next runs until it failed max_attempts times, it is then skipped.
+
+    Only the latest line of each ASIN is kept when the journal is loaded, and the journal is compacted when it holds
+    compact_interval outdated lines, or more outdated lines than pages, so loading it stays fast for millions of pages.
+    The lines are split rather than parsed as json for the same reason.
+
+    ...
+
+    Attributes
+    ----------
+    journal_path : os.PathLike
+        the path of the journal
+    max_attempts : int
+        the number of times a page fails before it is skipped
+    compact_interval : int
+        the number of outdated lines after which the journal is compacted
+    fsync_interval : float
+        the interval in seconds between two syncs of the journal to disk
+    entries : dict
+        the latest status, number of failed attempts and error of each ASIN
+
+    Methods
+    -------
+    get_pending(URLs)
+        returns the URLs still to be scraped, i.e. neither done nor skipped
+    record_done(URL)
+        records a page scraped successfully
+    record_failure(URL, error)
+        records a failed page, which is skipped once it failed max_attempts times
+    get_stats()
+        returns the number of pages of each status
+    compact()
+        rewrites the journal with the latest line of each ASIN only
+    close()
+        syncs the journal to disk and closes it
+    """
+
+    def __init__(self, journal_path, max_attempts=3, compact_interval=100000, fsync_interval=5.0):
+        """
+        Parameters
+        ----------
+        journal_path : os.PathLike
+            the path of the journal
+        max_attempts : int
+            the number of times a page fails before it is skipped
+        compact_interval : int
+            the number of outdated lines after which the journal is compacted
+        fsync_interval : float
+            the interval in seconds between two syncs of the journal to disk
+        """
+
+        self.journal_path = Path(journal_path)
+        self.max_attempts = max_attempts
+        self.compact_interval = compact_interval
+        self.fsync_interval = fsync_interval
+
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._fh = None
+        self._num_lines = 0
+        self.entries = self._load()
+
+        num_outdated_lines = self._num_lines - len(self.entries)
+        if num_outdated_lines >= self.compact_interval or num_outdated_lines > len(self.entries):
+            self.compact()
+        else:
+            self._open()
+
+    def _load(self):
+        entries = dict()
+        if not self.journal_path.exists():
+            return entries
+
+        with self.journal_path.open() as fh:
+            for line in fh:
+                fields = line.rstrip('\n').split('\t')
+                # the last line may be truncated by a crash
+                if len(fields) != 4 or fields[0] not in CHECKPOINT_STATUSES or not fields[1].isdigit():
+                    continue
+                status, attempts, asin, error = fields
+                entries[asin] = (status, int(attempts), error)
+                self._num_lines += 1
+
+        return entries
+
+    def _open(self):
+        self._fh = self.journal_path.open('a')
+        # a line truncated by a crash is terminated, so the next line is not appended to it
+        if self._fh.tell() > 0:
+            with self.journal_path.open('rb') as fh:
+                fh.seek(-1, os.SEEK_END)
+                if fh.read(1) != b'\n':
+                    self._fh.write('\n')
+        self._last_fsync_time = time.monotonic()
+
+    @staticmethod
+    def _format_line(asin, status, attempts, error):
+        return f'{status}\t{attempts}\t{asin}\t{error}\n'
+
+    def _append(self, asin, status, attempts, error=''):
+        with self._lock:
+            self.entries[asin] = (status, attempts, error)
+            self._fh.write(self._format_line(asin, status, attempts, error))
+            self._fh.flush()
+            self._num_lines += 1
+
+            if time.monotonic() - self._last_fsync_time >= self.fsync_interval:
+                os.fsync(self._fh.fileno())
+                self._last_fsync_time = time.monotonic()
+
+            if self._num_lines - len(self.entries) >= self.compact_interval:
+                self._compact()
+
+    def get_pending(self, URLs):
+        """returns the URLs still to be scraped, i.e. neither done nor skipped
+
+        Parameters
+        ----------
+        URLs : iterable
+            the URLs of the batch
+
+        Returns
+        -------
+        list
+            the URLs never scraped and the failed ones still to be retried, without duplicates, in their order
+        """
+
+        pending_URLs = []
+        seen_asins = set()
+
+        for URL in URLs:
+            asin = get_product_key(URL)
+            if asin in seen_asins:
+                continue
+            seen_asins.add(asin)
+
+            entry = self.entries.get(asin)
+            if entry is None or (entry[0] != "done" and entry[1] < self.max_attempts):
+                pending_URLs.append(URL)
+
+        return pending_URLs
+
+    def record_done(self, URL):
+        """records a page scraped successfully
+
+        Parameters
+        ----------
+        URL : str
+            the URL of an Amazon product web page
+        """
+
+        asin = get_product_key(URL)
+        entry = self.entries.get(asin)
+        self._append(asin, "done", entry[1] if entry is not None else 0)
+
+    def record_failure(self, URL, error):
+        """records a failed page, which is skipped once it failed max_attempts times
+
+        Parameters
+        ----------
+        URL : str
+            the URL of an Amazon product web page
+        error : str
+            the description of the failure
+
+        Returns
+        -------
+        str
+            the new status of the page, failed or skipped
+        """
+
+        asin = get_product_key(URL)
+        entry = self.entries.get(asin)
+        attempts = (entry[1] if entry is not None else 0) + 1
+        status = "skipped" if attempts >= self.max_attempts else "failed"
+        error = ' '.join(str(error).split())[:MAX_ERROR_LENGTH]
+
+        self._append(asin, status, attempts, error)
+
+        return status
+
+    def get_stats(self):
+        """returns the number of pages of each status
+
+        Returns
+        -------
+        dict
+            the number of done, failed and skipped pages
+        """
+
+        stats = {status: 0 for status in CHECKPOINT_STATUSES}
+        for status, _, _ in list(self.entries.values()):
+            stats[status] += 1
+
+        return stats
+
+    def _compact(self):
+        if self._fh is not None:
+            self._fh.close()
+
+        tmp_path = self.journal_path.with_suffix(self.journal_path.suffix + '.tmp')
+        with tmp_path.open('w') as fh:
+            fh.writelines(self._format_line(asin, *entry) for asin, entry in self.entries.items())
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, self.journal_path)
+        self._num_lines = len(self.entries)
+
+        self._open()
+
+    def compact(self):
+        """rewrites the journal with the latest line of each ASIN only
+        """
+
+        with self._lock:
+            self._compact()
+
+    def close(self):
+        """syncs the journal to disk and closes it
+        """
+
+        with self._lock:
+            if self._fh is None:
+                return
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self._fh.close()
+            self._fh = None
+
+
+def resume_from_checkpoint(checkpoint, URLs):
+    """filters the URLs of a batch with its checkpoint journal and prints what is resumed
+
+    Parameters
+    ----------
+    checkpoint : CheckpointJournal
+        the checkpoint journal of the batch
+    URLs : iterable
+        the URLs of the batch
+
+    Returns
+    -------
+    list
+        the URLs still to be scraped
+    """
+
+    URLs = list(URLs)
+    pending_URLs = checkpoint.get_pending(URLs)
+
+    if len(pending_URLs) < len(URLs):
+        num_retries = sum(1 for URL in pending_URLs if get_product_key(URL) in checkpoint.entries)
+        print(f'resuming from {checkpoint.journal_path}: {len(URLs) - len(pending_URLs)} pages done, skipped or duplicated, '
+              f'{len(pending_URLs)} pages to scrape ({num_retries} retries of failed pages)')
+
+    return pending_URLs
+
+
+def create_checkpoint_journal(args):
+    """creates the checkpoint journal requested in args
+
+    Parameters
+    ----------
+    args : namedtuple
+        the namespace variable that contains the config for the batch
+
+    Returns
+    -------
+    CheckpointJournal
+        the checkpoint journal of the batch, or None if the checkpoints are disabled
+    """
+
+    if not args.checkpoint_enabled:
+        return None
+
+    return CheckpointJournal(args.checkpoint_path, args.checkpoint_max_attempts, args.checkpoint_compact_interval, args.fsync_interval)
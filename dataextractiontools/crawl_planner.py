@@ -0,0 +1,261 @@
+import re
+import threading
+
+from dataextractiontools.metrics import get_metrics
+from dataextractiontools.utils import URL_ASIN_PATTERN, get_asin, get_site, to_product_URL
+
+
+# the marketplaces of Amazon, by the domain following "amazon." in their host
+MARKETPLACES = (
+    "com", "ca", "com.mx", "com.br", "co.uk", "de", "fr", "it", "es", "nl", "se", "pl", "com.be", "com.tr", "ae", "sa",
+    "eg", "in", "co.jp", "sg", "com.au",
+)
+
+DEFAULT_MARKETPLACE_URL_TEMPLATE = "https://www.amazon.{marketplace}/dp/{asin}/"
+
+# the variant ASINs in the twister of a product web page, i.e. its selector of colors, sizes and styles: the keys of
+# the display data of the variants in its script, and the attributes of the swatches
+VARIANT_DISPLAY_DATA_PATTERN = re.compile(r'"dimensionValuesDisplayData"\s*:\s*\{([^{}]*)\}')
+VARIANT_DISPLAY_DATA_KEY_PATTERN = re.compile(r'"([A-Z0-9]{10})"\s*:')
+VARIANT_SWATCH_PATTERN = re.compile(r'data-(?:defaultasin="|dp-url="[^"]*/(?:dp|gp/product)/)([A-Z0-9]{10})')
+
+
+def find_variant_asins(page_source):
+    """returns the ASINs of the variants of a product listed in the twister of its web page
+
+    The page source is searched with regular expressions, so the variants are found without parsing the page.
+
+    Parameters
+    ----------
+    page_source : str
+        the page source of an Amazon product web page
+
+    Returns
+    -------
+    list
+        the ASINs of the variants, the product itself included, without duplicates, in their order in the page
+    """
+
+    asins = []
+    for display_data in VARIANT_DISPLAY_DATA_PATTERN.findall(page_source):
+        asins.extend(VARIANT_DISPLAY_DATA_KEY_PATTERN.findall(display_data))
+    asins.extend(VARIANT_SWATCH_PATTERN.findall(page_source))
+
+    return list(dict.fromkeys(asins))
+
+
+def replace_asin(URL, asin):
+    """returns the URL of another product on the same marketplace, by replacing the ASIN of a product URL
+
+    Parameters
+    ----------
+    URL : str
+        the URL of an Amazon product web page
+    asin : str
+        the ASIN of the other product
+
+    Returns
+    -------
+    str
+        the URL of the other product, with the host, the path prefix and the query of the original URL
+    """
+
+    match = URL_ASIN_PATTERN.search(URL)
+
+    return URL[:match.start(1)] + asin + URL[match.end(1):]
+
+
+def parse_marketplaces(marketplaces):
+    """parses a comma-separated list of marketplaces
+
+    Parameters
+    ----------
+    marketplaces : str
+        the comma-separated marketplaces, e.g. "com,co.uk,de,co.jp"
+
+    Returns
+    -------
+    list
+        the marketplaces, without duplicates, in their order
+    """
+
+    marketplaces = list(dict.fromkeys(marketplace.strip().lower().lstrip('.') for marketplace in marketplaces.split(',') if marketplace.strip()))
+    unknown_marketplaces = [marketplace for marketplace in marketplaces if marketplace not in MARKETPLACES]
+    if unknown_marketplaces:
+        raise ValueError(f'unknown marketplaces: {", ".join(unknown_marketplaces)}, the marketplaces are {", ".join(MARKETPLACES)}')
+
+    return marketplaces
+
+
+class CrawlPlanner():
+    """An ASIN-centric planner which expands the products of a batch into the pages of a single crawl
+
+    Each product of the batch, given by its ASIN or its URL, is expanded into its product page on each marketplace.
+    With variant discovery, the variants listed in the twister of each downloaded page, e.g. the other colors and sizes
+    of the product, are added to the crawl on the marketplace of the page, as the variants of a product differ between
+    marketplaces. The discovered variants are scheduled with the pages of the batch, so they share the fetchers, the
+    rate limits and the parse workers of the crawl. Every page is planned once, by ASIN and marketplace, however often
+    it is listed or discovered.
+
+    ...
+
+    Attributes
+    ----------
+    marketplaces : list
+        the marketplaces of the pages of each product, or None to keep the URLs of the batch
+    URL_template : str
+        the template of the URL of a product page, formatted with the marketplace and the ASIN
+    variants_enabled : bool
+        add the variants found in the downloaded pages to the crawl
+    max_variants_per_page : int
+        the maximum number of variants added per downloaded page, 0 does not limit them
+    num_planned_pages : int
+        the number of pages planned, the discovered variants included
+    num_discovered_variants : int
+        the number of pages of variants added to the crawl
+    num_duplicates : int
+        the number of pages of the batch dropped as already planned
+
+    Methods
+    -------
+    plan(URLs)
+        expands the products of a batch into the pages to crawl
+    discover(URL, page_source)
+        returns the pages of the variants of a downloaded page which are not planned yet
+    report()
+        prints the number of planned pages
+    """
+
+    def __init__(self, marketplaces=None, URL_template=DEFAULT_MARKETPLACE_URL_TEMPLATE, variants_enabled=False, max_variants_per_page=100):
+        """
+        Parameters
+        ----------
+        marketplaces : list, optional
+            the marketplaces of the pages of each product, None keeps the URLs of the batch
+        URL_template : str
+            the template of the URL of a product page, formatted with the marketplace and the ASIN
+        variants_enabled : bool
+            add the variants found in the downloaded pages to the crawl
+        max_variants_per_page : int
+            the maximum number of variants added per downloaded page, 0 does not limit them
+        """
+
+        self.marketplaces = marketplaces
+        self.URL_template = URL_template
+        self.variants_enabled = variants_enabled
+        self.max_variants_per_page = max_variants_per_page
+
+        self.num_planned_pages = 0
+        self.num_discovered_variants = 0
+        self.num_duplicates = 0
+
+        # the (ASIN, marketplace) keys of the planned pages, and the key of each planned URL, shared by the threads
+        # downloading the pages. The marketplace is the one the page is planned on, as the URL template may not be on
+        # an Amazon host, e.g. a mirror, so the marketplace cannot be read from the host of the URL.
+        self._planned_keys = set()
+        self._URL_keys = {}
+        self._lock = threading.Lock()
+
+    def _add(self, pages, source, max_new_URLs=0):
+        new_URLs = []
+        with self._lock:
+            for key, URL in pages:
+                if key in self._planned_keys:
+                    if source == 'input':
+                        self.num_duplicates += 1
+                    continue
+                if max_new_URLs > 0 and len(new_URLs) >= max_new_URLs:
+                    break
+                self._planned_keys.add(key)
+                self._URL_keys[URL] = key
+                new_URLs.append(URL)
+
+            self.num_planned_pages += len(new_URLs)
+            if source == 'variant':
+                self.num_discovered_variants += len(new_URLs)
+
+        get_metrics().increment('planned_pages', len(new_URLs), source=source)
+
+        return new_URLs
+
+    def _expand(self, URL):
+        URL = to_product_URL(URL)
+        asin = get_asin(URL)
+        if asin is None:
+            return [((URL, None), URL)]
+        if self.marketplaces is None:
+            return [((asin, get_site(URL)), URL)]
+
+        return [((asin, marketplace), self.URL_template.format(marketplace=marketplace, asin=asin)) for marketplace in self.marketplaces]
+
+    def plan(self, URLs):
+        """expands the products of a batch into the pages to crawl
+
+        Parameters
+        ----------
+        URLs : iterable
+            the URLs or the ASINs of the Amazon product web pages of the batch
+
+        Returns
+        -------
+        list
+            the URLs of the pages of the products on each marketplace, without duplicates, in the order of the batch
+        """
+
+        return self._add((expanded_URL for URL in URLs for expanded_URL in self._expand(URL)), 'input')
+
+    def discover(self, URL, page_source):
+        """returns the pages of the variants of a downloaded page which are not planned yet
+
+        Parameters
+        ----------
+        URL : str
+            the URL of a downloaded Amazon product web page
+        page_source : str
+            the page source of the web page
+
+        Returns
+        -------
+        list
+            the URLs of the pages of the new variants, on the marketplace of the downloaded page
+        """
+
+        asin = get_asin(URL)
+        if not self.variants_enabled or asin is None:
+            return []
+
+        with self._lock:
+            _, marketplace = self._URL_keys.get(URL) or (asin, get_site(URL))
+        variant_pages = [((variant_asin, marketplace), replace_asin(URL, variant_asin)) for variant_asin in find_variant_asins(page_source) if variant_asin != asin]
+
+        return self._add(variant_pages, 'variant', self.max_variants_per_page)
+
+    def report(self):
+        """prints the number of planned pages
+        """
+
+        num_marketplaces = len(self.marketplaces) if self.marketplaces is not None else 1
+        print(f'planned {self.num_planned_pages} pages on {num_marketplaces} marketplaces, {self.num_discovered_variants} '
+              f'of them discovered variants, {self.num_duplicates} duplicates dropped')
+
+
+def create_crawl_planner(args):
+    """creates the crawl planner requested in args
+
+    Parameters
+    ----------
+    args : namedtuple
+        the namespace variable that contains the config for the batch
+
+    Returns
+    -------
+    CrawlPlanner
+        the planner of the batch, or None if neither the marketplaces nor the variants are requested
+    """
+
+    if args.marketplaces is None and not args.variants_enabled:
+        return None
+
+    marketplaces = parse_marketplaces(args.marketplaces) if args.marketplaces is not None else None
+
+    return CrawlPlanner(marketplaces, args.marketplace_URL_template, args.variants_enabled, args.max_variants_per_page)
@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dataextractiontools.browser_profile import create_browser_profile
+from dataextractiontools.metrics import get_metrics
+from dataextractiontools.output_sinks import OUTPUT_NAMES, get_output_sink, make_record
+from dataextractiontools.parsing_stage import create_scraper
+from dataextractiontools.webdriver_pool import WebDriverPool
+from dataextractiontools.work_queue import create_work_queue
+
+
+class DistributedWorker():
+    """A worker of the distributed crawl, which scrapes the products leased from a work queue shared with other workers
+
+    Each thread of the worker leases a task, scrapes it with the extract(URL) flow of the scrapers, and acks it with
+    its record, or nacks it when the scraping fails. Only the records stored first in the work queue are dumped, so a
+    product scraped twice, e.g. after its lease expired, is only dumped once per fetch epoch.
+
+    ...
+
+    Attributes
+    ----------
+    args : namedtuple
+        the arguments pre-defined by the user and imported from config.py
+    info_type : str
+        the type of information for extraction
+    work_queue : WorkQueue
+        the broker shared by the workers
+    worker_id : str
+        the identifier of the worker, its host and process id
+    queue_wait : float
+        the time in seconds the worker waits for new tasks once the queue is empty, 0 stops the worker at once
+    driver_pool : WebDriverPool
+        the pool of webdrivers shared by the threads of the worker
+    num_scraped_pages : int
+        the number of tasks acked
+    num_duplicates : int
+        the number of records dropped as duplicates
+    num_failures : int
+        the number of tasks nacked
+
+    Methods
+    -------
+    create_scraper()
+        creates a scraper for the requested info type which neither displays nor dumps the extracted info
+    process(task)
+        scrapes the product of a leased task and acks or nacks it
+    report(elapsed_time)
+        prints the throughput of the worker and the state of the work queue
+    run()
+        processes the tasks of the work queue until no task is queued or leased
+    """
+
+    # the interval in seconds at which an idle thread polls the work queue
+    _poll_interval = 1.0
+
+    def __init__(self, args, work_queue=None):
+        """
+        Parameters
+        ----------
+        args : namedtuple
+            the namespace variable that contains the config for the crawl
+        work_queue : WorkQueue, optional
+            the broker shared by the workers, created according to args if None
+        """
+
+        self.args = args
+        self.info_type = args.info_type
+        self.work_queue = work_queue or create_work_queue(args)
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.queue_wait = args.queue_wait
+        self.driver_pool = WebDriverPool(args.num_drivers, args.driver_max_pages, create_browser_profile(args))
+
+        self.num_scraped_pages = 0
+        self.num_duplicates = 0
+        self.num_failures = 0
+
+        self._lock = threading.Lock()
+        self._thread_local = threading.local()
+
+    def create_scraper(self):
+        """creates a scraper for the requested info type which neither displays nor dumps the extracted info
+
+        The records are only displayed and dumped once they are deduplicated by the work queue.
+
+        Returns
+        -------
+        AmazonTabularInfoExtraction, AmazonTextualInfoExtraction or AmazonProductInfoExtraction
+            a scraper for the requested info type
+        """
+
+        args = argparse.Namespace(**vars(self.args))
+        args.verbosity_enabled = False
+        args.dump_info_enabled = False
+
+        return create_scraper(args, self.driver_pool)
+
+    def process(self, task):
+        """scrapes the product of a leased task and acks or nacks it
+
+        Parameters
+        ----------
+        task : dict
+            a task leased from the work queue
+        """
+
+        scraper = getattr(self._thread_local, 'scraper', None)
+        if scraper is None:
+            scraper = self._thread_local.scraper = self.create_scraper()
+
+        metrics = get_metrics()
+
+        try:
+            info_dict = scraper.extract(task['URL'])
+        except Exception as e:
+            print(f'failed to scrape {task["URL"]} (attempt {task["attempt"]}): {e!r}')
+            self.work_queue.nack(task, repr(e))
+            with self._lock:
+                self.num_failures += 1
+            metrics.increment('pages', status='failed')
+            return
+
+        record = make_record(task['URL'], info_dict)
+        record['epoch'] = task['epoch']
+
+        if not self.work_queue.ack(task, record):
+            with self._lock:
+                self.num_duplicates += 1
+            metrics.increment('pages', status='duplicate')
+            return
+
+        with self._lock:
+            self.num_scraped_pages += 1
+        metrics.increment('pages', status='scraped')
+
+        if self.args.verbosity_enabled:
+            print(f'{task["URL"]}:')
+            print(json.dumps(info_dict, indent=4))
+        if self.args.dump_info_enabled:
+            get_output_sink(self.args, OUTPUT_NAMES[self.info_type]).write(record)
+
+    def _work(self):
+        idle_since = None
+        while True:
+            tasks = self.work_queue.lease(self.worker_id)
+            if not tasks:
+                # the pages leased by the other workers are leased again if their workers crash
+                if self.work_queue.get_stats()['leased'] > 0:
+                    time.sleep(self._poll_interval)
+                    continue
+                idle_since = idle_since or time.monotonic()
+                if time.monotonic() - idle_since >= self.queue_wait:
+                    return
+                time.sleep(self._poll_interval)
+                continue
+
+            idle_since = None
+            for task in tasks:
+                self.process(task)
+
+    def report(self, elapsed_time):
+        """prints the throughput of the worker and the state of the work queue
+
+        Parameters
+        ----------
+        elapsed_time : float
+            the wall-clock time of the worker in seconds
+        """
+
+        pages_per_second = self.num_scraped_pages / elapsed_time if elapsed_time > 0 else 0.0
+        stats = self.work_queue.get_stats()
+        print(f'worker {self.worker_id} scraped {self.num_scraped_pages} pages ({self.num_failures} failed, '
+              f'{self.num_duplicates} duplicates) in {elapsed_time:.1f}s: {pages_per_second:.2f} pages/second')
+        print(f'work queue: {stats["queued"]} queued, {stats["leased"]} leased, {stats["done"]} done, {stats["failed"]} failed')
+
+    def run(self):
+        """processes the tasks of the work queue until no task is queued or leased
+        """
+
+        start_time = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.driver_pool.num_drivers) as executor:
+                for future in [executor.submit(self._work) for _ in range(self.driver_pool.num_drivers)]:
+                    future.result()
+        finally:
+            self.driver_pool.close()
+
+        self.report(time.perf_counter() - start_time)
+        self.work_queue.close()
@@ -0,0 +1,251 @@
+from dataextractiontools.browser_profile import BrowserProfile, create_browser_profile
+from dataextractiontools.metrics import get_metrics
+
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:109.0) Gecko/20100101 Firefox/115.0",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+}
+
+
+# markers of the robot check page served by Amazon instead of the product web page
+CAPTCHA_MARKERS = [
+    "/errors/validateCaptcha",
+    "Type the characters you see in this image",
+]
+
+
+def is_captcha_page(page_source):
+    """checks if a page source is the robot check page of Amazon
+
+    Parameters
+    ----------
+    page_source : str
+        the page source of a web page
+
+    Returns
+    -------
+    bool
+        True if the page is a captcha page
+    """
+
+    return any(marker in page_source for marker in CAPTCHA_MARKERS)
+
+
+class PageFetchError(Exception):
+    """raised when a fetcher can not download a web page
+
+    Attributes
+    ----------
+    URL : str
+        the URL of the web page
+    status_code : int
+        the HTTP status code of the response, or None when no response was received
+    """
+
+    def __init__(self, URL, status_code=None, message=''):
+        self.URL = URL
+        self.status_code = status_code
+        super().__init__(f'failed to fetch {URL} (status code: {status_code}) {message}'.strip())
+
+
+class PageFetcher():
+    """The interface of the backends used by PageAcquisition to download web pages
+
+    Methods
+    -------
+    fetch(URL)
+        downloads a web page and returns its page source
+    fetch_if_modified(URL, validators)
+        downloads a web page unless it did not change since the download which returned the validators
+    close()
+        releases the resources held by the fetcher
+    """
+
+    def fetch(self, URL):
+        """downloads a web page and returns its page source
+
+        Parameters
+        ----------
+        URL : str
+            the URL of a web page
+
+        Returns
+        -------
+        str
+            the page source of the web page
+        """
+
+        raise NotImplementedError
+
+    def fetch_if_modified(self, URL, validators):
+        """downloads a web page unless it did not change since the download which returned the validators
+
+        The backends which can not send conditional requests always download the page.
+
+        Parameters
+        ----------
+        URL : str
+            the URL of a web page
+        validators : dict
+            the etag and last_modified validators returned by a previous download of the page, or an empty dict
+
+        Returns
+        -------
+        tuple
+            the page source of the web page, or None if it did not change, and the validators of the download
+        """
+
+        return self.fetch(URL), dict()
+
+    def close(self):
+        """releases the resources held by the fetcher
+        """
+
+        pass
+
+
+class HTTPFetcher(PageFetcher):
+    """A fetcher which downloads the server-rendered HTML with a plain HTTP client
+
+    The connections are kept alive and pooled by a requests.Session, so consecutive pages from the same host reuse
+    the same TCP/TLS connection.
+
+    ...
+
+    Attributes
+    ----------
+    timeout : float
+        the timeout of a request in seconds
+    session : requests.Session
+        the HTTP session holding the pool of keep-alive connections
+    """
+
+    def __init__(self, pool_size=10, timeout=30):
+        """
+        Parameters
+        ----------
+        pool_size : int
+            the maximum number of keep-alive connections kept per host
+        timeout : float
+            the timeout of a request in seconds
+        """
+
+        # requests is only imported by the http backend
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _get(self, URL, headers=None):
+        import requests
+
+        try:
+            with get_metrics().timer('http_request'):
+                return self.session.get(URL, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise PageFetchError(URL, message=repr(e)) from e
+
+    def fetch(self, URL):
+        response = self._get(URL)
+        if response.status_code != 200:
+            raise PageFetchError(URL, response.status_code)
+
+        return response.text
+
+    def fetch_if_modified(self, URL, validators):
+        headers = dict()
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+
+        response = self._get(URL, headers)
+        if response.status_code == 304:
+            return None, validators
+        if response.status_code != 200:
+            raise PageFetchError(URL, response.status_code)
+
+        return response.text, {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        }
+
+    def close(self):
+        self.session.close()
+
+
+class SeleniumFetcher(PageFetcher):
+    """A fetcher which renders the web page with Firefox
+
+    ...
+
+    Attributes
+    ----------
+    driver_pool : WebDriverPool
+        a pool of long-lived webdrivers to download the pages with, or None to start a new webdriver for each page
+    browser_profile : BrowserProfile
+        the profile of the webdriver started for each page when there is no pool
+    """
+
+    def __init__(self, driver_pool=None, browser_profile=None):
+        """
+        Parameters
+        ----------
+        driver_pool : WebDriverPool, optional
+            a pool of long-lived webdrivers to download the pages with, a new webdriver is started for each page if None
+        browser_profile : BrowserProfile, optional
+            the profile of the webdriver started for each page when there is no pool, the default profile if None
+        """
+
+        self.driver_pool = driver_pool
+        self.browser_profile = browser_profile or BrowserProfile("default")
+
+    def fetch(self, URL):
+        if self.driver_pool is not None:
+            return self.driver_pool.get_page_source(URL)
+
+        metrics = get_metrics()
+
+        with metrics.timer('browser_startup'):
+            driver = self.browser_profile.create_driver()
+        try:
+            with metrics.timer('navigation'):
+                return self.browser_profile.load_page(driver, URL)
+        finally:
+            # quit, unlike close, also stops geckodriver and Firefox, even when the navigation failed
+            driver.quit()
+
+
+def create_fetcher(fetch_backend, args, driver_pool=None):
+    """creates the fetcher of a backend
+
+    Parameters
+    ----------
+    fetch_backend : str
+        the name of the backend, http or selenium
+    args : namedtuple
+        the namespace variable that contains the config for the scraper
+    driver_pool : WebDriverPool, optional
+        a pool of long-lived webdrivers used by the selenium backend
+
+    Returns
+    -------
+    PageFetcher
+        the fetcher of the backend
+    """
+
+    if fetch_backend == "http":
+        return HTTPFetcher(args.http_pool_size, args.http_timeout)
+
+    if fetch_backend == "selenium":
+        return SeleniumFetcher(driver_pool, create_browser_profile(args))
+
+    raise ValueError(f'unknown fetch backend: {fetch_backend}')
@@ -0,0 +1,462 @@
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+
+from dataextractiontools.browser_profile import create_browser_profile
+from dataextractiontools.metrics import get_metrics
+from dataextractiontools.output_sinks import OUTPUT_NAMES, close_output_sinks, get_output_sink, make_record
+from dataextractiontools.page_acquisition import PageAcquisition
+from dataextractiontools.parsing_stage import extract_info_from_page_source
+from dataextractiontools.utils import BEST_SELLERS_RANK_KEYS, get_best_sellers_rank, get_product_key
+from dataextractiontools.webdriver_pool import WebDriverPool
+
+
+# the sections of the extracted info which are fingerprinted, the others, e.g. the detected layout, are derived from them
+FINGERPRINTED_SECTIONS = [
+    'product_detail_table',
+    'product_overview_table',
+    'title',
+    'bullet_points',
+    'product_description',
+]
+
+# the weight of the latest check in the exponential moving averages of the change rate and of the rank volatility
+VOLATILITY_SMOOTHING = 0.3
+
+
+def fingerprint_sections(info_dict):
+    """computes a fingerprint of each section of the info extracted from a product web page
+
+    Parameters
+    ----------
+    info_dict : dict
+        the info extracted from the page
+
+    Returns
+    -------
+    dict
+        the sha256 digest of the canonical json of each extracted section
+    """
+
+    fingerprints = dict()
+    for section in FINGERPRINTED_SECTIONS:
+        if section not in info_dict:
+            continue
+        value = info_dict[section]
+        if section == 'product_detail_table' and isinstance(value, dict):
+            # the Best Sellers Rank moves almost daily, it is tracked by the rank volatility instead
+            value = {key: entry for key, entry in value.items() if key not in BEST_SELLERS_RANK_KEYS}
+        fingerprints[section] = hashlib.sha256(json.dumps(value, sort_keys=True).encode()).hexdigest()
+
+    return fingerprints
+
+
+def get_best_sellers_ranks(info_dict):
+    """returns the Best Sellers Rank of a product in each of its categories
+
+    Parameters
+    ----------
+    info_dict : dict
+        the info extracted from the page
+
+    Returns
+    -------
+    dict
+        the rank of each category, empty if the product detail table has no Best Sellers Rank
+    """
+
+    return {category: rank for rank, category in get_best_sellers_rank(info_dict.get('product_detail_table', dict()))}
+
+
+def get_rank_volatility(old_ranks, new_ranks):
+    """measures how much the Best Sellers Rank of a product moved between two checks
+
+    Parameters
+    ----------
+    old_ranks : dict
+        the rank of each category at the previous check
+    new_ranks : dict
+        the rank of each category at the latest check
+
+    Returns
+    -------
+    float
+        the mean absolute log ratio of the ranks of the categories of both checks, 0 if they have none in common
+    """
+
+    categories = [category for category in new_ranks if category in old_ranks and old_ranks[category] > 0 and new_ranks[category] > 0]
+    if not categories:
+        return 0.0
+
+    return sum(abs(math.log(new_ranks[category] / old_ranks[category])) for category in categories) / len(categories)
+
+
+class CrawlState():
+    """The per-ASIN state of the incremental re-crawl: validators, fingerprints and volatility of each product
+
+    The state is an append-only json lines file with one entry per check of an ASIN, so a crash never loses the
+    checks already done. Only the latest entry of each ASIN is kept when the file is loaded, and the file is compacted
+    when it holds too many outdated entries.
+
+    ...
+
+    Attributes
+    ----------
+    state_path : os.PathLike
+        the path of the json lines file of the state
+    entries : dict
+        the latest entry of each ASIN
+
+    Methods
+    -------
+    get(URL)
+        returns the latest entry of the ASIN of a URL
+    update(URL, **fields)
+        records a check of the ASIN of a URL
+    get_priority(entry, now=None)
+        returns the priority of the re-crawl of an ASIN
+    prioritize(URLs, now=None)
+        sorts URLs from the most to the least urgent re-crawl
+    compact()
+        rewrites the state file with the latest entry of each ASIN only
+    """
+
+    def __init__(self, state_path):
+        """
+        Parameters
+        ----------
+        state_path : os.PathLike
+            the path of the json lines file of the state
+        """
+
+        self.state_path = Path(state_path)
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._num_lines = 0
+        self.entries = self._load()
+
+        if self._num_lines > 2 * len(self.entries):
+            self.compact()
+
+    def _load(self):
+        entries = dict()
+        if not self.state_path.exists():
+            return entries
+
+        with self.state_path.open() as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # the last line may be truncated by a crash
+                    continue
+                entries[entry['asin']] = entry
+                self._num_lines += 1
+
+        return entries
+
+    def get(self, URL):
+        """returns the latest entry of the ASIN of a URL
+
+        Parameters
+        ----------
+        URL : str
+            the URL of an Amazon product web page
+
+        Returns
+        -------
+        dict
+            the entry, or None if the ASIN was never checked
+        """
+
+        return self.entries.get(get_product_key(URL))
+
+    def update(self, URL, **fields):
+        """records a check of the ASIN of a URL
+
+        Parameters
+        ----------
+        URL : str
+            the URL of an Amazon product web page
+        fields
+            the fields of the entry of the ASIN changed by the check
+
+        Returns
+        -------
+        dict
+            the updated entry
+        """
+
+        asin = get_product_key(URL)
+
+        with self._lock:
+            entry = dict(self.entries.get(asin) or {'asin': asin})
+            entry['URL'] = URL
+            entry.update(fields)
+            self.entries[asin] = entry
+
+            with self.state_path.open('a') as fh:
+                fh.write(json.dumps(entry) + '\n')
+            self._num_lines += 1
+
+        return entry
+
+    @staticmethod
+    def get_priority(entry, now=None):
+        """returns the priority of the re-crawl of an ASIN
+
+        The priority is the number of days since the last check, weighted up by the rate at which the fingerprints of
+        the product changed and by the volatility of its Best Sellers Rank.
+
+        Parameters
+        ----------
+        entry : dict
+            the entry of the ASIN, or None if it was never checked
+        now : float, optional
+            the current time as a unix timestamp, the current time if None
+
+        Returns
+        -------
+        float
+            the priority, infinite for the ASINs never checked
+        """
+
+        if entry is None or 'checked_at' not in entry:
+            return math.inf
+
+        now = time.time() if now is None else now
+        staleness = (now - entry['checked_at']) / 86400
+
+        return staleness * (1 + entry.get('change_rate', 0.0) + entry.get('rank_volatility', 0.0))
+
+    def prioritize(self, URLs, now=None):
+        """sorts URLs from the most to the least urgent re-crawl
+
+        Parameters
+        ----------
+        URLs : list
+            the URLs of Amazon product web pages
+        now : float, optional
+            the current time as a unix timestamp, the current time if None
+
+        Returns
+        -------
+        list
+            the URLs, the most urgent first
+        """
+
+        now = time.time() if now is None else now
+
+        return sorted(URLs, key=lambda URL: self.get_priority(self.get(URL), now), reverse=True)
+
+    def compact(self):
+        """rewrites the state file with the latest entry of each ASIN only
+        """
+
+        with self._lock:
+            tmp_path = self.state_path.with_suffix(self.state_path.suffix + '.tmp')
+            with tmp_path.open('w') as fh:
+                for entry in self.entries.values():
+                    fh.write(json.dumps(entry) + '\n')
+            os.replace(tmp_path, self.state_path)
+            self._num_lines = len(self.entries)
+
+
+class IncrementalCrawler():
+    """A class used to re-crawl a catalog of Amazon product web pages and only emit the products which changed
+
+    Each page is downloaded with a conditional request when the fetch backend supports it, so a page which did not
+    change is neither downloaded nor parsed. A downloaded page identical to the previous one is not parsed either.
+    Otherwise the sections of the extracted info are fingerprinted, and the product is only emitted if at least one of
+    them changed. The most stale and volatile ASINs are re-crawled first.
+
+    ...
+
+    Attributes
+    ----------
+    args : namedtuple
+        the arguments pre-defined by the user and imported from config.py
+    info_type : str
+        the type of information for extraction
+    crawl_state : CrawlState
+        the per-ASIN state of the re-crawl
+    recrawl_max_pages : int
+        the number of pages re-crawled per run, the most urgent ones, 0 re-crawls all of them
+    driver_pool : WebDriverPool
+        the pool of webdrivers used by the Selenium backend and fallback
+    num_checked_pages : int
+        the number of pages checked successfully
+    num_changed_pages : int
+        the number of pages emitted because they changed
+    failed_URLs : list
+        the URLs whose check failed
+
+    Methods
+    -------
+    check(URL)
+        re-crawls a single Amazon product web page and emits it if it changed
+    report(elapsed_time)
+        prints the number of checked and changed pages
+    run(URLs)
+        re-crawls the most urgent Amazon product web pages
+    """
+
+    def __init__(self, args):
+        """
+        Parameters
+        ----------
+        args : namedtuple
+            the namespace variable that contains the config for the scraper
+        """
+
+        self.args = args
+        self.info_type = args.info_type
+        self.crawl_state = CrawlState(args.crawl_state_path)
+        self.recrawl_max_pages = args.recrawl_max_pages
+        self.driver_pool = WebDriverPool(args.num_drivers, args.driver_max_pages, create_browser_profile(args))
+
+        self.num_checked_pages = 0
+        self.num_changed_pages = 0
+        self.failed_URLs = []
+
+        self._lock = threading.Lock()
+        self._thread_local = threading.local()
+
+    def _get_page_acquisition(self):
+        page_acquisition = getattr(self._thread_local, 'page_acquisition', None)
+        if page_acquisition is None:
+            page_acquisition = self._thread_local.page_acquisition = PageAcquisition(self.args, self.driver_pool)
+
+        return page_acquisition
+
+    def check(self, URL):
+        """re-crawls a single Amazon product web page and emits it if it changed
+
+        Parameters
+        ----------
+        URL : str
+            the URL of a Amazon product web page
+
+        Returns
+        -------
+        str
+            not_modified, same_page, unchanged or changed
+        """
+
+        entry = self.crawl_state.get(URL) or dict()
+        checked_at = time.time()
+
+        page_source, validators = self._get_page_acquisition().acquire_page_source_if_modified(URL, entry.get('validators') or dict())
+        if page_source is None:
+            self._record_check(URL, entry, checked_at, changed=False)
+            return 'not_modified'
+
+        page_digest = hashlib.sha256(page_source.encode()).hexdigest()
+        if page_digest == entry.get('page_digest'):
+            self._record_check(URL, entry, checked_at, changed=False, validators=validators)
+            return 'same_page'
+
+        info_dict = extract_info_from_page_source(self.args, URL, page_source)
+        fingerprints = fingerprint_sections(info_dict)
+        old_fingerprints = entry.get('fingerprints') or dict()
+        changed_sections = [section for section, fingerprint in fingerprints.items() if old_fingerprints.get(section) != fingerprint]
+
+        ranks = get_best_sellers_ranks(info_dict)
+        rank_volatility = get_rank_volatility(entry.get('best_sellers_ranks') or dict(), ranks)
+
+        record_check = partial(self._record_check, URL, entry, checked_at, changed=bool(changed_sections), validators=validators,
+                               page_digest=page_digest, fingerprints=fingerprints, best_sellers_ranks=ranks, rank_volatility=rank_volatility)
+        if not changed_sections:
+            record_check()
+            return 'unchanged'
+
+        info_dict['changed_sections'] = changed_sections
+        if self.args.verbosity_enabled:
+            print(f'{URL}:')
+            print(json.dumps(info_dict, indent=4))
+        if self.args.dump_info_enabled:
+            # the new fingerprints are only recorded once the change is written, so a lost record is emitted again
+            get_output_sink(self.args, OUTPUT_NAMES[self.info_type]).write(make_record(URL, info_dict), record_check)
+        else:
+            record_check()
+
+        return 'changed'
+
+    def _record_check(self, URL, entry, checked_at, changed, rank_volatility=None, **fields):
+        change_rate = (1 - VOLATILITY_SMOOTHING) * entry.get('change_rate', 0.0) + VOLATILITY_SMOOTHING * changed
+        if rank_volatility is None:
+            rank_volatility = entry.get('rank_volatility', 0.0)
+        else:
+            rank_volatility = (1 - VOLATILITY_SMOOTHING) * entry.get('rank_volatility', 0.0) + VOLATILITY_SMOOTHING * rank_volatility
+
+        self.crawl_state.update(
+            URL,
+            checked_at=checked_at,
+            changed_at=checked_at if changed else entry.get('changed_at'),
+            change_rate=change_rate,
+            rank_volatility=rank_volatility,
+            **fields,
+        )
+
+    def _check(self, URL):
+        try:
+            status = self.check(URL)
+        except Exception as e:
+            print(f'failed to check {URL}: {e!r}')
+            with self._lock:
+                self.failed_URLs.append(URL)
+            get_metrics().increment('pages', status='failed')
+            return
+
+        with self._lock:
+            self.num_checked_pages += 1
+            if status == 'changed':
+                self.num_changed_pages += 1
+        get_metrics().increment('pages', status=status)
+
+    def report(self, elapsed_time):
+        """prints the number of checked and changed pages
+
+        Parameters
+        ----------
+        elapsed_time : float
+            the wall-clock time of the re-crawl in seconds
+        """
+
+        print(f'checked {self.num_checked_pages} pages ({len(self.failed_URLs)} failed) in {elapsed_time:.1f}s: '
+              f'{self.num_changed_pages} changed')
+
+    def run(self, URLs):
+        """re-crawls the most urgent Amazon product web pages
+
+        Parameters
+        ----------
+        URLs : list
+            the URLs of the Amazon product web pages of the catalog
+        """
+
+        URLs = self.crawl_state.prioritize(URLs)
+        if self.recrawl_max_pages > 0:
+            URLs = URLs[:self.recrawl_max_pages]
+
+        start_time = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.driver_pool.num_drivers) as executor:
+                executor.map(self._check, URLs)
+        finally:
+            self.driver_pool.close()
+            # the buffered records are written first, so their checks are recorded
+            close_output_sinks()
+            self.crawl_state.compact()
+
+        self.report(time.perf_counter() - start_time)
@@ -0,0 +1,342 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+# the prefix of the names of the exported metrics
+METRIC_PREFIX = "attarii"
+
+# the escapes of the label values in the Prometheus text exposition format
+LABEL_VALUE_ESCAPES = str.maketrans({'\\': '\\\\', '"': '\\"', '\n': '\\n'})
+
+
+class Metrics():
+    """A thread-safe registry of the timers of the scraping stages and of the counters and gauges of the scrapers
+
+    The timers, the counters and the gauges are identified by a name and optional labels, e.g. the timer of the
+    extractor of the title is the stage timer extract with the label extractor="title". A timer keeps the number of
+    observations and their total duration, as a Prometheus summary without quantiles.
+
+    ...
+
+    Methods
+    -------
+    observe(stage, seconds, **labels)
+        records the duration of one run of a stage
+    timer(stage, **labels)
+        a context manager recording the duration of the block as one run of a stage
+    increment(name, amount=1, **labels)
+        increments a counter
+    set_gauge(name, value, **labels)
+        sets the current value of a gauge
+    snapshot()
+        returns a copy of the timers, the counters and the gauges
+    merge(snapshot)
+        adds the timers, the counters and the gauges of a snapshot, e.g. one sent back by a worker process
+    drain()
+        returns a snapshot and resets the timers and the counters
+    to_prometheus_text()
+        formats the timers, the counters and the gauges in the Prometheus text exposition format
+    format_stats()
+        formats the timers, the counters and the gauges as a human readable stats log
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (stage, labels) -> [count, total seconds]
+        self._timers = dict()
+        # (name, labels) -> count
+        self._counters = dict()
+        # (name, labels) -> value
+        self._gauges = dict()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def observe(self, stage, seconds, **labels):
+        """records the duration of one run of a stage
+
+        Parameters
+        ----------
+        stage : str
+            the name of the stage
+        seconds : float
+            the duration of the run in seconds
+        """
+
+        key = self._key(stage, labels)
+        with self._lock:
+            timer = self._timers.setdefault(key, [0, 0.0])
+            timer[0] += 1
+            timer[1] += seconds
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        """a context manager recording the duration of the block as one run of a stage
+
+        Parameters
+        ----------
+        stage : str
+            the name of the stage
+        """
+
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start_time, **labels)
+
+    def increment(self, name, amount=1, **labels):
+        """increments a counter
+
+        Parameters
+        ----------
+        name : str
+            the name of the counter
+        amount : int
+            the increment
+        """
+
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value, **labels):
+        """sets the current value of a gauge
+
+        Parameters
+        ----------
+        name : str
+            the name of the gauge
+        value : float
+            the current value
+        """
+
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def snapshot(self):
+        """returns a copy of the timers, the counters and the gauges
+
+        Returns
+        -------
+        dict
+            the timers, the counters and the gauges, made of plain tuples and numbers so that they can be sent between
+            processes
+        """
+
+        with self._lock:
+            return {
+                'timers': {key: tuple(timer) for key, timer in self._timers.items()},
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges),
+            }
+
+    def merge(self, snapshot):
+        """adds the timers, the counters and the gauges of a snapshot, e.g. one sent back by a worker process
+
+        Parameters
+        ----------
+        snapshot : dict
+            a snapshot of another registry
+        """
+
+        with self._lock:
+            for key, (count, seconds) in snapshot['timers'].items():
+                timer = self._timers.setdefault(key, [0, 0.0])
+                timer[0] += count
+                timer[1] += seconds
+            for key, count in snapshot['counters'].items():
+                self._counters[key] = self._counters.get(key, 0) + count
+            self._gauges.update(snapshot.get('gauges', dict()))
+
+    def drain(self):
+        """returns a snapshot and resets the timers and the counters
+
+        Returns
+        -------
+        dict
+            the timers and the counters recorded since the last drain, and the current values of the gauges
+        """
+
+        with self._lock:
+            snapshot = {
+                'timers': {key: tuple(timer) for key, timer in self._timers.items()},
+                'counters': self._counters,
+                'gauges': dict(self._gauges),
+            }
+            self._timers = dict()
+            self._counters = dict()
+
+        return snapshot
+
+    @staticmethod
+    def _format_labels(labels):
+        if not labels:
+            return ''
+
+        return '{' + ','.join(f'{label}="{str(value).translate(LABEL_VALUE_ESCAPES)}"' for label, value in labels) + '}'
+
+    def to_prometheus_text(self):
+        """formats the timers, the counters and the gauges in the Prometheus text exposition format
+
+        Returns
+        -------
+        str
+            the metrics, one sample per line
+        """
+
+        snapshot = self.snapshot()
+        lines = []
+
+        lines.append(f'# HELP {METRIC_PREFIX}_stage_seconds the duration of the scraping stages')
+        lines.append(f'# TYPE {METRIC_PREFIX}_stage_seconds summary')
+        for (stage, labels), (count, seconds) in sorted(snapshot['timers'].items()):
+            labels = self._format_labels((('stage', stage),) + labels)
+            lines.append(f'{METRIC_PREFIX}_stage_seconds_count{labels} {count}')
+            lines.append(f'{METRIC_PREFIX}_stage_seconds_sum{labels} {seconds:.6f}')
+
+        names = sorted({name for name, _ in snapshot['counters']})
+        for name in names:
+            lines.append(f'# TYPE {METRIC_PREFIX}_{name}_total counter')
+            for (counter_name, labels), count in sorted(snapshot['counters'].items()):
+                if counter_name == name:
+                    lines.append(f'{METRIC_PREFIX}_{name}_total{self._format_labels(labels)} {count}')
+
+        names = sorted({name for name, _ in snapshot['gauges']})
+        for name in names:
+            lines.append(f'# TYPE {METRIC_PREFIX}_{name} gauge')
+            for (gauge_name, labels), value in sorted(snapshot['gauges'].items()):
+                if gauge_name == name:
+                    lines.append(f'{METRIC_PREFIX}_{name}{self._format_labels(labels)} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+    def format_stats(self):
+        """formats the timers, the counters and the gauges as a human readable stats log
+
+        Returns
+        -------
+        str
+            the mean duration of each stage and the value of each counter and gauge
+        """
+
+        snapshot = self.snapshot()
+        lines = []
+
+        for (stage, labels), (count, seconds) in sorted(snapshot['timers'].items()):
+            name = stage + self._format_labels(labels)
+            lines.append(f'{name}: {count} runs, mean {1000 * seconds / count:.2f} ms, total {seconds:.2f}s')
+
+        for (name, labels), count in sorted(snapshot['counters'].items()):
+            lines.append(f'{name}{self._format_labels(labels)}: {count}')
+
+        for (name, labels), value in sorted(snapshot['gauges'].items()):
+            lines.append(f'{name}{self._format_labels(labels)}: {value:g}')
+
+        return '\n'.join(lines)
+
+
+# the metrics of this process, recorded by all the scrapers
+_metrics = Metrics()
+
+
+def get_metrics():
+    """returns the metrics registry of the process
+
+    Returns
+    -------
+    Metrics
+        the registry recording the timers and the counters of all the scrapers
+    """
+
+    return _metrics
+
+
+def set_metrics(metrics):
+    """replaces the metrics registry of the process, e.g. to forward the metrics to another monitoring system
+
+    Parameters
+    ----------
+    metrics : Metrics
+        the new registry
+    """
+
+    global _metrics
+    _metrics = metrics
+
+
+def start_metrics_server(port):
+    """serves the metrics in the Prometheus text format on /metrics from a background thread
+
+    Parameters
+    ----------
+    port : int
+        the port of the HTTP endpoint
+
+    Returns
+    -------
+    ThreadingHTTPServer
+        the HTTP server of the endpoint
+    """
+
+    # http.server is only imported when the endpoint is requested
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsRequestHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+
+            body = get_metrics().to_prometheus_text().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # the scrapes of the monitoring system are not logged
+            pass
+
+    server = ThreadingHTTPServer(('', port), MetricsRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+def start_stats_log(interval):
+    """prints the stats of the metrics periodically from a background thread
+
+    Parameters
+    ----------
+    interval : float
+        the interval in seconds between two stats logs
+    """
+
+    def log_periodically():
+        while True:
+            time.sleep(interval)
+            print(f'stats:\n{get_metrics().format_stats()}')
+
+    threading.Thread(target=log_periodically, daemon=True).start()
+
+
+def start_metrics_exporters(args):
+    """starts the exporters of the metrics requested in args
+
+    Parameters
+    ----------
+    args : namedtuple
+        the namespace variable that contains the config for the scraper
+    """
+
+    if args.metrics_port > 0:
+        start_metrics_server(args.metrics_port)
+
+    if args.metrics_log_interval > 0:
+        start_stats_log(args.metrics_log_interval)
@@ -0,0 +1,567 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from dataextractiontools.metrics import get_metrics
+from dataextractiontools.utils import get_asin, get_best_sellers_rank, get_marketplace
+
+
+# the name of the output file of each info type
+OUTPUT_NAMES = {
+    "tabular": "product_tabular_info",
+    "textual": "product_textual_info",
+    "all": "product_info",
+}
+
+OUTPUT_EXTENSIONS = {
+    "jsonl": ".jsonl",
+    "parquet": ".parquet",
+    "sqlite": ".sqlite",
+}
+
+# the sections of the records stored as key/value attributes by the sqlite sink
+ATTRIBUTE_SECTIONS = ("product_detail_table", "product_overview_table")
+
+
+# the output sinks opened by this process, shared by all the scrapers writing to the same file
+_output_sinks = dict()
+_output_sinks_lock = threading.Lock()
+
+
+def make_record(URL, info_dict, timestamp=None):
+    """tags the info extracted from a product web page with the ASIN, the marketplace, the URL and the extraction time
+
+    Parameters
+    ----------
+    URL : str
+        the URL of the Amazon product web page
+    info_dict : dict
+        the info extracted from the page
+    timestamp : str, optional
+        the extraction time in ISO 8601 format, the current time if None
+
+    Returns
+    -------
+    dict
+        the record of the product
+    """
+
+    record = {
+        'asin': get_asin(URL),
+        'marketplace': get_marketplace(URL),
+        'URL': URL,
+        'timestamp': timestamp or datetime.now(timezone.utc).isoformat(),
+    }
+    record.update(info_dict)
+
+    return record
+
+
+def get_output_sink(args, name):
+    """returns the output sink of the records of a scraper, opening it on first use
+
+    Parameters
+    ----------
+    args : namedtuple
+        the namespace variable that contains the config for the scraper
+    name : str
+        the name of the output file, without extension
+
+    Returns
+    -------
+    OutputSink
+        the output sink shared by all the scrapers of the process writing to the same file
+    """
+
+    path = Path.cwd() / args.dump_info_path / (name + OUTPUT_EXTENSIONS[args.output_format])
+
+    with _output_sinks_lock:
+        if path not in _output_sinks:
+            if args.output_format == "parquet":
+                _output_sinks[path] = ParquetSink(path, args.parquet_row_group_size)
+            elif args.output_format == "sqlite":
+                _output_sinks[path] = SQLiteSink(path, args.sqlite_batch_size)
+            else:
+                _output_sinks[path] = JSONLSink(path, args.fsync_interval)
+
+        return _output_sinks[path]
+
+
+def close_output_sinks():
+    """flushes and closes all the output sinks opened by this process
+    """
+
+    with _output_sinks_lock:
+        output_sinks = list(_output_sinks.values())
+        _output_sinks.clear()
+
+    # all the sinks are closed before the first error of their writer threads is raised
+    error = None
+    for output_sink in output_sinks:
+        try:
+            output_sink.close()
+        except Exception as e:
+            error = error or e
+    if error is not None:
+        raise error
+
+
+# the records still buffered are written when the process exits
+atexit.register(close_output_sinks)
+
+
+class OutputSink():
+    """The base class of the sinks streaming one record per product to a file
+
+    The records are handed over to a writer thread through a queue, so writing and syncing the output never stalls the
+    scrapers. An error of the writer thread is kept and raised by the next write() and by close(), so the records are
+    never dropped silently. The callback of a record is called by the writer thread once the record is written and
+    flushed to the output file, e.g. to record its page as done in the checkpoint journal.
+
+    ...
+
+    Attributes
+    ----------
+    path : os.PathLike
+        the path of the output file
+    num_records : int
+        the number of records written
+
+    Methods
+    -------
+    write(record, on_written=None)
+        buffers a record to be written by the writer thread
+    close()
+        writes the buffered records and closes the output file
+    """
+
+    # the name of the format of the output file
+    output_format = None
+
+    # the interval in seconds at which the writer thread wakes up to sync the output when no record arrives
+    _poll_interval = 1.0
+
+    def __init__(self, path):
+        """
+        Parameters
+        ----------
+        path : os.PathLike
+            the path of the output file
+        """
+
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.num_records = 0
+        self._open()
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self._error = None
+        # the callbacks of the records buffered by the sink, only used by the writer thread
+        self._written_callbacks = []
+        # a daemon thread, so that it is still alive when close() is called at exit
+        self._writer = threading.Thread(target=self._run, daemon=True)
+        self._writer.start()
+
+    def write(self, record, on_written=None):
+        """buffers a record to be written by the writer thread
+
+        Parameters
+        ----------
+        record : dict
+            the record of a product
+        on_written : callable, optional
+            called without arguments once the record is written and flushed to the output file
+        """
+
+        if self._error is not None:
+            raise self._error
+
+        self._queue.put((record, on_written))
+
+    def _run(self):
+        while True:
+            try:
+                record = self._queue.get(timeout=self._poll_interval)
+            except queue.Empty:
+                self._call(self._on_idle)
+                continue
+
+            if record is None:
+                break
+
+            items = [record]
+            # drain whatever is already buffered, so the records are written in batches
+            while True:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    self._call(self._dump, items)
+                    return
+                items.append(record)
+
+            self._call(self._dump, items)
+
+    def _call(self, method, *args):
+        # the thread keeps draining the queue after an error, so that close() still returns
+        try:
+            method(*args)
+        except Exception as e:
+            get_metrics().increment('dump_errors', output_format=self.output_format)
+            if self._error is None:
+                self._error = e
+
+    def _dump(self, items):
+        records = [record for record, _ in items]
+        self._written_callbacks.extend(on_written for _, on_written in items if on_written is not None)
+
+        metrics = get_metrics()
+        try:
+            with metrics.timer('dump', output_format=self.output_format):
+                self._write_records(records)
+        except BaseException:
+            # the records buffered so far may be lost, they are not reported as written
+            self._written_callbacks = []
+            raise
+        metrics.increment('dumped_records', len(records))
+
+    def _notify_written(self):
+        # called by the sinks once all the buffered records are written and flushed
+        written_callbacks, self._written_callbacks = self._written_callbacks, []
+        for on_written in written_callbacks:
+            on_written()
+
+    def _open(self):
+        pass
+
+    def _write_records(self, records):
+        raise NotImplementedError
+
+    def _on_idle(self):
+        pass
+
+    def _close(self):
+        pass
+
+    def close(self):
+        """writes the buffered records and closes the output file
+        """
+
+        if self._closed:
+            return
+
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        self._close()
+        if self._error is not None:
+            raise self._error
+
+        print(f'dumped {self.num_records} records in {self.path}.')
+
+
+class JSONLSink(OutputSink):
+    """An output sink appending one json record per line, synced to disk periodically
+
+    ...
+
+    Attributes
+    ----------
+    fsync_interval : float
+        the interval in seconds between two syncs of the output file to disk
+    """
+
+    output_format = "jsonl"
+
+    def __init__(self, path, fsync_interval=5.0):
+        """
+        Parameters
+        ----------
+        path : os.PathLike
+            the path of the output file
+        fsync_interval : float
+            the interval in seconds between two syncs of the output file to disk
+        """
+
+        self.fsync_interval = fsync_interval
+        self._fh = None
+        self._last_fsync_time = time.monotonic()
+        self._is_dirty = False
+
+        super().__init__(path)
+
+    def _open(self):
+        self._fh = self.path.open('a')
+
+    def _sync(self):
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        self._last_fsync_time = time.monotonic()
+        self._is_dirty = False
+
+    def _write_records(self, records):
+        self._fh.write(''.join(json.dumps(record) + '\n' for record in records))
+        self.num_records += len(records)
+        self._is_dirty = True
+
+        if time.monotonic() - self._last_fsync_time >= self.fsync_interval:
+            self._sync()
+        elif self._written_callbacks:
+            self._fh.flush()
+        self._notify_written()
+
+    def _on_idle(self):
+        if self._is_dirty:
+            self._sync()
+
+    def _close(self):
+        self._sync()
+        self._fh.close()
+
+
+def _import_pyarrow():
+    # pyarrow is slow to import, it is only imported by the parquet sink
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return None
+
+    return pyarrow
+
+
+class ParquetSink(OutputSink):
+    """An output sink writing the records in the columnar parquet format for analytics
+
+    The tags of the records and the textual values are stored as string columns, the other values (tables and lists)
+    as json-encoded string columns. The columns are taken from the first record. Unlike the json lines output, a
+    parquet file can not be appended to, so each run writes its own part file next to the output path, named after the
+    run, e.g. ``product_info.20240101T120000000000Z-1234.parquet``, and a resumed batch keeps the records of its earlier runs.
+    The part file is only readable once its footer is written, so it is written under a ``.tmp`` name and renamed when
+    the sink is closed, and the records are reported as written at that point.
+
+    ...
+
+    Attributes
+    ----------
+    path : os.PathLike
+        the path of the part file of the run
+    row_group_size : int
+        the number of records written per row group
+    """
+
+    output_format = "parquet"
+
+    def __init__(self, path, row_group_size=1000):
+        """
+        Parameters
+        ----------
+        path : os.PathLike
+            the path of the output file
+        row_group_size : int
+            the number of records written per row group
+        """
+
+        self._pyarrow = _import_pyarrow()
+        if self._pyarrow is None:
+            raise ImportError("the parquet output format requires the pyarrow package")
+
+        self.row_group_size = row_group_size
+        self._buffer = []
+        self._parquet_writer = None
+        self._columns = None
+        self._schema = None
+
+        path = Path(path)
+        run_id = f'{datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")}-{os.getpid()}'
+        part_path = path.with_name(f'{path.stem}.{run_id}{path.suffix}')
+        self._tmp_path = part_path.with_name(part_path.name + '.tmp')
+
+        super().__init__(part_path)
+
+    @staticmethod
+    def _to_column_value(value):
+        if value is None or isinstance(value, str):
+            return value
+
+        return json.dumps(value)
+
+    def _flush_buffer(self):
+        if not self._buffer:
+            return
+
+        pyarrow = self._pyarrow
+
+        if self._parquet_writer is None:
+            self._columns = list(self._buffer[0].keys())
+            self._schema = pyarrow.schema([(column, pyarrow.string()) for column in self._columns])
+            self._parquet_writer = pyarrow.parquet.ParquetWriter(str(self._tmp_path), self._schema)
+
+        table = pyarrow.table({
+            column: [self._to_column_value(record.get(column)) for record in self._buffer]
+            for column in self._columns
+        }, schema=self._schema)
+        self._parquet_writer.write_table(table)
+        self.num_records += len(self._buffer)
+        self._buffer = []
+
+    def _write_records(self, records):
+        self._buffer.extend(records)
+        if len(self._buffer) >= self.row_group_size:
+            self._flush_buffer()
+
+    def _close(self):
+        if self._error is not None:
+            return
+
+        self._flush_buffer()
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            os.replace(self._tmp_path, self.path)
+        self._notify_written()
+
+
+class SQLiteSink(OutputSink):
+    """An output sink bulk-loading the records into an indexed SQLite database, to query the products without rescans
+
+    Each record is a row of the products table, with its ASIN, marketplace, URL and extraction time, and the whole
+    record in json. The entries of its product detail table and product overview table are normalized into the
+    attributes table, one row per name and value, and its Best Sellers Rank into the ranks table, one row per category.
+    The attributes are indexed by name and value, the ranks by category and rank, and the products by ASIN and
+    marketplace, so the products with a given attribute or in a given category are found without reading the others.
+
+    The database is in WAL mode and the records are inserted in transactions of batch_size records, so loading millions
+    of records is not bound by the syncs to disk. Like the json lines output, the records of each run are appended, and
+    several processes can dump into the same database.
+
+    ...
+
+    Attributes
+    ----------
+    batch_size : int
+        the number of records inserted per transaction
+    """
+
+    output_format = "sqlite"
+
+    def __init__(self, path, batch_size=1000):
+        """
+        Parameters
+        ----------
+        path : os.PathLike
+            the path of the database
+        batch_size : int
+            the number of records inserted per transaction
+        """
+
+        self.batch_size = batch_size
+        self._buffer = []
+        self._connection = None
+
+        super().__init__(path)
+
+    def _open(self):
+        # sqlite3 is only imported by the sqlite sink
+        import sqlite3
+
+        # the transactions are handled explicitly, by the writer thread only
+        self._connection = sqlite3.connect(self.path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        # the pages of the indexes updated by the batches stay cached, 64 MB instead of 2 MB by default
+        self._connection.execute('PRAGMA cache_size=-65536')
+        self._connection.executescript(
+            '''
+            CREATE TABLE IF NOT EXISTS products (
+                product_id INTEGER PRIMARY KEY,
+                asin TEXT,
+                marketplace TEXT,
+                URL TEXT NOT NULL,
+                timestamp TEXT,
+                record TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS products_asin ON products (asin, marketplace);
+            CREATE TABLE IF NOT EXISTS attributes (
+                product_id INTEGER NOT NULL REFERENCES products (product_id),
+                section TEXT NOT NULL,
+                name TEXT NOT NULL,
+                value TEXT
+            );
+            CREATE INDEX IF NOT EXISTS attributes_name ON attributes (name, value);
+            CREATE INDEX IF NOT EXISTS attributes_product_id ON attributes (product_id);
+            CREATE TABLE IF NOT EXISTS ranks (
+                product_id INTEGER NOT NULL REFERENCES products (product_id),
+                category TEXT NOT NULL,
+                rank INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ranks_category ON ranks (category, rank);
+            CREATE INDEX IF NOT EXISTS ranks_product_id ON ranks (product_id);
+            '''
+        )
+
+    @staticmethod
+    def _to_column_value(value):
+        if value is None or isinstance(value, str):
+            return value
+
+        return json.dumps(value)
+
+    def _get_attribute_rows(self, product_id, record):
+        rows = []
+        for section in ATTRIBUTE_SECTIONS:
+            table = record.get(section)
+            # the product detail table of a page without any is {'NA':'NA'}
+            if not table or table == {'NA': 'NA'}:
+                continue
+            rows.extend((product_id, section, name, self._to_column_value(value)) for name, value in table.items())
+
+        return rows
+
+    def _flush_buffer(self):
+        if not self._buffer:
+            return
+
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            attribute_rows = []
+            rank_rows = []
+            for record in self._buffer:
+                product_id = connection.execute(
+                    'INSERT INTO products (asin, marketplace, URL, timestamp, record) VALUES (?, ?, ?, ?, ?)',
+                    (record.get('asin'), record.get('marketplace'), record['URL'], record.get('timestamp'), json.dumps(record)),
+                ).lastrowid
+                attribute_rows.extend(self._get_attribute_rows(product_id, record))
+                rank_rows.extend((product_id, category, rank) for rank, category in get_best_sellers_rank(record.get('product_detail_table') or dict()))
+
+            connection.executemany('INSERT INTO attributes (product_id, section, name, value) VALUES (?, ?, ?, ?)', attribute_rows)
+            connection.executemany('INSERT INTO ranks (product_id, category, rank) VALUES (?, ?, ?)', rank_rows)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+        self.num_records += len(self._buffer)
+        self._buffer = []
+        self._notify_written()
+
+    def _write_records(self, records):
+        self._buffer.extend(records)
+        if len(self._buffer) >= self.batch_size:
+            self._flush_buffer()
+
+    def _on_idle(self):
+        self._flush_buffer()
+
+    def _close(self):
+        self._flush_buffer()
+        # the statistics of the indexes are updated for the query planner
+        self._connection.execute('PRAGMA optimize')
+        self._connection.close()
@@ -0,0 +1,300 @@
+import re
+import threading
+
+from dataextractiontools.browser_profile import create_browser_profile
+from dataextractiontools.fetchers import PageFetchError, SeleniumFetcher, create_fetcher
+from dataextractiontools.metrics import get_metrics
+from dataextractiontools.page_store import StoreFetcher, get_page_store
+from dataextractiontools.selector_registry import get_product_info_containers, get_selector_matches
+from dataextractiontools.soup_builder import build_soup
+
+
+# the regular expression finding the containers of the selector registry in a page source, compiled by containers
+_container_patterns = dict()
+
+
+def has_product_info(soup_obj):
+    """checks if any of the extractors can find something in a parsed web page
+
+    The page is matched against all the rules of the selector registry, and the matches are kept for its extractors.
+
+    Parameters
+    ----------
+    soup_obj : BeautifulSoup
+        an instance of BeautifulSoup using the page_content
+
+    Returns
+    -------
+    bool
+        True if at least one of the selectors read by the extractors matches an element of the page
+    """
+
+    return any(get_selector_matches(soup_obj).values())
+
+
+def has_product_info_containers(page_source):
+    """checks if a raw page source has any of the containers read by the extractors, without parsing it
+
+    Parameters
+    ----------
+    page_source : str
+        the page source of a web page
+
+    Returns
+    -------
+    bool
+        True if an element of the page has the id or the class of a container of the selector registry
+    """
+
+    containers = get_product_info_containers()
+    pattern = _container_patterns.get(containers)
+    if pattern is None:
+        container_ids, container_classes = containers
+        alternatives = []
+        if container_ids:
+            alternatives.append(r"""id=["']?(?:%s)["'\s>]""" % '|'.join(map(re.escape, container_ids)))
+        if container_classes:
+            alternatives.append(r"""class=["']?[^"'>]*(?<![\w-])(?:%s)(?![\w-])""" % '|'.join(map(re.escape, container_classes)))
+        pattern = _container_patterns[containers] = re.compile('|'.join(alternatives) or '(?!)')
+
+    return pattern.search(page_source) is not None
+
+
+class PageAcquisition():
+    """A class used to download Amazon product web pages and parse them once for all the extractors
+
+    The pages are downloaded by a pluggable fetcher, a plain HTTP client by default. When the fast path fails or
+    returns a page in which none of the extractors finds anything, e.g. a page rendered by javascript, the page is
+    downloaded again with Selenium. The downloaded pages can be persisted in a page store, and replayed from it later
+    without any network access.
+
+    ...
+
+    Attributes
+    ----------
+    args : namedtuple
+        the arguments pre-defined by the user and imported from config.py
+    driver_pool : WebDriverPool
+        a pool of long-lived webdrivers used by Selenium, or None to start a new webdriver for each page
+    fetcher : PageFetcher
+        the fetcher used to download the pages
+    fallback_fetcher : PageFetcher
+        the Selenium fetcher used when the fetcher returns an empty page, or None if the fallback is disabled
+    num_fallbacks : int
+        the number of pages downloaded again with the fallback fetcher
+    page_store : PageStore
+        the store in which the downloaded pages are persisted or from which they are replayed, or None
+    from_store : bool
+        replay the pages from the page store instead of downloading them
+
+    Methods
+    -------
+    get_page_source(URL)
+        downloads a web page with the fetcher and returns its page source
+    acquire_page_source(URL)
+        downloads a web page without parsing it, falling back to Selenium on the raw page source
+    acquire_page_source_if_modified(URL, validators)
+        downloads a web page without parsing it unless it did not change since a previous download
+    fall_back_on_page_source(URL, page_source)
+        downloads a web page again with Selenium if its raw page source has no product info, and stores the page
+    acquire(URL)
+        downloads a web page and creates a BeautifulSoup object
+    close()
+        releases the connections held by the fetcher and by the Selenium fallback
+    """
+
+    def __init__(self, args, driver_pool=None):
+        """
+        Parameters
+        ----------
+        args : namedtuple
+            the namespace variable that contains the config for the scraper
+        driver_pool : WebDriverPool, optional
+            a pool of long-lived webdrivers used by Selenium, a new webdriver is started for each page if None
+        """
+
+        self.args = args
+        self.driver_pool = driver_pool
+        self.from_store = args.from_store
+
+        # the fetchers and the page store are opened on the first download, so the scrapers which are only fed with
+        # already parsed pages, e.g. in the parse workers, never open them
+        self.fetcher = None
+        self.fallback_fetcher = None
+        self.page_store = None
+
+        self.num_fallbacks = 0
+
+        self._open_lock = threading.Lock()
+        self._fallbacks_lock = threading.Lock()
+
+    def _open(self):
+        # the fetchers are shared by the fetch threads of the asyncio crawler, they are opened once, the fetcher last
+        with self._open_lock:
+            if self.fetcher is not None:
+                return
+
+            self.page_store = get_page_store(self.args)
+
+            if self.from_store:
+                self.fetcher = StoreFetcher(self.page_store)
+                return
+
+            if self.args.fetch_backend != "selenium" and not self.args.selenium_fallback_disabled:
+                self.fallback_fetcher = SeleniumFetcher(self.driver_pool, create_browser_profile(self.args))
+            self.fetcher = create_fetcher(self.args.fetch_backend, self.args, self.driver_pool)
+
+    def _count_fallback(self):
+        # the pages are acquired by several threads, e.g. the fetch threads of the asyncio crawler
+        with self._fallbacks_lock:
+            self.num_fallbacks += 1
+        get_metrics().increment('selenium_fallbacks')
+
+    def _store(self, URL, page_source):
+        if self.page_store is not None and not self.from_store:
+            self.page_store.put(URL, page_source)
+
+    def get_page_source(self, URL):
+        """downloads a web page with the fetcher and returns its page source
+
+        Parameters
+        ----------
+        URL : str
+            the URL of a web page
+
+        Returns
+        -------
+        str
+            the page source of the web page
+        """
+
+        if self.fetcher is None:
+            self._open()
+
+        return self.fetcher.fetch(URL)
+
+    def acquire_page_source(self, URL):
+        """downloads a web page without parsing it, falling back to Selenium on the raw page source
+
+        It is used when the pages are parsed by another stage. The fallback is decided by looking for the ids of the
+        containers read by the extractors in the raw page source, which is cheaper but looser than has_product_info.
+
+        Parameters
+        ----------
+        URL : str
+            the URL of a web page
+
+        Returns
+        -------
+        str
+            the page source of the web page
+        """
+
+        try:
+            page_source = self.get_page_source(URL)
+        except PageFetchError:
+            if self.fallback_fetcher is None:
+                raise
+            page_source = None
+
+        return self.fall_back_on_page_source(URL, page_source)
+
+    def fall_back_on_page_source(self, URL, page_source):
+        """downloads a web page again with Selenium if its raw page source has no product info, and stores the page
+
+        Parameters
+        ----------
+        URL : str
+            the URL of a web page
+        page_source : str
+            the page source downloaded by the fetcher, or None if the download failed
+
+        Returns
+        -------
+        str
+            the page source of the web page
+        """
+
+        if self.fetcher is None:
+            self._open()
+
+        if self.fallback_fetcher is not None and (page_source is None or not has_product_info_containers(page_source)):
+            self._count_fallback()
+            page_source = self.fallback_fetcher.fetch(URL)
+
+        self._store(URL, page_source)
+
+        return page_source
+
+    def acquire_page_source_if_modified(self, URL, validators):
+        """downloads a web page without parsing it unless it did not change since a previous download
+
+        A conditional request is sent when the fetcher supports it, the fallback to Selenium is decided as in
+        acquire_page_source.
+
+        Parameters
+        ----------
+        URL : str
+            the URL of a web page
+        validators : dict
+            the etag and last_modified validators returned by a previous download of the page, or an empty dict
+
+        Returns
+        -------
+        tuple
+            the page source of the web page, or None if it did not change, and the validators of the download
+        """
+
+        if self.fetcher is None:
+            self._open()
+
+        try:
+            page_source, validators = self.fetcher.fetch_if_modified(URL, validators)
+            if page_source is None:
+                return None, validators
+        except PageFetchError:
+            if self.fallback_fetcher is None:
+                raise
+            page_source, validators = None, dict()
+
+        return self.fall_back_on_page_source(URL, page_source), validators
+
+    def acquire(self, URL):
+        """downloads a web page and creates a BeautifulSoup object
+
+        Parameters
+        ----------
+        URL : str
+            the URL of a web page
+
+        Returns
+        -------
+        tuple
+            the page source of the web page and the BeautifulSoup object created from it
+        """
+
+        try:
+            page_source = self.get_page_source(URL)
+            soup_obj = build_soup(page_source, self.args.soup_parser)
+        except PageFetchError:
+            if self.fallback_fetcher is None:
+                raise
+            soup_obj = None
+
+        if self.fallback_fetcher is not None and (soup_obj is None or not has_product_info(soup_obj)):
+            self._count_fallback()
+            page_source = self.fallback_fetcher.fetch(URL)
+            soup_obj = build_soup(page_source, self.args.soup_parser)
+
+        self._store(URL, page_source)
+
+        return page_source, soup_obj
+
+    def close(self):
+        """releases the connections held by the fetcher and by the Selenium fallback
+        """
+
+        if self.fetcher is not None:
+            self.fetcher.close()
+        if self.fallback_fetcher is not None:
+            self.fallback_fetcher.close()
@@ -0,0 +1,416 @@
+import contextlib
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from dataextractiontools.fetchers import PageFetcher, PageFetchError
+from dataextractiontools.utils import get_product_key
+
+
+CODEC_EXTENSIONS = {
+    "gzip": ".html.gz",
+    "zstd": ".html.zst",
+}
+
+# the page stores opened by this process, shared by all the scrapers writing to the same directory
+_page_stores = dict()
+_page_stores_lock = threading.Lock()
+
+
+def get_page_store(args):
+    """returns the page store requested in args, opening it on first use
+
+    Parameters
+    ----------
+    args : namedtuple
+        the namespace variable that contains the config for the scraper
+
+    Returns
+    -------
+    PageStore
+        the page store shared by all the scrapers of the process, or None if the pages are neither stored nor replayed
+    """
+
+    if not (args.store_pages_enabled or args.from_store):
+        return None
+
+    with _page_stores_lock:
+        store_path = Path(args.page_store_path).resolve()
+        if store_path not in _page_stores:
+            page_store = PageStore(store_path, args.store_codec, args.store_ttl_days, args.store_max_pages_per_asin, args.store_max_size_mb,
+                                   args.store_evict_interval)
+            # a replay is read-only, the pages past the TTL are replayed as well
+            if not args.from_store:
+                page_store.evict()
+            _page_stores[store_path] = page_store
+
+        return _page_stores[store_path]
+
+
+class PageStore():
+    """A content-addressed store of compressed raw product web pages, indexed by ASIN and fetch time
+
+    Each page source is compressed and written once under the sha256 digest of its content, so a page which did not
+    change between two fetches is only stored once. The index is an append-only json lines file with one entry per
+    fetch. Entries older than the TTL, or beyond the number of pages kept per ASIN, or the oldest ones when the store
+    exceeds its maximum size, are evicted together with the pages no entry refers to anymore, when the store is opened
+    to store pages and every evict_interval stored pages. The store is never evicted when it is opened to be replayed.
+
+    Several processes can share a store: the index is appended and rewritten under a lock on the index.lock file, the
+    eviction reloads the index written by all of them first, and only removes the pages of the entries it evicted.
+
+    ...
+
+    Attributes
+    ----------
+    store_path : os.PathLike
+        the directory of the store
+    codec : str
+        the compression of the stored pages, gzip or zstd
+    ttl_days : float
+        the number of days a page is kept, 0 keeps the pages forever
+    max_pages_per_asin : int
+        the number of fetches of the same ASIN kept, 0 keeps all of them
+    max_size_mb : float
+        the maximum size of the stored pages in megabytes, 0 does not limit the size
+    evict_interval : int
+        the number of pages stored between two evictions, 0 only evicts when the store is opened to store pages
+    entries : dict
+        the index entries of each ASIN, from the oldest to the latest fetch
+
+    Methods
+    -------
+    put(URL, page_source, fetched_at=None)
+        stores a page source fetched from a URL
+    get_page_source(entry)
+        reads the page source of an index entry
+    get_latest_entry(URL)
+        returns the index entry of the latest fetch of a URL
+    get_URLs()
+        returns the URL of the latest fetch of each stored ASIN
+    evict(now=None)
+        removes the expired entries and the pages no entry refers to anymore
+    """
+
+    def __init__(self, store_path, codec="gzip", ttl_days=30, max_pages_per_asin=3, max_size_mb=0, evict_interval=1000):
+        """
+        Parameters
+        ----------
+        store_path : os.PathLike
+            the directory of the store
+        codec : str
+            the compression of the stored pages, gzip or zstd
+        ttl_days : float
+            the number of days a page is kept, 0 keeps the pages forever
+        max_pages_per_asin : int
+            the number of fetches of the same ASIN kept, 0 keeps all of them
+        max_size_mb : float
+            the maximum size of the stored pages in megabytes, 0 does not limit the size
+        evict_interval : int
+            the number of pages stored between two evictions, 0 only evicts when the store is opened to store pages
+        """
+
+        if codec == "zstd" and zstandard is None:
+            raise ImportError("the zstd codec of the page store requires the zstandard package")
+
+        self.store_path = Path(store_path)
+        self.codec = codec
+        self.ttl_days = ttl_days
+        self.max_pages_per_asin = max_pages_per_asin
+        self.max_size_mb = max_size_mb
+        self.evict_interval = evict_interval
+
+        self._objects_path = self.store_path / 'objects'
+        self._index_path = self.store_path / 'index.jsonl'
+        self._lock = threading.Lock()
+        self._num_puts_since_eviction = 0
+
+        self._objects_path.mkdir(parents=True, exist_ok=True)
+        self._lock_file = (self.store_path / 'index.lock').open('a')
+        self.entries = self._load_index()
+
+    @contextlib.contextmanager
+    def _lock_index(self):
+        # the threads of the process are serialized by the lock, the processes sharing the store by the lock file
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _load_index(self):
+        entries = dict()
+        if not self._index_path.exists():
+            return entries
+
+        with self._index_path.open() as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                entries.setdefault(entry['asin'], []).append(entry)
+
+        for asin_entries in entries.values():
+            asin_entries.sort(key=lambda entry: entry['fetched_at'])
+
+        return entries
+
+    def _get_object_path(self, digest, codec):
+        return self._objects_path / digest[:2] / (digest + CODEC_EXTENSIONS[codec])
+
+    @staticmethod
+    def _write_object(object_path, compressed_data):
+        object_path.parent.mkdir(exist_ok=True)
+        # written under a temporary name first, so a crash never leaves a truncated page behind
+        tmp_path = object_path.with_name(f'{object_path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        tmp_path.write_bytes(compressed_data)
+        os.replace(tmp_path, object_path)
+
+    @staticmethod
+    def _compress(data, codec):
+        if codec == "zstd":
+            return zstandard.ZstdCompressor().compress(data)
+
+        return gzip.compress(data)
+
+    @staticmethod
+    def _decompress(data, codec):
+        if codec == "zstd":
+            if zstandard is None:
+                raise ImportError("reading zstd pages of the page store requires the zstandard package")
+            return zstandard.ZstdDecompressor().decompress(data)
+
+        return gzip.decompress(data)
+
+    def put(self, URL, page_source, fetched_at=None):
+        """stores a page source fetched from a URL
+
+        Parameters
+        ----------
+        URL : str
+            the URL of the web page
+        page_source : str
+            the page source of the web page
+        fetched_at : float, optional
+            the fetch time as a unix timestamp, the current time if None
+
+        Returns
+        -------
+        dict
+            the index entry of the stored page
+        """
+
+        data = page_source.encode()
+        digest = hashlib.sha256(data).hexdigest()
+        object_path = self._get_object_path(digest, self.codec)
+
+        compressed_data = None
+        if not object_path.exists():
+            compressed_data = self._compress(data, self.codec)
+            self._write_object(object_path, compressed_data)
+
+        entry = {
+            'asin': get_product_key(URL),
+            'URL': URL,
+            'fetched_at': time.time() if fetched_at is None else fetched_at,
+            'digest': digest,
+            'codec': self.codec,
+        }
+
+        with self._lock_index():
+            # the page may have been evicted by another process since it was found in the store
+            if not object_path.exists():
+                self._write_object(object_path, compressed_data or self._compress(data, self.codec))
+            entry['size'] = object_path.stat().st_size
+
+            with self._index_path.open('a') as fh:
+                fh.write(json.dumps(entry) + '\n')
+            self.entries.setdefault(entry['asin'], []).append(entry)
+
+            self._num_puts_since_eviction += 1
+            eviction_due = self.evict_interval > 0 and self._num_puts_since_eviction >= self.evict_interval
+
+        if eviction_due:
+            self.evict()
+
+        return entry
+
+    def get_page_source(self, entry):
+        """reads the page source of an index entry
+
+        Parameters
+        ----------
+        entry : dict
+            an index entry of the store
+
+        Returns
+        -------
+        str
+            the page source of the stored page
+        """
+
+        data = self._get_object_path(entry['digest'], entry['codec']).read_bytes()
+
+        return self._decompress(data, entry['codec']).decode()
+
+    def get_latest_entry(self, URL):
+        """returns the index entry of the latest fetch of a URL
+
+        Parameters
+        ----------
+        URL : str
+            the URL of a web page, matched by its ASIN and marketplace
+
+        Returns
+        -------
+        dict
+            the index entry, or None if the page is not stored
+        """
+
+        asin_entries = self.entries.get(get_product_key(URL))
+        if not asin_entries:
+            return None
+
+        return asin_entries[-1]
+
+    def get_URLs(self):
+        """returns the URL of the latest fetch of each stored ASIN
+
+        Returns
+        -------
+        list
+            the URLs of the stored pages
+        """
+
+        return [asin_entries[-1]['URL'] for asin_entries in self.entries.values() if asin_entries]
+
+    def evict(self, now=None):
+        """removes the expired entries and the pages no entry refers to anymore
+
+        The index is reloaded first, so the entries stored by the other processes sharing the store are kept or evicted
+        as well, and the entries of this process are refreshed with them.
+
+        Parameters
+        ----------
+        now : float, optional
+            the current time as a unix timestamp, the current time if None
+
+        Returns
+        -------
+        int
+            the number of evicted entries
+        """
+
+        now = time.time() if now is None else now
+
+        with self._lock_index():
+            self._num_puts_since_eviction = 0
+            loaded_entries = self._load_index()
+
+            entries = dict()
+            for asin, asin_entries in loaded_entries.items():
+                if self.ttl_days > 0:
+                    asin_entries = [entry for entry in asin_entries if now - entry['fetched_at'] <= self.ttl_days * 86400]
+                if self.max_pages_per_asin > 0:
+                    asin_entries = asin_entries[-self.max_pages_per_asin:]
+                if asin_entries:
+                    entries[asin] = asin_entries
+
+            if self.max_size_mb > 0:
+                entries = self._evict_oldest(entries, self.max_size_mb * 1024 * 1024)
+
+            kept_entries = sorted((entry for asin_entries in entries.values() for entry in asin_entries), key=lambda entry: entry['fetched_at'])
+            kept_entry_ids = {id(entry) for entry in kept_entries}
+            evicted_entries = [entry for asin_entries in loaded_entries.values() for entry in asin_entries if id(entry) not in kept_entry_ids]
+            self.entries = entries
+
+            if not evicted_entries:
+                return 0
+
+            tmp_path = self._index_path.with_suffix('.jsonl.tmp')
+            with tmp_path.open('w') as fh:
+                for entry in kept_entries:
+                    fh.write(json.dumps(entry) + '\n')
+            os.replace(tmp_path, self._index_path)
+
+            # only the pages of the evicted entries are removed, a page shared with a kept entry stays
+            kept_object_paths = {self._get_object_path(entry['digest'], entry['codec']) for entry in kept_entries}
+            for entry in evicted_entries:
+                object_path = self._get_object_path(entry['digest'], entry['codec'])
+                if object_path not in kept_object_paths:
+                    object_path.unlink(missing_ok=True)
+
+        return len(evicted_entries)
+
+    @staticmethod
+    def _evict_oldest(entries, max_size):
+        # the size of a page shared by several entries is only counted once
+        sizes = {entry['digest']: entry['size'] for asin_entries in entries.values() for entry in asin_entries}
+        total_size = sum(sizes.values())
+        if total_size <= max_size:
+            return entries
+
+        references = dict()
+        for asin_entries in entries.values():
+            for entry in asin_entries:
+                references[entry['digest']] = references.get(entry['digest'], 0) + 1
+
+        evicted_entries = set()
+        for entry in sorted((entry for asin_entries in entries.values() for entry in asin_entries), key=lambda entry: entry['fetched_at']):
+            if total_size <= max_size:
+                break
+            evicted_entries.add(id(entry))
+            references[entry['digest']] -= 1
+            if references[entry['digest']] == 0:
+                total_size -= sizes[entry['digest']]
+
+        entries = {asin: [entry for entry in asin_entries if id(entry) not in evicted_entries] for asin, asin_entries in entries.items()}
+
+        return {asin: asin_entries for asin, asin_entries in entries.items() if asin_entries}
+
+
+class StoreFetcher(PageFetcher):
+    """A fetcher which replays the latest stored fetch of a page from a page store, without any network access
+
+    ...
+
+    Attributes
+    ----------
+    page_store : PageStore
+        the store of the pages
+    """
+
+    def __init__(self, page_store):
+        """
+        Parameters
+        ----------
+        page_store : PageStore
+            the store of the pages
+        """
+
+        self.page_store = page_store
+
+    def fetch(self, URL):
+        entry = self.page_store.get_latest_entry(URL)
+        if entry is None:
+            raise PageFetchError(URL, message='the page is not in the page store')
+
+        return self.page_store.get_page_source(entry)
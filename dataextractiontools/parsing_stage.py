@@ -0,0 +1,284 @@
+import argparse
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from dataextractiontools.metrics import get_metrics
+from dataextractiontools.soup_builder import build_soup
+
+
+# the scrapers keep the extracted info as instance attributes, so each worker thread reuses its own scrapers
+_thread_local = threading.local()
+
+# the config of a scraper which only runs its extractors on already parsed pages, it never downloads nor dumps a page
+EXTRACTOR_ARGS = argparse.Namespace(
+    info_type="all",
+    soup_parser="partial",
+    verbosity_enabled=False,
+    dump_info_enabled=False,
+    dump_info_path="extracted_info",
+    from_store=False,
+)
+
+
+def create_scraper(args=None, driver_pool=None):
+    """creates a scraper for the info type requested in args
+
+    Parameters
+    ----------
+    args : namedtuple, optional
+        the namespace variable that contains the config for the scraper, EXTRACTOR_ARGS if None, i.e. a scraper of all
+        the info which only runs its extractors on already parsed pages
+    driver_pool : WebDriverPool, optional
+        a pool of long-lived webdrivers to download the pages with
+
+    Returns
+    -------
+    AmazonTabularInfoExtraction, AmazonTextualInfoExtraction or AmazonProductInfoExtraction
+        a scraper for the requested info type
+    """
+
+    if args is None:
+        args = EXTRACTOR_ARGS
+
+    # only the module of the requested info type is imported
+    if args.info_type == "tabular":
+        from dataextractiontools.amazon_tabular_info_scraper import AmazonTabularInfoExtraction
+        return AmazonTabularInfoExtraction(args, driver_pool)
+
+    if args.info_type == "textual":
+        from dataextractiontools.amazon_textual_info_scraper import AmazonTextualInfoExtraction
+        return AmazonTextualInfoExtraction(args, driver_pool)
+
+    if args.info_type == "all":
+        from dataextractiontools.amazon_product_info_scraper import AmazonProductInfoExtraction
+        return AmazonProductInfoExtraction(args, driver_pool)
+
+    raise ValueError(f'unknown info type: {args.info_type}')
+
+
+def run_extractors(scraper, info_type):
+    """runs the extractors of a scraper on its already parsed web page
+
+    Parameters
+    ----------
+    scraper : AmazonTabularInfoExtraction, AmazonTextualInfoExtraction or AmazonProductInfoExtraction
+        a scraper whose soup_obj is set
+    info_type : str
+        the type of information for extraction
+
+    Returns
+    -------
+    dict
+        a copy of the extracted info
+    """
+
+    if info_type == "tabular":
+        return dict(scraper.extract_tabular_info())
+
+    if info_type == "textual":
+        return dict(scraper.extract_textual_info())
+
+    return dict(scraper.extract_product_info())
+
+
+def extract_info_from_page_source(args, URL, page_source):
+    """parses an already downloaded Amazon product web page and runs the extractors of the requested info type
+
+    It is the function run by the parse workers, so it only returns plain dicts which are cheap to send back from a
+    worker process, never BeautifulSoup objects.
+
+    Parameters
+    ----------
+    args : namedtuple
+        the namespace variable that contains the config for the scraper
+    URL : str
+        the URL of the Amazon product web page
+    page_source : str or bytes
+        the page source of the Amazon product web page, the raw bytes are UTF-8 encoded and decoded by the parser
+
+    Returns
+    -------
+    dict
+        the extracted info
+    """
+
+    scrapers = getattr(_thread_local, 'scrapers', None)
+    if scrapers is None:
+        scrapers = _thread_local.scrapers = dict()
+
+    scraper = scrapers.get(args.info_type)
+    if scraper is None:
+        scraper = scrapers[args.info_type] = create_scraper(args)
+
+    scraper.URL = URL
+    scraper.page_source = page_source
+    scraper.soup_obj = build_soup(page_source, args.soup_parser)
+
+    try:
+        return run_extractors(scraper, args.info_type)
+    finally:
+        # the page is not kept alive by the cached scraper until the next one
+        scraper.release_page()
+
+
+def extract_info_and_metrics_from_page_source(args, URL, page_source):
+    """runs extract_info_from_page_source in a worker process and sends its metrics back with the extracted info
+
+    Parameters
+    ----------
+    args : namedtuple
+        the namespace variable that contains the config for the scraper
+    URL : str
+        the URL of the Amazon product web page
+    page_source : str or bytes
+        the page source of the Amazon product web page
+
+    Returns
+    -------
+    tuple
+        the extracted info, and the metrics recorded by the worker since its previous page, to be merged into the
+        metrics of the parent process
+    """
+
+    try:
+        return extract_info_from_page_source(args, URL, page_source), get_metrics().drain()
+    except Exception:
+        # the metrics of a failed page are dropped with it
+        get_metrics().drain()
+        raise
+
+
+def create_parse_executor(args):
+    """creates the pool of workers parsing the pages
+
+    Parameters
+    ----------
+    args : namedtuple
+        the namespace variable that contains the config for the scraper
+
+    Returns
+    -------
+    concurrent.futures.Executor
+        a process pool if the process parse backend is requested, a thread pool otherwise
+    """
+
+    num_workers = args.parse_workers or os.cpu_count()
+
+    if args.parse_backend == "process":
+        return ProcessPoolExecutor(max_workers=num_workers)
+
+    return ThreadPoolExecutor(max_workers=num_workers)
+
+
+class ParsingStage():
+    """A parsing stage running the extractors on already downloaded pages in a pool of worker processes
+
+    The lxml parse and the CSS selectors are CPU-bound and hold the GIL, so they are run in worker processes to use all
+    the cores. The fetchers hand the raw page sources over through a bounded queue, which blocks them when the workers
+    fall behind, so the number of pages held in memory stays capped.
+
+    ...
+
+    Attributes
+    ----------
+    args : namedtuple
+        the arguments pre-defined by the user and imported from config.py
+    result_handler : callable
+        called with the URL and the extracted info of each parsed page
+    failure_handler : callable
+        called with the URL and the error of each page whose parsing failed, or None
+    num_workers : int
+        the number of worker processes
+    executor : concurrent.futures.ProcessPoolExecutor
+        the pool of worker processes
+    num_parsed_pages : int
+        the number of pages parsed successfully
+    failed_URLs : list
+        the URLs whose parsing failed
+
+    Methods
+    -------
+    submit(URL, page_source)
+        hands a downloaded page over to the workers, blocks while the queue is full
+    close()
+        waits until all the submitted pages are parsed and shuts the workers down
+    """
+
+    def __init__(self, args, result_handler, failure_handler=None):
+        """
+        Parameters
+        ----------
+        args : namedtuple
+            the namespace variable that contains the config for the scraper
+        result_handler : callable
+            called with the URL and the extracted info of each parsed page
+        failure_handler : callable, optional
+            called with the URL and the error of each page whose parsing failed
+        """
+
+        self.args = args
+        self.result_handler = result_handler
+        self.failure_handler = failure_handler
+        self.num_workers = args.parse_workers or os.cpu_count()
+        self.executor = ProcessPoolExecutor(max_workers=self.num_workers)
+
+        self.num_parsed_pages = 0
+        self.failed_URLs = []
+
+        self._queue = queue.Queue(maxsize=args.parse_queue_size)
+        # the executor queues the submitted tasks without any bound, so only as many pages as workers are submitted
+        self._free_workers = threading.Semaphore(self.num_workers)
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, URL, page_source):
+        """hands a downloaded page over to the workers, blocks while the queue is full
+
+        Parameters
+        ----------
+        URL : str
+            the URL of the Amazon product web page
+        page_source : str or bytes
+            the page source of the Amazon product web page
+        """
+
+        self._queue.put((URL, page_source))
+
+    def _dispatch(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            URL, page_source = item
+            self._free_workers.acquire()
+            future = self.executor.submit(extract_info_and_metrics_from_page_source, self.args, URL, page_source)
+            future.add_done_callback(partial(self._on_parsed, URL))
+
+    def _on_parsed(self, URL, future):
+        self._free_workers.release()
+
+        try:
+            info_dict, worker_metrics = future.result()
+        except Exception as e:
+            print(f'failed to parse {URL}: {e!r}')
+            self.failed_URLs.append(URL)
+            get_metrics().increment('pages', status='failed')
+            if self.failure_handler is not None:
+                self.failure_handler(URL, repr(e))
+            return
+
+        get_metrics().merge(worker_metrics)
+        self.num_parsed_pages += 1
+        self.result_handler(URL, info_dict)
+
+    def close(self):
+        """waits until all the submitted pages are parsed and shuts the workers down
+        """
+
+        self._queue.put(None)
+        self._dispatcher.join()
+        self.executor.shutdown(wait=True)
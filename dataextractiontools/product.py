@@ -0,0 +1,258 @@
+import threading
+
+from dataextractiontools.page_acquisition import PageAcquisition
+from dataextractiontools.parsing_stage import create_scraper
+from dataextractiontools.soup_builder import build_soup, release_soup
+from dataextractiontools.utils import get_best_sellers_rank
+
+
+# the extractors keep their results as instance attributes, so each thread runs the sections with its own extractors
+_thread_local = threading.local()
+
+
+def _get_extractors():
+    extractors = getattr(_thread_local, 'extractors', None)
+    if extractors is None:
+        scraper = create_scraper()
+        extractors = _thread_local.extractors = (scraper.tabular_info_extraction, scraper.textual_info_extraction)
+
+    return extractors
+
+
+class Product():
+    """An Amazon product whose sections are extracted lazily from its web page
+
+    Each section is only extracted on its first access, then memoized. The page is parsed on the first access to any
+    section, and the parsed tree and the page source are released as soon as all the requested sections are
+    extracted, so a product only holds the values of its sections.
+
+    ...
+
+    Attributes
+    ----------
+    URL : str
+        the URL of the product web page
+    sections : frozenset
+        the sections which can be accessed, all of them by default
+    soup_parser : str
+        the soup parser, partial or full
+    title : str
+        the product title
+    bullet_points : list
+        the bullet points
+    description : str
+        the product description
+    detail_table : dict
+        the product detail table, {'NA':'NA'} when there is none
+    detail_table_layout : str
+        the layout of the product detail table, type1, type2, type3 or NA when there is none
+    overview_table : dict
+        the product overview table
+    best_sellers_rank : list
+        the (rank, category) pairs of the Best Sellers Rank
+
+    Methods
+    -------
+    from_URL(URL, args, sections=None)
+        downloads a product web page and creates a product from it
+    is_released()
+        checks if the page of the product has been released
+    to_dict()
+        returns the requested sections with the keys of the records of the scrapers
+    """
+
+    # the sections in the order of the records of AmazonProductInfoExtraction
+    SECTIONS = (
+        'detail_table',
+        'detail_table_layout',
+        'overview_table',
+        'title',
+        'bullet_points',
+        'description',
+        'best_sellers_rank',
+    )
+
+    # the keys of the sections in the records of AmazonProductInfoExtraction
+    RECORD_KEYS = {
+        'detail_table': 'product_detail_table',
+        'detail_table_layout': 'product_detail_table_layout',
+        'overview_table': 'product_overview_table',
+        'title': 'title',
+        'bullet_points': 'bullet_points',
+        'description': 'product_description',
+    }
+
+    __slots__ = ('URL', 'sections', 'soup_parser', '_page_source', '_soup_obj', '_values')
+
+    def __init__(self, page_source, URL=None, sections=None, soup_parser="partial"):
+        """
+        Parameters
+        ----------
+        page_source : str or bytes
+            the page source of the Amazon product web page
+        URL : str, optional
+            the URL of the Amazon product web page
+        sections : iterable, optional
+            the sections which will be accessed, all of them if None. The page is released once they are extracted.
+        soup_parser : str
+            the soup parser, partial or full
+        """
+
+        sections = frozenset(self.SECTIONS if sections is None else sections)
+        unknown_sections = sections.difference(self.SECTIONS)
+        if unknown_sections:
+            raise ValueError(f'unknown sections: {", ".join(sorted(unknown_sections))}')
+
+        self.URL = URL
+        self.sections = sections
+        self.soup_parser = soup_parser
+        self._page_source = page_source
+        self._soup_obj = None
+        self._values = dict()
+
+    @classmethod
+    def from_URL(cls, URL, args, sections=None):
+        """downloads a product web page and creates a product from it
+
+        Parameters
+        ----------
+        URL : str
+            the URL of a Amazon product web page
+        args : namedtuple
+            the namespace variable that contains the config of the download, e.g. parse_args([]) of config.py
+        sections : iterable, optional
+            the sections which will be accessed, all of them if None
+
+        Returns
+        -------
+        Product
+            the product of the page
+        """
+
+        page_acquisition = PageAcquisition(args)
+        try:
+            page_source = page_acquisition.acquire_page_source(URL)
+        finally:
+            page_acquisition.close()
+
+        return cls(page_source, URL, sections, args.soup_parser)
+
+    def is_released(self):
+        """checks if the page of the product has been released
+
+        Returns
+        -------
+        bool
+            True once all the requested sections are extracted
+        """
+
+        return self._page_source is None
+
+    def _get_soup_obj(self):
+        if self._soup_obj is None:
+            if self._page_source is None:
+                raise RuntimeError('the page of the product has been released')
+            self._soup_obj = build_soup(self._page_source, self.soup_parser)
+
+        return self._soup_obj
+
+    def _extract_detail_table(self):
+        tabular_info_extraction, _ = _get_extractors()
+        tabular_info_extraction.soup_obj = self._get_soup_obj()
+        tabular_info_extraction.get_product_detail_table_all_types()
+        tabular_info_extraction.soup_obj = None
+
+        self._values['detail_table_layout'] = tabular_info_extraction.product_detail_table_layout
+
+        return tabular_info_extraction.product_detail_table_dict
+
+    def _extract_overview_table(self):
+        tabular_info_extraction, _ = _get_extractors()
+        tabular_info_extraction.soup_obj = self._get_soup_obj()
+        tabular_info_extraction.get_product_overview_table()
+        tabular_info_extraction.soup_obj = None
+
+        return tabular_info_extraction.product_overview_table_dict
+
+    def _extract_textual_section(self, extractor_name, key):
+        _, textual_info_extraction = _get_extractors()
+        textual_info_extraction.soup_obj = self._get_soup_obj()
+        getattr(textual_info_extraction, extractor_name)()
+        textual_info_extraction.soup_obj = None
+
+        return textual_info_extraction.product_textual_info_dict.pop(key)
+
+    def _get(self, section):
+        if section in self._values:
+            return self._values[section]
+
+        if section not in self.sections:
+            raise AttributeError(f'the section {section} was not requested')
+
+        # the layout and the Best Sellers Rank are derived from the product detail table
+        if section in ('detail_table', 'detail_table_layout', 'best_sellers_rank') and 'detail_table' not in self._values:
+            self._values['detail_table'] = self._extract_detail_table()
+
+        if section == 'title':
+            value = self._extract_textual_section('extract_title', 'title')
+        elif section == 'bullet_points':
+            value = self._extract_textual_section('extract_bullet_points', 'bullet_points')
+        elif section == 'description':
+            value = self._extract_textual_section('extract_product_description', 'product_description')
+        elif section == 'overview_table':
+            value = self._extract_overview_table()
+        elif section == 'best_sellers_rank':
+            value = get_best_sellers_rank(self._values['detail_table'])
+        else:
+            value = self._values[section]
+
+        self._values[section] = value
+
+        if self.sections.issubset(self._values):
+            release_soup(self._soup_obj)
+            self._page_source = None
+            self._soup_obj = None
+
+        return value
+
+    @property
+    def title(self):
+        return self._get('title')
+
+    @property
+    def bullet_points(self):
+        return self._get('bullet_points')
+
+    @property
+    def description(self):
+        return self._get('description')
+
+    @property
+    def detail_table(self):
+        return self._get('detail_table')
+
+    @property
+    def detail_table_layout(self):
+        return self._get('detail_table_layout')
+
+    @property
+    def overview_table(self):
+        return self._get('overview_table')
+
+    @property
+    def best_sellers_rank(self):
+        return self._get('best_sellers_rank')
+
+    def to_dict(self):
+        """returns the requested sections with the keys of the records of the scrapers
+
+        Returns
+        -------
+        dict
+            the value of each requested section, the Best Sellers Rank as a list of (rank, category) tuples
+        """
+
+        return {self.RECORD_KEYS.get(section, section): self._get(section) for section in self.SECTIONS if section in self.sections}
+
+    def __repr__(self):
+        return f'Product(URL={self.URL!r}, sections={sorted(self._values)})'
@@ -0,0 +1,380 @@
+import re
+import threading
+
+from dataextractiontools.metrics import get_metrics
+
+
+# the declarative registry of the CSS selectors read by the extractors of AmazonTabularInfoExtraction and
+# AmazonTextualInfoExtraction, by rule name, the selectors of the product detail tables are in their layouts
+SELECTOR_RULES = {
+    'product_overview_table.cells': 'div#productOverview_feature_div tr td',
+    'title': 'div#title_feature_div',
+    'bullet_points': '#feature-bullets li',
+    'product_description': '#productDescription p',
+    'product_description.feature_div': '#productDescription_feature_div p',
+}
+
+# the layouts of the product detail tables in the order of priority: the name of the layout, the kind of table, i.e.
+# the parser of AmazonTabularInfoExtraction reading it, and the selectors of the parts of the table read by the parser.
+# A layout is present in a page when the selector of any of its parts matches an element of the page.
+PRODUCT_DETAIL_TABLE_LAYOUTS = [
+    ('type1', 'header_cells', {
+        'headers': 'div#prodDetails tr th',
+        'cells': 'div#prodDetails tr td',
+    }),
+    ('type2', 'bullet_list', {
+        'bullets': '#detailBullets_feature_div li',
+        'best_sellers_rank': '.a-unordered-list.a-nostyle.a-vertical.a-spacing-none.detail-bullet-list li',
+    }),
+    ('type3', 'alternating_cells', {
+        'cells': 'div#tech.content-grid-alternate-styles.mako-v2 tr td',
+    }),
+]
+
+_TAG_NAME_PATTERN = re.compile(r'^[a-zA-Z][\w-]*')
+_ID_PATTERN = re.compile(r'#([\w-]+)')
+_CLASS_PATTERN = re.compile(r'\.([\w-]+)')
+
+
+def get_layout_rule_name(layout, part):
+    """returns the name of the rule of a part of a layout of the product detail tables
+
+    Parameters
+    ----------
+    layout : str
+        the name of the layout
+    part : str
+        the name of the part of the table
+
+    Returns
+    -------
+    str
+        the name of the rule
+    """
+
+    return f'product_detail_table.{layout}.{part}'
+
+
+def get_all_selector_rules():
+    """returns the rules of the extractors and of the layouts of the product detail tables
+
+    Returns
+    -------
+    dict
+        the CSS selector of each rule, by rule name
+    """
+
+    rules = dict()
+    for layout, _, parts in PRODUCT_DETAIL_TABLE_LAYOUTS:
+        for part, selector in parts.items():
+            rules[get_layout_rule_name(layout, part)] = selector
+    rules.update(SELECTOR_RULES)
+
+    return rules
+
+
+def _get_container(alternative):
+    # the container of an alternative of a selector: the id of its first compound selector, or its last class, which is
+    # the most specific one, e.g. ('#', 'prodDetails') for "div#prodDetails tr th"
+    compounds = alternative.replace('>', ' > ').split()
+    if not compounds:
+        return None
+
+    container_id = _ID_PATTERN.search(compounds[0])
+    if container_id is not None:
+        return ('#', container_id.group(1))
+
+    container_classes = _CLASS_PATTERN.findall(compounds[0])
+    if container_classes:
+        return ('.', container_classes[-1])
+
+    return None
+
+
+def _get_index_keys(selector):
+    # the index keys of a selector: for each of its alternatives, the id or a class of the ancestor the alternative is
+    # anchored on, and the id or the tag name of the elements it matches. A key of None or "*" matches any element.
+    keys = []
+    for alternative in selector.split(','):
+        compounds = alternative.replace('>', ' > ').split()
+        if not compounds or '(' in alternative or any(combinator in alternative for combinator in '+~'):
+            # a pseudo-class or a sibling combinator, the selector is matched against every element
+            return [(None, '*')]
+
+        anchor = None
+        if len(compounds) > 1:
+            anchor_id = _ID_PATTERN.search(compounds[0])
+            anchor_class = _CLASS_PATTERN.search(compounds[0])
+            if anchor_id is not None:
+                anchor = ('#', anchor_id.group(1))
+            elif anchor_class is not None:
+                anchor = ('.', anchor_class.group(1))
+
+        target_id = _ID_PATTERN.search(compounds[-1])
+        target_tag_name = _TAG_NAME_PATTERN.match(compounds[-1])
+        if target_id is not None:
+            target = ('#', target_id.group(1))
+        elif target_tag_name is not None:
+            target = target_tag_name.group(0).lower()
+        else:
+            target = '*'
+
+        keys.append((anchor, target))
+
+    return keys
+
+
+class SelectorMatcher():
+    """A matcher compiled once from a registry of CSS selectors, which evaluates all of them in one traversal of a page
+
+    The rules are indexed by the ancestor they are anchored on, i.e. the id or a class of the first compound selector,
+    and by the id or the tag name of the elements they match. While the tree is traversed, the matcher keeps the
+    anchors of the current element, and only the rules indexed by these anchors and by the element are evaluated on it,
+    so the cost of a page hardly grows with the number of rules. Each candidate rule is evaluated by soupsieve, so the
+    elements matched by a rule are exactly the ones matched by select, in document order.
+
+    ...
+
+    Attributes
+    ----------
+    rules : dict
+        the CSS selector of each rule, by rule name
+
+    Methods
+    -------
+    match(soup_obj)
+        returns the elements of a page matched by each rule
+    """
+
+    def __init__(self, rules):
+        """
+        Parameters
+        ----------
+        rules : dict
+            the CSS selector of each rule, by rule name
+        """
+
+        import soupsieve
+
+        self.rules = dict(rules)
+
+        self._rule_names = list(self.rules)
+        self._compiled_selectors = [soupsieve.compile(selector) for selector in self.rules.values()]
+        # (anchor, target) -> the indices of the rules
+        self._index = dict()
+        for rule_index, selector in enumerate(self.rules.values()):
+            for key in _get_index_keys(selector):
+                rule_indices = self._index.setdefault(key, [])
+                if rule_index not in rule_indices:
+                    rule_indices.append(rule_index)
+        self._anchors = {anchor for anchor, _ in self._index if anchor is not None}
+
+    def _get_candidates(self, anchors, tag_name, element_id):
+        candidates = []
+        for anchor in anchors:
+            candidates.extend(self._index.get((anchor, tag_name), ()))
+            candidates.extend(self._index.get((anchor, '*'), ()))
+            if element_id is not None:
+                candidates.extend(self._index.get((anchor, ('#', element_id)), ()))
+
+        return candidates
+
+    def match(self, soup_obj):
+        """returns the elements of a page matched by each rule
+
+        Parameters
+        ----------
+        soup_obj : BeautifulSoup
+            an instance of BeautifulSoup of the page
+
+        Returns
+        -------
+        dict
+            the elements matched by each rule, in document order, by rule name
+        """
+
+        matches = [[] for _ in self._rule_names]
+
+        with get_metrics().timer('match_selectors'):
+            # the elements to visit, with the anchors of their ancestors, in reverse document order
+            stack = [(child, (None,)) for child in reversed(soup_obj.contents) if child.name is not None]
+            while stack:
+                element, anchors = stack.pop()
+
+                element_id = element.get('id')
+                if isinstance(element_id, list):
+                    element_id = element_id[0] if element_id else None
+
+                candidates = self._get_candidates(anchors, element.name, element_id)
+                if candidates:
+                    for rule_index in sorted(set(candidates)):
+                        if self._compiled_selectors[rule_index].match(element):
+                            matches[rule_index].append(element)
+
+                child_anchors = anchors
+                if element_id is not None and ('#', element_id) in self._anchors:
+                    child_anchors = child_anchors + (('#', element_id),)
+                for class_name in element.get('class') or ():
+                    if ('.', class_name) in self._anchors and ('.', class_name) not in child_anchors:
+                        child_anchors = child_anchors + (('.', class_name),)
+
+                stack.extend((child, child_anchors) for child in reversed(element.contents) if child.name is not None)
+
+        self._record_hits(matches)
+
+        return dict(zip(self._rule_names, matches))
+
+    def _record_hits(self, matches):
+        metrics = get_metrics()
+        metrics.increment('selector_matched_pages')
+        for rule_name, elements in zip(self._rule_names, matches):
+            if elements:
+                metrics.increment('selector_rule_hits', rule=rule_name)
+
+
+def get_hit_rates(snapshot=None):
+    """returns the hit rate of each rule, the share of the matched pages in which the rule matched an element
+
+    Parameters
+    ----------
+    snapshot : dict, optional
+        a snapshot of the metrics, the current metrics of the process if None
+
+    Returns
+    -------
+    dict
+        the hit rate of each rule which matched at least once, by rule name
+    """
+
+    counters = (snapshot or get_metrics().snapshot())['counters']
+    num_pages = counters.get(('selector_matched_pages', ()), 0)
+    if num_pages == 0:
+        return dict()
+
+    return {
+        dict(labels)['rule']: hits / num_pages
+        for (name, labels), hits in counters.items()
+        if name == 'selector_rule_hits'
+    }
+
+
+# the matcher of the process and the containers of the rules, derived on first use and after a layout is registered
+_matcher = None
+_containers = None
+_matcher_lock = threading.Lock()
+
+# the matches of the last page of each thread, shared by the extractors of the page
+_thread_local = threading.local()
+
+
+def get_selector_matcher():
+    """returns the matcher of the process, compiled once from the registry
+
+    Returns
+    -------
+    SelectorMatcher
+        the matcher of all the rules of the registry
+    """
+
+    global _matcher
+    with _matcher_lock:
+        if _matcher is None:
+            _matcher = SelectorMatcher(get_all_selector_rules())
+
+        return _matcher
+
+
+def get_product_info_containers():
+    """returns the containers of all the elements read by the extractors, i.e. the ids and the classes the rules of the
+    registry are anchored on
+
+    The partial soup only materializes these containers, and the page acquisition looks for them to check if a page
+    has any product info, so a registered layout is seen by both.
+
+    Returns
+    -------
+    tuple
+        the ids and the classes of the containers, without duplicates, in the order of the rules
+    """
+
+    global _containers
+    with _matcher_lock:
+        if _containers is None:
+            containers = [_get_container(alternative) for selector in get_all_selector_rules().values() for alternative in selector.split(',')]
+            containers = list(dict.fromkeys(container for container in containers if container is not None))
+            _containers = (
+                tuple(name for kind, name in containers if kind == '#'),
+                tuple(name for kind, name in containers if kind == '.'),
+            )
+
+        return _containers
+
+
+def register_product_detail_table_layout(layout, kind, parts, priority=None):
+    """adds a layout of the product detail tables to the registry
+
+    Parameters
+    ----------
+    layout : str
+        the name of the layout
+    kind : str
+        the kind of table, i.e. the parser of AmazonTabularInfoExtraction reading it
+    parts : dict
+        the CSS selector of each part of the table read by the parser
+    priority : int, optional
+        the position of the layout in the order of priority, the last one if None
+    """
+
+    for selector in parts.values():
+        if any(_get_container(alternative) is None for alternative in selector.split(',')):
+            raise ValueError(f'the selector {selector!r} is not anchored on an id or a class, the partial soup only holds the containers of the product info')
+
+    global _matcher, _containers
+    with _matcher_lock:
+        entry = (layout, kind, dict(parts))
+        if priority is None:
+            PRODUCT_DETAIL_TABLE_LAYOUTS.append(entry)
+        else:
+            PRODUCT_DETAIL_TABLE_LAYOUTS.insert(priority, entry)
+        # the matcher and the containers are derived again on their next use
+        _matcher = None
+        _containers = None
+
+
+def get_selector_matches(soup_obj):
+    """returns the elements of a page matched by each rule of the registry
+
+    The page is traversed once, on the first call of its extractors, and the matches are kept until the next page of
+    the thread, or until the page is released.
+
+    Parameters
+    ----------
+    soup_obj : BeautifulSoup
+        an instance of BeautifulSoup of the page
+
+    Returns
+    -------
+    dict
+        the elements matched by each rule, in document order, by rule name
+    """
+
+    if getattr(_thread_local, 'soup_obj', None) is not soup_obj:
+        _thread_local.soup_obj = None
+        _thread_local.matches = get_selector_matcher().match(soup_obj)
+        _thread_local.soup_obj = soup_obj
+
+    return _thread_local.matches
+
+
+def forget_selector_matches(soup_obj):
+    """drops the matches of a page, e.g. when it is released
+
+    Parameters
+    ----------
+    soup_obj : BeautifulSoup
+        an instance of BeautifulSoup of the page
+    """
+
+    if getattr(_thread_local, 'soup_obj', None) is soup_obj:
+        _thread_local.soup_obj = None
+        _thread_local.matches = None
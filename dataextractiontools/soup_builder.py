@@ -0,0 +1,138 @@
+from dataextractiontools.metrics import get_metrics
+from dataextractiontools.selector_registry import forget_selector_matches, get_product_info_containers
+
+
+def get_containers_xpath(containers):
+    """returns the XPath expression selecting the containers of the product info
+
+    Parameters
+    ----------
+    containers : tuple
+        the ids and the classes of the containers, as returned by get_product_info_containers
+
+    Returns
+    -------
+    str
+        the XPath expression selecting all the containers
+    """
+
+    container_ids, container_classes = containers
+
+    return ' | '.join(
+        [f'//*[@id="{container_id}"]' for container_id in container_ids]
+        + [f'//*[contains(concat(" ", normalize-space(@class), " "), " {container_class} ")]' for container_class in container_classes]
+    )
+
+
+# the compiled XPath and the lxml parser, created on the first parse so that lxml is only imported when needed
+_lxml_objects = dict()
+
+
+def _get_lxml_objects():
+    if not _lxml_objects:
+        import lxml.html
+
+        _lxml_objects['utf8_html_parser'] = lxml.html.HTMLParser(encoding='utf-8')
+
+    # the containers of the selector registry, the XPath is compiled again when a layout is registered
+    containers = get_product_info_containers()
+    if _lxml_objects.get('containers') is not containers:
+        import lxml.etree
+
+        _lxml_objects['containers_xpath'] = lxml.etree.XPath(get_containers_xpath(containers))
+        _lxml_objects['containers'] = containers
+
+    return _lxml_objects
+
+
+def build_product_info_soup(page_source):
+    """creates a BeautifulSoup object holding only the containers of the product info of a web page
+
+    The whole page is parsed by lxml, which is fast and does not create a python object per element, then only the
+    subtrees of the containers read by the extractors are materialized as a BeautifulSoup object, in document order.
+    Containers nested in another container are only included once, with their outermost container, so the CSS selectors
+    of the extractors match exactly the same elements as on the full BeautifulSoup object.
+
+    Parameters
+    ----------
+    page_source : str or bytes
+        the page source of a web page, UTF-8 encoded if bytes
+
+    Returns
+    -------
+    BeautifulSoup
+        an instance of BeautifulSoup holding the containers of the product info
+    """
+
+    import lxml.etree
+    import lxml.html
+    from bs4 import BeautifulSoup
+
+    lxml_objects = _get_lxml_objects()
+
+    if isinstance(page_source, str):
+        # lxml refuses unicode strings with an encoding declaration
+        page_source = page_source.encode('utf-8')
+
+    try:
+        # without the explicit encoding, lxml decodes the pages without a meta charset as latin-1
+        root = lxml.html.document_fromstring(page_source, parser=lxml_objects['utf8_html_parser'])
+    except lxml.etree.ParserError:
+        # the page is empty
+        return BeautifulSoup("","lxml")
+
+    containers = lxml_objects['containers_xpath'](root)
+    container_set = set(containers)
+
+    fragments = []
+    for container in containers:
+        if any(ancestor in container_set for ancestor in container.iterancestors()):
+            continue
+        fragments.append(lxml.html.tostring(container, encoding='unicode', with_tail=False))
+
+    return BeautifulSoup(''.join(fragments),"lxml")
+
+
+def release_soup(soup_obj):
+    """frees a BeautifulSoup object right away
+
+    The elements of a BeautifulSoup tree refer to each other, so a dropped tree is only freed by the next collection
+    of the garbage collector. Decomposing it breaks the cycles and frees it deterministically.
+
+    Parameters
+    ----------
+    soup_obj : BeautifulSoup
+        an instance of BeautifulSoup, or None
+    """
+
+    if soup_obj is not None:
+        forget_selector_matches(soup_obj)
+        soup_obj.decompose()
+
+
+def build_soup(page_source, soup_parser="partial"):
+    """creates the BeautifulSoup object on which the extractors run
+
+    Parameters
+    ----------
+    page_source : str or bytes
+        the page source of a web page, UTF-8 encoded if bytes
+    soup_parser : str
+        partial to only materialize the containers of the product info, full to materialize the whole page
+
+    Returns
+    -------
+    BeautifulSoup
+        an instance of BeautifulSoup using the page_content
+    """
+
+    with get_metrics().timer('parse', soup_parser=soup_parser):
+        if soup_parser == "partial":
+            return build_product_info_soup(page_source)
+
+        from bs4 import BeautifulSoup
+
+        if isinstance(page_source, bytes):
+            return BeautifulSoup(page_source,"lxml",from_encoding="utf-8")
+
+        return BeautifulSoup(page_source,"lxml")
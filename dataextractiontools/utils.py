@@ -1,5 +1,180 @@
+import re
+from urllib.parse import urlsplit
+
+
+ASIN_PATTERN = re.compile(r'^[A-Z0-9]{10}$')
+URL_ASIN_PATTERN = re.compile(r'/(?:dp|gp/product)/([A-Z0-9]{10})(?:[/?#]|$)')
+PRODUCT_URL_TEMPLATE = "https://www.amazon.com/dp/{}/"
+
+# the marketplace of an Amazon web page is the domain following "amazon." in its host, e.g. "co.uk" for www.amazon.co.uk
+MARKETPLACE_PATTERN = re.compile(r'(?:^|\.)amazon\.([a-z.]+)$')
+DEFAULT_MARKETPLACE = "com"
+
+# the patterns of the text normalization, compiled once
+WHITESPACE_PATTERN = re.compile(r'\s+')
+# the right-to-left and left-to-right marks, with the whitespace around them, padding the keys and values of the detail bullets
+DIRECTION_MARK_PATTERN = re.compile(r'\s*[\u200e\u200f]\s*')
+BEST_SELLERS_RANK_PATTERN = re.compile(r'#([\d,]+)\s+in\s+([^#]*?)\s*(?:\(See [^#]*\)\s*)?(?=#|$)')
+# the "(See Top 100 in ...)" link following a rank
+SEE_TOP_PATTERN = re.compile(r'\(See .*\)')
+
+# the keys of the Best Sellers Rank in the product detail tables of type1 and type2
+BEST_SELLERS_RANK_KEYS = ['Best Sellers Rank', 'Best_Sellers_Rank']
+
+
 def remove_unicode_chars(string_unicode):
+	# most of the strings are plain ascii, str.isascii() is a constant-time check of the string representation
+	if string_unicode.isascii():
+		return string_unicode
+
 	string_encode = string_unicode.encode("ascii", "ignore")
 	string_decode = string_encode.decode()
 	
 	return string_decode
+
+
+def collapse_whitespace(text):
+	"""replaces each run of whitespace characters by a single space and strips the text
+	"""
+
+	return WHITESPACE_PATTERN.sub(' ', text).strip()
+
+
+def remove_direction_marks(text):
+	"""removes the right-to-left and left-to-right marks, with the whitespace around them, and strips the text
+	"""
+
+	# the pattern starts with a whitespace run, so it is only run on the texts which contain a mark
+	if '\u200e' not in text and '\u200f' not in text:
+		return text.strip()
+
+	return DIRECTION_MARK_PATTERN.sub('', text).strip()
+
+
+def normalize_text(text):
+	"""removes the non-ascii characters of a text and collapses its whitespace
+	"""
+
+	return collapse_whitespace(remove_unicode_chars(text))
+
+
+def parse_best_sellers_rank(text):
+	"""parses a Best Sellers Rank text into (rank, category) pairs in one pass
+
+	e.g. "#1,018 in Electronics (See Top 100 in Electronics) #34 in Smartwatches" gives
+	[(1018, "Electronics"), (34, "Smartwatches")]
+	"""
+
+	return [(int(rank.replace(',', '')), category) for rank, category in BEST_SELLERS_RANK_PATTERN.findall(text)]
+
+
+def split_best_sellers_rank(text):
+	"""splits a Best Sellers Rank text into the ranks displayed in the web page, without their "(See Top 100 in ...)" links
+
+	e.g. "#1,018 in Electronics (See Top 100 in Electronics) #34 in Smartwatches" gives
+	["#1,018 in Electronics", "#34 in Smartwatches"]. The ranks are kept as displayed, and a fragment which is not a
+	"#rank in category" pair is kept as well, e.g. "#1 New Release".
+	"""
+
+	return ['#' + SEE_TOP_PATTERN.sub('', fragment).strip() for fragment in text.split('#')[1:]]
+
+
+def get_best_sellers_rank(product_detail_table):
+	"""parses the Best Sellers Rank of a product detail table of type1 or type2 into (rank, category) pairs
+
+	the pairs are empty if the table has no Best Sellers Rank.
+	"""
+
+	for key in BEST_SELLERS_RANK_KEYS:
+		ranks = product_detail_table.get(key)
+		if ranks:
+			return parse_best_sellers_rank(' '.join(ranks))
+
+	return []
+
+
+def to_product_URL(URL_or_ASIN):
+	"""returns the URL of an Amazon product web page, given either the URL itself or the ASIN of the product
+	"""
+
+	URL_or_ASIN = URL_or_ASIN.strip()
+	if ASIN_PATTERN.match(URL_or_ASIN):
+		return PRODUCT_URL_TEMPLATE.format(URL_or_ASIN)
+
+	return URL_or_ASIN
+
+
+def get_asin(URL):
+	"""returns the ASIN of an Amazon product web page from its URL, or None if the URL does not contain one
+	"""
+
+	match = URL_ASIN_PATTERN.search(URL)
+	if match is None:
+		return None
+
+	return match.group(1)
+
+
+def get_marketplace(URL):
+	"""returns the marketplace of an Amazon web page from its URL, e.g. "de" for www.amazon.de, or None if the URL is not on an Amazon host
+	"""
+
+	match = MARKETPLACE_PATTERN.search(urlsplit(URL).hostname or '')
+	if match is None:
+		return None
+
+	return match.group(1)
+
+
+def get_site(URL):
+	"""returns the site of a product web page from its URL, i.e. its marketplace on an Amazon host, e.g. "de" for www.amazon.de
+
+	on the other hosts, e.g. a mirror or a test server, the site is the host and the path preceding the product path,
+	e.g. "127.0.0.1:8000/de" for http://127.0.0.1:8000/de/dp/B08KHR6B3W/, as the marketplaces are told apart by either.
+	"""
+
+	marketplace = get_marketplace(URL)
+	if marketplace is not None:
+		return marketplace
+
+	parts = urlsplit(URL)
+	match = URL_ASIN_PATTERN.search(parts.path)
+	if match is None:
+		return parts.netloc
+
+	return parts.netloc + parts.path[:match.start()]
+
+
+def get_product_key(URL):
+	"""returns the key of an Amazon product web page in the journals and the stores of the crawls
+
+	the key is the ASIN of the product on amazon.com, and its ASIN and site on the other marketplaces and hosts, e.g.
+	"B08KHR6B3W:de", as the same ASIN has a page on each marketplace. It is the URL itself if it does not contain an ASIN.
+	"""
+
+	asin = get_asin(URL)
+	if asin is None:
+		return URL
+
+	site = get_site(URL)
+	if not site or site == DEFAULT_MARKETPLACE:
+		return asin
+
+	return f'{asin}:{site}'
+
+
+def read_URL_file(path):
+	"""reads a file of Amazon product URLs or ASINs, one per line, and returns the list of product URLs
+
+	empty lines and lines starting with "#" are skipped.
+	"""
+
+	URLs = []
+	with open(path) as fh:
+		for line in fh:
+			line = line.strip()
+			if not line or line.startswith('#'):
+				continue
+			URLs.append(to_product_URL(line))
+
+	return URLs
@@ -0,0 +1,142 @@
+import queue
+import threading
+
+from dataextractiontools.browser_profile import BrowserProfile
+from dataextractiontools.metrics import get_metrics
+
+
+class WebDriverPool():
+    """A pool of long-lived headless Firefox webdrivers shared by the scrapers of a batch run
+
+    Starting Firefox is the main cost of downloading a single product web page, so the webdrivers of the pool are
+    reused across pages. A webdriver is recycled, i.e. quit and lazily replaced by a fresh one, after it has served
+    driver_max_pages pages or after it has crashed.
+
+    ...
+
+    Attributes
+    ----------
+    num_drivers : int
+        the number of webdrivers in the pool
+    driver_max_pages : int
+        the number of pages a webdriver serves before it is recycled
+    browser_profile : BrowserProfile
+        the profile of the webdrivers
+    num_recycled_drivers : int
+        the number of webdrivers recycled so far
+
+    Methods
+    -------
+    create_driver()
+        creates a headless Firefox webdriver with the browser profile
+    get_page_source(URL)
+        downloads a web page with a webdriver of the pool and returns its page source
+    close()
+        quits all the webdrivers of the pool
+    """
+
+    def __init__(self, num_drivers, driver_max_pages, browser_profile=None):
+        """
+        Parameters
+        ----------
+        num_drivers : int
+            the number of webdrivers in the pool
+        driver_max_pages : int
+            the number of pages a webdriver serves before it is recycled
+        browser_profile : BrowserProfile, optional
+            the profile of the webdrivers, the default profile if None
+        """
+
+        self.num_drivers = num_drivers
+        self.driver_max_pages = driver_max_pages
+        self.browser_profile = browser_profile or BrowserProfile("default")
+        self.num_recycled_drivers = 0
+        # the pool is shared by the threads of the batch, which recycle their drivers concurrently
+        self._lock = threading.Lock()
+
+        # each slot of the pool holds a [driver, num_served_pages] pair, the drivers are started on their first use
+        self._slots = queue.Queue()
+        for _ in range(num_drivers):
+            self._slots.put([None, 0])
+
+    def create_driver(self):
+        """creates a headless Firefox webdriver with the browser profile
+
+        Returns
+        -------
+        selenium.webdriver.Firefox
+            a headless Firefox webdriver
+        """
+
+        return self.browser_profile.create_driver()
+
+    @staticmethod
+    def _quit_driver(driver):
+        from selenium.common.exceptions import WebDriverException
+
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+    def _recycle(self, slot):
+        self._quit_driver(slot[0])
+        slot[0], slot[1] = None, 0
+        with self._lock:
+            self.num_recycled_drivers += 1
+        get_metrics().increment('driver_recycles')
+
+    def get_page_source(self, URL):
+        """downloads a web page with a webdriver of the pool and returns its page source
+
+        It blocks until a webdriver of the pool is available.
+
+        Parameters
+        ----------
+        URL : str
+            the URL of a web page
+
+        Returns
+        -------
+        str
+            the page source of the web page
+        """
+
+        # selenium is only imported once a webdriver is needed
+        from selenium.common.exceptions import WebDriverException
+
+        metrics = get_metrics()
+
+        slot = self._slots.get()
+        try:
+            if slot[0] is None:
+                with metrics.timer('browser_startup'):
+                    slot[0] = self.create_driver()
+
+            try:
+                with metrics.timer('navigation'):
+                    page_source = self.browser_profile.load_page(slot[0], URL)
+            except WebDriverException:
+                # the driver may be left in a broken state after a crash
+                self._recycle(slot)
+                raise
+
+            slot[1] += 1
+            if slot[1] >= self.driver_max_pages:
+                self._recycle(slot)
+
+            return page_source
+
+        finally:
+            self._slots.put(slot)
+
+    def close(self):
+        """quits all the webdrivers of the pool
+        """
+
+        for _ in range(self.num_drivers):
+            slot = self._slots.get()
+            if slot[0] is not None:
+                self._quit_driver(slot[0])
+                slot[0], slot[1] = None, 0
+            self._slots.put(slot)
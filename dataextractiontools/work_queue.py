@@ -0,0 +1,371 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from dataextractiontools.utils import get_product_key
+
+
+def get_current_epoch(now=None):
+    """returns the default fetch epoch of a crawl, the number of the current UTC day
+
+    Parameters
+    ----------
+    now : float, optional
+        the current time as a unix timestamp, the current time if None
+
+    Returns
+    -------
+    int
+        the number of days since the unix epoch
+    """
+
+    return int((time.time() if now is None else now) // 86400)
+
+
+class WorkQueue():
+    """The interface of the brokers of the distributed crawl, which share the tasks and the results between the workers
+
+    A task is a product to fetch in a fetch epoch. A worker leases tasks for a limited time, and acks each of them with
+    its result or nacks it with an error. The tasks whose lease expires, e.g. because their worker crashed, and the
+    nacked tasks are leased again, until they reach the maximum number of attempts. The results are deduplicated by
+    ASIN and fetch epoch, only the first ack of a task stores its result.
+
+    Methods
+    -------
+    enqueue(URLs, epoch)
+        adds the tasks of products in a fetch epoch, the tasks already enqueued are ignored
+    lease(worker_id, num_tasks=1)
+        leases tasks to a worker
+    ack(task, record)
+        marks a task as done and stores its result
+    nack(task, error)
+        releases a failed task, to be leased again or failed for good
+    get_stats()
+        returns the number of tasks of each status
+    iter_results(epoch=None)
+        iterates over the stored results, e.g. to export them
+    close()
+        releases the resources held by the broker
+    """
+
+    def enqueue(self, URLs, epoch):
+        """adds the tasks of products in a fetch epoch, the tasks already enqueued are ignored
+
+        Parameters
+        ----------
+        URLs : iterable
+            the URLs of Amazon product web pages
+        epoch : int
+            the fetch epoch
+
+        Returns
+        -------
+        int
+            the number of enqueued tasks
+        """
+
+        raise NotImplementedError
+
+    def lease(self, worker_id, num_tasks=1):
+        """leases tasks to a worker
+
+        Parameters
+        ----------
+        worker_id : str
+            the identifier of the worker
+        num_tasks : int
+            the maximum number of tasks leased
+
+        Returns
+        -------
+        list
+            the leased tasks, dicts with the asin, the URL, the epoch and the attempt of the task
+        """
+
+        raise NotImplementedError
+
+    def ack(self, task, record):
+        """marks a task as done and stores its result
+
+        Parameters
+        ----------
+        task : dict
+            a leased task
+        record : dict
+            the record of the product
+
+        Returns
+        -------
+        bool
+            True if the result was stored, False if the task already had a result, i.e. the record is a duplicate
+        """
+
+        raise NotImplementedError
+
+    def nack(self, task, error):
+        """releases a failed task, to be leased again or failed for good
+
+        Parameters
+        ----------
+        task : dict
+            a leased task
+        error : str
+            the description of the failure
+        """
+
+        raise NotImplementedError
+
+    def get_stats(self):
+        """returns the number of tasks of each status
+
+        Returns
+        -------
+        dict
+            the number of queued, leased, done and failed tasks
+        """
+
+        raise NotImplementedError
+
+    def iter_results(self, epoch=None):
+        """iterates over the stored results, e.g. to export them
+
+        Parameters
+        ----------
+        epoch : int, optional
+            the fetch epoch of the results, all of them if None
+
+        Yields
+        ------
+        dict
+            the record of each product
+        """
+
+        raise NotImplementedError
+
+    def close(self):
+        """releases the resources held by the broker
+        """
+
+        pass
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """A broker of the distributed crawl stored in a SQLite database
+
+    It is the local stand-in of a broker server: the database, in WAL mode, is shared by the worker processes of one
+    host, the workers of several hosts need a broker server implementing WorkQueue instead. The tasks are leased in
+    IMMEDIATE transactions, so two workers never lease the same task at the same time, and every change is committed,
+    so the crawl resumes where it stopped after a crash.
+
+    ...
+
+    Attributes
+    ----------
+    queue_path : os.PathLike
+        the path of the SQLite database
+    lease_timeout : float
+        the time in seconds after which a task leased by a worker is leased again
+    max_attempts : int
+        the number of times a task is leased before it is failed for good
+    """
+
+    def __init__(self, queue_path, lease_timeout=300, max_attempts=3):
+        """
+        Parameters
+        ----------
+        queue_path : os.PathLike
+            the path of the SQLite database
+        lease_timeout : float
+            the time in seconds after which a task leased by a worker is leased again
+        max_attempts : int
+            the number of times a task is leased before it is failed for good
+        """
+
+        self.queue_path = Path(queue_path)
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+
+        self.queue_path.parent.mkdir(parents=True, exist_ok=True)
+        # a sqlite3 connection can not be shared between threads
+        self._thread_local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+        with self._get_connection() as connection:
+            connection.executescript(
+                '''
+                CREATE TABLE IF NOT EXISTS tasks (
+                    asin TEXT NOT NULL,
+                    epoch INTEGER NOT NULL,
+                    URL TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker_id TEXT,
+                    lease_expires_at REAL,
+                    error TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (asin, epoch)
+                );
+                CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_expires_at);
+                CREATE TABLE IF NOT EXISTS results (
+                    asin TEXT NOT NULL,
+                    epoch INTEGER NOT NULL,
+                    record TEXT NOT NULL,
+                    worker_id TEXT,
+                    completed_at REAL NOT NULL,
+                    PRIMARY KEY (asin, epoch)
+                );
+                '''
+            )
+
+    def _get_connection(self):
+        connection = getattr(self._thread_local, 'connection', None)
+        if connection is None:
+            # the transactions are handled explicitly
+            connection = sqlite3.connect(self.queue_path, timeout=60, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._thread_local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+
+        return connection
+
+    def enqueue(self, URLs, epoch):
+        now = time.time()
+        rows = [(get_product_key(URL), epoch, URL, now) for URL in URLs]
+
+        connection = self._get_connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            num_tasks = connection.total_changes
+            connection.executemany('INSERT OR IGNORE INTO tasks (asin, epoch, URL, updated_at) VALUES (?, ?, ?, ?)', rows)
+            num_tasks = connection.total_changes - num_tasks
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+        return num_tasks
+
+    def lease(self, worker_id, num_tasks=1):
+        now = time.time()
+
+        connection = self._get_connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            # the workers of all the attempts of these tasks crashed or timed out, they are failed before the tasks are
+            # selected, so they never take the place of a task which can still be leased
+            connection.execute(
+                '''
+                UPDATE tasks SET status = 'failed', error = 'lease expired', updated_at = ?
+                WHERE status = 'leased' AND lease_expires_at < ? AND attempts >= ?
+                ''',
+                (now, now, self.max_attempts),
+            )
+
+            rows = connection.execute(
+                '''
+                SELECT asin, epoch, URL, attempts FROM tasks
+                WHERE status = 'queued' OR (status = 'leased' AND lease_expires_at < ?)
+                ORDER BY epoch, updated_at
+                LIMIT ?
+                ''',
+                (now, num_tasks),
+            ).fetchall()
+
+            tasks = []
+            for asin, epoch, URL, attempts in rows:
+                connection.execute(
+                    "UPDATE tasks SET status = 'leased', attempts = ?, worker_id = ?, lease_expires_at = ?, updated_at = ? WHERE asin = ? AND epoch = ?",
+                    (attempts + 1, worker_id, now + self.lease_timeout, now, asin, epoch),
+                )
+                tasks.append({'asin': asin, 'epoch': epoch, 'URL': URL, 'attempt': attempts + 1, 'worker_id': worker_id})
+
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+        return tasks
+
+    def ack(self, task, record):
+        now = time.time()
+
+        connection = self._get_connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = connection.execute(
+                'INSERT OR IGNORE INTO results (asin, epoch, record, worker_id, completed_at) VALUES (?, ?, ?, ?, ?)',
+                (task['asin'], task['epoch'], json.dumps(record), task['worker_id'], now),
+            )
+            is_stored = cursor.rowcount == 1
+            connection.execute(
+                "UPDATE tasks SET status = 'done', error = NULL, lease_expires_at = NULL, updated_at = ? WHERE asin = ? AND epoch = ?",
+                (now, task['asin'], task['epoch']),
+            )
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+        return is_stored
+
+    def nack(self, task, error):
+        now = time.time()
+        status = 'failed' if task['attempt'] >= self.max_attempts else 'queued'
+
+        connection = self._get_connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            # a task acked meanwhile by another worker, after the lease expired, stays done
+            connection.execute(
+                "UPDATE tasks SET status = ?, error = ?, lease_expires_at = NULL, updated_at = ? WHERE asin = ? AND epoch = ? AND status != 'done'",
+                (status, error, now, task['asin'], task['epoch']),
+            )
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def get_stats(self):
+        stats = {'queued': 0, 'leased': 0, 'done': 0, 'failed': 0}
+        for status, count in self._get_connection().execute('SELECT status, COUNT(*) FROM tasks GROUP BY status'):
+            stats[status] = count
+
+        return stats
+
+    def iter_results(self, epoch=None):
+        if epoch is None:
+            rows = self._get_connection().execute('SELECT record FROM results ORDER BY epoch, asin')
+        else:
+            rows = self._get_connection().execute('SELECT record FROM results WHERE epoch = ? ORDER BY asin', (epoch,))
+
+        for (record,) in rows:
+            yield json.loads(record)
+
+    def close(self):
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+        self._thread_local = threading.local()
+
+
+def create_work_queue(args):
+    """creates the broker of the distributed crawl requested in args
+
+    Parameters
+    ----------
+    args : namedtuple
+        the namespace variable that contains the config for the crawl
+
+    Returns
+    -------
+    WorkQueue
+        the broker shared by the workers
+    """
+
+    return SQLiteWorkQueue(args.queue_path, args.lease_timeout, args.queue_max_attempts)
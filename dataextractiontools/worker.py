@@ -0,0 +1,356 @@
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+from dataextractiontools.browser_profile import create_browser_profile
+from dataextractiontools.metrics import get_metrics
+from dataextractiontools.output_sinks import OUTPUT_NAMES, get_output_sink, make_record
+from dataextractiontools.page_acquisition import PageAcquisition
+from dataextractiontools.parsing_stage import extract_info_from_page_source
+from dataextractiontools.utils import to_product_URL
+from dataextractiontools.webdriver_pool import WebDriverPool
+
+
+def get_descendant_pids(pid):
+    """returns the pids of the descendants of a process, read from /proc
+
+    Parameters
+    ----------
+    pid : int
+        the pid of the process
+
+    Returns
+    -------
+    list
+        the pids of its children, of their children and so on, empty where /proc can not be read
+    """
+
+    children = dict()
+    for stat_path in Path('/proc').glob('[0-9]*/stat'):
+        try:
+            stat = stat_path.read_text()
+        except OSError:
+            # the process exited in the meantime
+            continue
+        # the command name may contain spaces and parentheses, the state and the parent pid follow its last parenthesis
+        parent_pid = int(stat[stat.rindex(')') + 2:].split()[1])
+        children.setdefault(parent_pid, []).append(int(stat_path.parent.name))
+
+    pids = list(children.get(pid, []))
+    for descendant_pid in pids:
+        pids.extend(children.get(descendant_pid, []))
+
+    return pids
+
+
+def get_rss_mb():
+    """returns the current resident set size of the process and of its descendants in megabytes
+
+    The descendants of a worker are its webdriver and the browser processes it started, which hold most of its memory.
+
+    Returns
+    -------
+    float
+        the current RSS, or the peak RSS of the process alone where the current one can not be read, e.g. on macOS
+    """
+
+    pid = os.getpid()
+    try:
+        with open('/proc/self/statm') as fh:
+            rss_pages = int(fh.read().split()[1])
+    except (OSError, ValueError):
+        rss_pages = None
+
+    if rss_pages is not None:
+        for descendant_pid in get_descendant_pids(pid):
+            try:
+                with open(f'/proc/{descendant_pid}/statm') as fh:
+                    rss_pages += int(fh.read().split()[1])
+            except (OSError, ValueError):
+                continue
+
+        return rss_pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+
+    if resource is None:
+        return 0.0
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # in bytes on macOS, in kilobytes elsewhere
+    if sys.platform == 'darwin':
+        max_rss /= 1024
+
+    return max_rss / 1024
+
+
+def iter_stdin_URLs():
+    """reads Amazon product URLs or ASINs from the standard input, one per line, until it is closed
+
+    Yields
+    ------
+    str
+        the URL of each product
+    """
+
+    for line in sys.stdin:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield to_product_URL(line)
+
+
+def _exit_on_sigterm(signum, frame):
+    # raised in the main thread, so the finally clauses quit the webdrivers
+    sys.exit(0)
+
+
+def _start_process_group():
+    # the webdriver and the browser inherit the process group of the worker, so they are killed with it
+    if hasattr(os, 'setpgid'):
+        os.setpgid(0, 0)
+
+
+def _kill_process_group(pid):
+    if not hasattr(os, 'killpg'):
+        return
+
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        # the group is empty, all its processes exited
+        pass
+
+
+def _run_worker_process(args, connection):
+    _start_process_group()
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+
+    driver_pool = WebDriverPool(1, args.driver_max_pages, create_browser_profile(args))
+    page_acquisition = PageAcquisition(args, driver_pool)
+    metrics = get_metrics()
+
+    try:
+        while True:
+            URL = connection.recv()
+            if URL is None:
+                break
+
+            start_time = time.perf_counter()
+            try:
+                page_source = page_acquisition.acquire_page_source(URL)
+                info_dict = extract_info_from_page_source(args, URL, page_source)
+                error = None
+            except Exception as e:
+                info_dict = None
+                error = repr(e)
+            # the page is dropped before the RSS is measured
+            page_source = None
+
+            metrics.set_gauge('worker_rss_mb', get_rss_mb())
+            connection.send((info_dict, error, time.perf_counter() - start_time, metrics.drain()))
+    finally:
+        driver_pool.close()
+        page_acquisition.close()
+
+
+class MemoryBoundedWorker():
+    """A long-running worker scraping a stream of Amazon product web pages within a hard memory budget
+
+    The pages are scraped one at a time in a child process, which only holds the webdriver, the page being scraped and
+    its tree. The extracted info is sent back to this process, which dumps it. After each page, the child reports the
+    RSS of its process tree, i.e. its own and the one of its webdriver and browser processes, and it is recycled, i.e.
+    stopped and replaced by a fresh one, as soon as it exceeds the budget. A page which crashes or hangs the child is
+    failed and the child is replaced. Each child leads its own process group, which is killed when the child is
+    stopped, so no browser process outlives it. The children are started with spawn, so they do not inherit the memory
+    of this process.
+
+    ...
+
+    Attributes
+    ----------
+    args : namedtuple
+        the arguments pre-defined by the user and imported from config.py
+    max_rss_mb : float
+        the RSS budget of the child process in megabytes
+    page_timeout : float
+        the time in seconds after which a page hanging the child is failed
+    stats_interval : float
+        the interval in seconds between two reports of the memory stats, 0 disables the reports
+    num_scraped_pages : int
+        the number of pages scraped successfully
+    num_recycled_workers : int
+        the number of child processes recycled
+    failed_URLs : list
+        the URLs whose scraping failed
+
+    Methods
+    -------
+    scrape(URL)
+        scrapes a single Amazon product web page in the child process
+    report()
+        prints the memory stats of the worker
+    run(URLs)
+        scrapes a stream of Amazon product web pages until it is exhausted
+    """
+
+    def __init__(self, args):
+        """
+        Parameters
+        ----------
+        args : namedtuple
+            the namespace variable that contains the config for the scraper
+        """
+
+        self.args = args
+        self.max_rss_mb = args.max_rss_mb
+        self.page_timeout = args.worker_page_timeout
+        self.stats_interval = args.stats_interval
+
+        self.num_scraped_pages = 0
+        self.num_recycled_workers = 0
+        self.failed_URLs = []
+
+        self._context = multiprocessing.get_context('spawn')
+        self._process = None
+        self._connection = None
+
+        # the memory stats of the current child process
+        self._rss_mb = 0.0
+        self._first_rss_mb = None
+        self._num_child_pages = 0
+        self._max_growth_per_page_mb = 0.0
+
+    def _start(self):
+        self._connection, child_connection = self._context.Pipe()
+        self._process = self._context.Process(target=_run_worker_process, args=(self.args, child_connection), daemon=True)
+        self._process.start()
+        child_connection.close()
+
+        self._first_rss_mb = None
+        self._num_child_pages = 0
+
+    def _stop(self, timeout=30):
+        if self._process is None:
+            return
+
+        try:
+            self._connection.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+
+        self._process.join(timeout)
+        if self._process.is_alive():
+            # SIGTERM lets the child quit its webdriver
+            self._process.terminate()
+            self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.kill()
+        # the webdriver and the browser left behind by a crashed or killed child are killed with its process group
+        _kill_process_group(self._process.pid)
+        self._process.join()
+
+        self._connection.close()
+        self._process = None
+        self._connection = None
+
+    def _recycle(self):
+        self._stop()
+        self.num_recycled_workers += 1
+        get_metrics().increment('worker_recycles')
+
+    def _on_page_done(self, rss_mb):
+        self._rss_mb = rss_mb
+        self._num_child_pages += 1
+
+        if self._first_rss_mb is None:
+            self._first_rss_mb = rss_mb
+        elif self._num_child_pages > 1:
+            # the growth after the first page, which loads the modules and starts the webdriver
+            growth_per_page_mb = (rss_mb - self._first_rss_mb) / (self._num_child_pages - 1)
+            self._max_growth_per_page_mb = max(self._max_growth_per_page_mb, growth_per_page_mb)
+            get_metrics().set_gauge('worker_rss_growth_per_page_mb', growth_per_page_mb)
+
+    def scrape(self, URL):
+        """scrapes a single Amazon product web page in the child process
+
+        Parameters
+        ----------
+        URL : str
+            the URL of a Amazon product web page
+        """
+
+        if self._process is None:
+            self._start()
+
+        metrics = get_metrics()
+
+        try:
+            self._connection.send(URL)
+            if not self._connection.poll(self.page_timeout):
+                raise TimeoutError(f'the page was not scraped within {self.page_timeout}s')
+            info_dict, error, elapsed_time, worker_metrics = self._connection.recv()
+        except (EOFError, OSError, TimeoutError) as e:
+            # the child crashed or hangs, it is replaced by a fresh one
+            print(f'failed to scrape {URL}: {e!r}')
+            self.failed_URLs.append(URL)
+            metrics.increment('pages', status='failed')
+            self._recycle()
+            return
+
+        metrics.merge(worker_metrics)
+        metrics.observe('worker_page', elapsed_time)
+        self._on_page_done(worker_metrics['gauges'].get(('worker_rss_mb', ()), 0.0))
+
+        if error is not None:
+            print(f'failed to scrape {URL}: {error}')
+            self.failed_URLs.append(URL)
+            metrics.increment('pages', status='failed')
+        else:
+            self.num_scraped_pages += 1
+            metrics.increment('pages', status='scraped')
+            if self.args.verbosity_enabled:
+                print(f'{URL}:')
+                print(json.dumps(info_dict, indent=4))
+            if self.args.dump_info_enabled:
+                get_output_sink(self.args, OUTPUT_NAMES[self.args.info_type]).write(make_record(URL, info_dict))
+
+        if self._rss_mb > self.max_rss_mb:
+            print(f'the worker exceeds its memory budget ({self._rss_mb:.0f} MB > {self.max_rss_mb:.0f} MB), it is recycled')
+            self._recycle()
+
+    def report(self):
+        """prints the memory stats of the worker
+        """
+
+        print(f'scraped {self.num_scraped_pages} pages ({len(self.failed_URLs)} failed): worker RSS {self._rss_mb:.1f} MB '
+              f'(budget {self.max_rss_mb:.0f} MB), max growth {1024 * self._max_growth_per_page_mb:.1f} KB/page, '
+              f'{self.num_recycled_workers} workers recycled')
+
+    def run(self, URLs):
+        """scrapes a stream of Amazon product web pages until it is exhausted
+
+        Parameters
+        ----------
+        URLs : iterable
+            the URLs of Amazon product web pages, e.g. read from the standard input
+        """
+
+        last_report_time = time.monotonic()
+        try:
+            for URL in URLs:
+                self.scrape(URL)
+                if self.stats_interval > 0 and time.monotonic() - last_report_time >= self.stats_interval:
+                    self.report()
+                    last_report_time = time.monotonic()
+        finally:
+            self._stop()
+
+        self.report()
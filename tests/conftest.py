@@ -0,0 +1,114 @@
+import http.server
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from config import parse_args
+
+
+class StubHTTPServer():
+    """A local HTTP server replaying canned responses by path, which records the requests it receives
+
+    The responses of a path are served in order, the last one is served again for the next requests. A response is a
+    page source, served with a 200, or a (status_code, page_source, headers) tuple. The paths without responses get a 404.
+    The responses are delayed by delay seconds, and the maximum number of requests served at the same time is recorded
+    per host.
+    """
+
+    def __init__(self, delay=0.0):
+        self.responses = dict()
+        self.requests = []
+        self.delay = delay
+        self.max_active_requests = dict()
+        self._num_active_requests = dict()
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def URL(self, path, host='127.0.0.1'):
+        return f'http://{host}:{self._server.server_port}{path}'
+
+    def add(self, path, *responses):
+        self.responses[path] = list(responses)
+
+    def get_requests(self, path):
+        with self._lock:
+            return [headers for request_path, headers in self.requests if request_path == path]
+
+    def _handle(self, handler):
+        host = handler.headers.get('Host', '').split(':')[0]
+        with self._lock:
+            self._num_active_requests[host] = self._num_active_requests.get(host, 0) + 1
+            self.max_active_requests[host] = max(self.max_active_requests.get(host, 0), self._num_active_requests[host])
+        try:
+            self._respond(handler)
+        finally:
+            with self._lock:
+                self._num_active_requests[host] -= 1
+
+    def _respond(self, handler):
+        if self.delay > 0:
+            time.sleep(self.delay)
+
+        with self._lock:
+            self.requests.append((handler.path, dict(handler.headers)))
+            responses = self.responses.get(handler.path)
+            if not responses:
+                response = (404, '', dict())
+            elif len(responses) > 1:
+                response = responses.pop(0)
+            else:
+                response = responses[0]
+
+        if isinstance(response, str):
+            response = (200, response, dict())
+        status_code, page_source, headers = response
+
+        body = page_source.encode()
+        handler.send_response(status_code)
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.send_header('Content-Type', 'text/html')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        if status_code != 304:
+            handler.wfile.write(body)
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    server = StubHTTPServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def make_args(tmp_path, monkeypatch):
+    """returns a function parsing the flags of ATTARII, run in a temporary working directory"""
+
+    monkeypatch.chdir(tmp_path)
+
+    def _make_args(*argv):
+        return parse_args(list(argv))
+
+    return _make_args
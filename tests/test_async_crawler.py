@@ -0,0 +1,155 @@
+import asyncio
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+from conftest import StubHTTPServer
+from dataextractiontools import async_crawler
+from dataextractiontools.async_crawler import AsyncCrawler, TokenBucket
+from dataextractiontools.checkpoint import create_checkpoint_journal
+
+
+PRODUCT_PAGE = '<html><body><div id="title_feature_div"><span>Widget</span></div></body></html>'
+CAPTCHA_PAGE = '<html><body><form action="/errors/validateCaptcha"></form></body></html>'
+
+
+def create_crawler(make_args, *argv):
+    args = make_args('--selenium-fallback-disabled', '--stats-interval', '0', '--info-type', 'textual', *argv)
+    results = dict()
+
+    def handle_result(URL, info_dict):
+        results[URL] = info_dict
+
+    return AsyncCrawler(args, result_handler=handle_result), results
+
+
+@pytest.fixture
+def backoff_delays(monkeypatch):
+    """records the bounds of the jittered backoff delays, which are not waited"""
+
+    delays = []
+
+    def uniform(low, high):
+        delays.append((low, high))
+        return 0.0
+
+    monkeypatch.setattr(async_crawler.random, 'uniform', uniform)
+
+    return delays
+
+
+def test_token_bucket_limits_the_rate():
+    token_bucket = TokenBucket(rate=20, capacity=2)
+
+    async def acquire(num_tokens):
+        for _ in range(num_tokens):
+            await token_bucket.acquire()
+
+    start_time = time.monotonic()
+    asyncio.run(acquire(12))
+
+    # the burst of 2 tokens is free, the 10 others are refilled at 20 per second
+    assert time.monotonic() - start_time >= 0.45
+
+
+def test_crawl_respects_the_rate_limit(make_args, stub_server):
+    URLs = [stub_server.URL(f'/dp/B00000000{i}/') for i in range(6)]
+    for i in range(6):
+        stub_server.add(f'/dp/B00000000{i}/', PRODUCT_PAGE)
+    crawler, results = create_crawler(make_args, '--rate-limit', '2')
+
+    start_time = time.monotonic()
+    crawler.run(URLs)
+
+    # a burst of 2 requests, then 4 requests at 2 per second
+    assert time.monotonic() - start_time >= 1.9
+    assert sorted(results) == sorted(URLs)
+
+
+def test_per_host_concurrency(make_args):
+    stub_server = StubHTTPServer(delay=0.2)
+    try:
+        URLs = []
+        for i in range(8):
+            stub_server.add(f'/dp/B00000000{i}/', PRODUCT_PAGE)
+            URLs.append(stub_server.URL(f'/dp/B00000000{i}/', '127.0.0.1'))
+            URLs.append(stub_server.URL(f'/dp/B00000000{i}/', 'localhost'))
+        crawler, results = create_crawler(make_args, '--max-concurrency', '16', '--per-host-concurrency', '2')
+
+        crawler.run(URLs)
+    finally:
+        stub_server.close()
+
+    assert len(results) == 16
+    assert stub_server.max_active_requests == {'127.0.0.1': 2, 'localhost': 2}
+
+
+@pytest.mark.parametrize('error_response', [
+    (429, 'too many requests', dict()),
+    (503, 'unavailable', dict()),
+    CAPTCHA_PAGE,
+])
+def test_retries_with_full_jitter_backoff(make_args, stub_server, backoff_delays, error_response):
+    stub_server.add('/dp/B000000001/', error_response, error_response, PRODUCT_PAGE)
+    URL = stub_server.URL('/dp/B000000001/')
+    crawler, results = create_crawler(make_args, '--max-retries', '3', '--retry-backoff', '0.5')
+
+    crawler.run([URL])
+
+    assert len(stub_server.get_requests('/dp/B000000001/')) == 3
+    assert crawler.num_retries == 2
+    assert backoff_delays == [(0, 0.5), (0, 1.0)]
+    assert results[URL]['title']
+    assert crawler.failed_URLs == []
+
+
+def test_page_fails_when_the_retries_are_exhausted(make_args, stub_server, backoff_delays):
+    stub_server.add('/dp/B000000001/', (503, 'unavailable', dict()))
+    URL = stub_server.URL('/dp/B000000001/')
+    crawler, results = create_crawler(make_args, '--max-retries', '2', '--retry-backoff', '0.5')
+
+    crawler.run([URL])
+
+    assert len(stub_server.get_requests('/dp/B000000001/')) == 3
+    assert backoff_delays == [(0, 0.5), (0, 1.0)]
+    assert crawler.failed_URLs == [URL]
+    assert results == dict()
+
+
+@pytest.mark.parametrize('status_code', [403, 404])
+def test_client_errors_are_not_retried(make_args, stub_server, backoff_delays, status_code):
+    stub_server.add('/dp/B000000001/', (status_code, 'error', dict()), PRODUCT_PAGE)
+    URL = stub_server.URL('/dp/B000000001/')
+    crawler, results = create_crawler(make_args, '--max-retries', '3')
+
+    crawler.run([URL])
+
+    assert len(stub_server.get_requests('/dp/B000000001/')) == 1
+    assert crawler.num_retries == 0
+    assert backoff_delays == []
+    assert crawler.failed_URLs == [URL]
+
+
+def test_pages_are_recorded_as_done_once_their_records_are_written(make_args, stub_server, monkeypatch):
+    URLs = [stub_server.URL(f'/dp/B00000000{i}/') for i in range(4)]
+    for i in range(4):
+        stub_server.add(f'/dp/B00000000{i}/', PRODUCT_PAGE)
+    crawler, _ = create_crawler(make_args, '--checkpoint-enabled', '--dump-info-enabled')
+
+    output_path = Path('extracted_info', 'product_textual_info.jsonl').resolve()
+    record_done = crawler.checkpoint.record_done
+    done_URLs = []
+
+    def check_record_done(URL):
+        assert URL in [json.loads(line)['URL'] for line in output_path.read_text().splitlines()]
+        done_URLs.append(URL)
+        record_done(URL)
+
+    monkeypatch.setattr(crawler.checkpoint, 'record_done', check_record_done)
+    crawler.run(URLs)
+
+    assert sorted(done_URLs) == sorted(URLs)
+    entries = create_checkpoint_journal(crawler.args).entries
+    assert [status for status, _, _ in entries.values()] == ['done'] * 4
@@ -0,0 +1,14 @@
+from dataextractiontools.benchmark import CORPUS_LAYOUTS, DEFAULT_CORPUS_PATH, benchmark_extractors, load_corpus, measure_extractors
+
+
+def test_default_corpus_covers_all_the_layouts():
+    results = measure_extractors(load_corpus([DEFAULT_CORPUS_PATH]), num_repeats=1)
+
+    assert sorted(results['layouts'].values()) == sorted(CORPUS_LAYOUTS)
+
+
+def test_extractors_benchmark_runs_on_the_default_corpus(tmp_path, capsys):
+    assert benchmark_extractors(num_repeats=1, output_path=tmp_path / 'results.json')
+
+    assert 'warning' not in capsys.readouterr().out
+    assert (tmp_path / 'results.json').exists()
@@ -0,0 +1,12 @@
+import pytest
+
+from dataextractiontools.browser_profile import create_browser_profile
+from dataextractiontools.crawl_planner import MARKETPLACES
+
+
+@pytest.mark.parametrize('marketplace', MARKETPLACES)
+def test_scrape_profile_allows_every_marketplace(make_args, marketplace):
+    browser_profile = create_browser_profile(make_args())
+    host = f'www.amazon.{marketplace}'
+
+    assert any(host == domain or host.endswith('.' + domain) for domain in browser_profile.allowed_domains)
@@ -0,0 +1,74 @@
+from dataextractiontools.checkpoint import CheckpointJournal
+
+
+URLS = [f'https://www.amazon.com/dp/B00000000{i}/' for i in range(4)]
+
+
+def test_get_pending(tmp_path):
+    checkpoint = CheckpointJournal(tmp_path / 'checkpoint.tsv', max_attempts=2)
+    checkpoint.record_done(URLS[0])
+    checkpoint.record_failure(URLS[1], 'timeout')
+
+    # the failed page is retried, the duplicates are dropped, the order of the batch is kept
+    assert checkpoint.get_pending([URLS[3], URLS[0], URLS[1], URLS[2], URLS[3]]) == [URLS[3], URLS[1], URLS[2]]
+    # the same ASIN on another marketplace is another page
+    assert checkpoint.get_pending(['https://www.amazon.de/dp/B000000000/']) == ['https://www.amazon.de/dp/B000000000/']
+
+
+def test_failed_page_is_skipped_after_max_attempts(tmp_path):
+    checkpoint = CheckpointJournal(tmp_path / 'checkpoint.tsv', max_attempts=3)
+
+    assert [checkpoint.record_failure(URLS[0], f'error\t{i}\n') for i in range(3)] == ['failed', 'failed', 'skipped']
+    assert checkpoint.entries['B000000000'] == ('skipped', 3, 'error 2')
+    assert checkpoint.get_pending(URLS[:1]) == []
+    assert checkpoint.get_stats() == {'done': 0, 'failed': 0, 'skipped': 1}
+    checkpoint.close()
+
+    # the attempts are counted across the runs
+    checkpoint = CheckpointJournal(tmp_path / 'checkpoint.tsv', max_attempts=3)
+    assert checkpoint.entries['B000000000'] == ('skipped', 3, 'error 2')
+
+
+def test_truncated_last_line_is_recovered(tmp_path):
+    journal_path = tmp_path / 'checkpoint.tsv'
+    checkpoint = CheckpointJournal(journal_path)
+    checkpoint.record_done(URLS[0])
+    checkpoint.record_failure(URLS[1], 'timeout')
+    checkpoint.close()
+    # a crash in the middle of the last line
+    with journal_path.open('a') as fh:
+        fh.write('done\t0\tB0000')
+
+    checkpoint = CheckpointJournal(journal_path)
+    assert checkpoint.entries == {'B000000000': ('done', 0, ''), 'B000000001': ('failed', 1, 'timeout')}
+
+    # the next line is not appended to the truncated one
+    checkpoint.record_done(URLS[2])
+    checkpoint.close()
+    assert CheckpointJournal(journal_path).entries == {
+        'B000000000': ('done', 0, ''),
+        'B000000001': ('failed', 1, 'timeout'),
+        'B000000002': ('done', 0, ''),
+    }
+
+
+def test_compact_keeps_the_latest_line_of_each_page(tmp_path):
+    journal_path = tmp_path / 'checkpoint.tsv'
+    checkpoint = CheckpointJournal(journal_path, compact_interval=3)
+
+    checkpoint.record_failure(URLS[0], 'timeout')
+    checkpoint.record_failure(URLS[0], 'timeout')
+    checkpoint.record_failure(URLS[1], 'timeout')
+    assert len(journal_path.read_text().splitlines()) == 3
+    checkpoint.record_done(URLS[0])
+    checkpoint.record_done(URLS[1])
+
+    # the fifth line made 3 lines outdated, the journal was rewritten with the latest line of each page
+    assert journal_path.read_text().splitlines() == ['done\t2\tB000000000\t', 'done\t1\tB000000001\t']
+    checkpoint.record_done(URLS[2])
+    checkpoint.close()
+    assert CheckpointJournal(journal_path).entries == {
+        'B000000000': ('done', 2, ''),
+        'B000000001': ('done', 1, ''),
+        'B000000002': ('done', 0, ''),
+    }
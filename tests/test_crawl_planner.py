@@ -0,0 +1,110 @@
+from dataextractiontools.async_crawler import AsyncCrawler
+from dataextractiontools.crawl_planner import CrawlPlanner, find_variant_asins
+from dataextractiontools.utils import get_product_key
+
+
+# a product web page whose twister lists 4 variants, the product itself included, in its script and in its swatches
+TWISTER_PAGE = '''<html><body>
+<div id="title_feature_div"><span>Widget, Blue</span></div>
+<div id="twister">
+<ul>
+<li data-defaultasin="B000000001"><img alt="Blue"></li>
+<li data-defaultasin="B000000002"><img alt="Red"></li>
+<li data-dp-url="/Widget-Green/dp/B000000003/ref=twister"><img alt="Green"></li>
+</ul>
+</div>
+<script>
+var dataToReturn = {"dimensionValuesDisplayData" : {"B000000001":["Blue"],"B000000002":["Red"],"B000000004":["Black"]}};
+</script>
+</body></html>'''
+VARIANT_PAGE = '<html><body><div id="title_feature_div"><span>Widget</span></div></body></html>'
+
+TEMPLATE = 'http://127.0.0.1:8000/{marketplace}/dp/{asin}/'
+
+
+def test_find_variant_asins():
+    assert find_variant_asins(TWISTER_PAGE) == ['B000000001', 'B000000002', 'B000000004', 'B000000003']
+    assert find_variant_asins(VARIANT_PAGE) == []
+
+
+def test_marketplace_expansion_on_a_non_amazon_host():
+    planner = CrawlPlanner(['com', 'co.uk', 'de'], TEMPLATE)
+
+    URLs = planner.plan(['B000000001', 'https://www.amazon.fr/dp/B000000001/', 'https://www.amazon.com/dp/B000000005/'])
+
+    assert URLs == [
+        'http://127.0.0.1:8000/com/dp/B000000001/',
+        'http://127.0.0.1:8000/co.uk/dp/B000000001/',
+        'http://127.0.0.1:8000/de/dp/B000000001/',
+        'http://127.0.0.1:8000/com/dp/B000000005/',
+        'http://127.0.0.1:8000/co.uk/dp/B000000005/',
+        'http://127.0.0.1:8000/de/dp/B000000005/',
+    ]
+    assert planner.num_duplicates == 3
+    # the pages of the marketplaces do not collide in the journals and the stores either
+    assert len({get_product_key(URL) for URL in URLs}) == 6
+
+
+def test_variant_discovery_on_the_marketplace_of_the_page():
+    planner = CrawlPlanner(['com', 'de'], TEMPLATE, variants_enabled=True)
+    planner.plan(['B000000001'])
+
+    variant_URLs = planner.discover('http://127.0.0.1:8000/de/dp/B000000001/', TWISTER_PAGE)
+
+    assert variant_URLs == [
+        'http://127.0.0.1:8000/de/dp/B000000002/',
+        'http://127.0.0.1:8000/de/dp/B000000004/',
+        'http://127.0.0.1:8000/de/dp/B000000003/',
+    ]
+    assert planner.num_discovered_variants == 3
+    assert planner.num_planned_pages == 5
+
+
+def test_variants_are_planned_once():
+    planner = CrawlPlanner(['com', 'de'], TEMPLATE, variants_enabled=True)
+    planner.plan(['B000000001', 'B000000002'])
+
+    # the variant B000000002 is already planned, and the second page lists the same variants
+    assert planner.discover('http://127.0.0.1:8000/com/dp/B000000001/', TWISTER_PAGE) == [
+        'http://127.0.0.1:8000/com/dp/B000000004/',
+        'http://127.0.0.1:8000/com/dp/B000000003/',
+    ]
+    assert planner.discover('http://127.0.0.1:8000/com/dp/B000000002/', TWISTER_PAGE) == []
+    assert planner.discover('http://127.0.0.1:8000/com/dp/B000000004/', VARIANT_PAGE) == []
+    assert planner.num_planned_pages == 6
+
+
+def test_max_variants_per_page():
+    planner = CrawlPlanner(['com'], TEMPLATE, variants_enabled=True, max_variants_per_page=2)
+    planner.plan(['B000000001'])
+
+    assert planner.discover('http://127.0.0.1:8000/com/dp/B000000001/', TWISTER_PAGE) == [
+        'http://127.0.0.1:8000/com/dp/B000000002/',
+        'http://127.0.0.1:8000/com/dp/B000000004/',
+    ]
+    # the variants left out by the cap are added when another page lists them
+    assert planner.discover('http://127.0.0.1:8000/com/dp/B000000002/', TWISTER_PAGE) == ['http://127.0.0.1:8000/com/dp/B000000003/']
+    assert planner.num_discovered_variants == 3
+
+
+def test_variants_are_disabled_by_default():
+    planner = CrawlPlanner(['com'], TEMPLATE)
+    planner.plan(['B000000001'])
+
+    assert planner.discover('http://127.0.0.1:8000/com/dp/B000000001/', TWISTER_PAGE) == []
+
+
+def test_crawl_of_the_marketplaces_and_the_variants(make_args, stub_server):
+    for marketplace in ['com', 'de']:
+        stub_server.add(f'/{marketplace}/dp/B000000001/', TWISTER_PAGE)
+        for asin in ['B000000002', 'B000000003', 'B000000004']:
+            stub_server.add(f'/{marketplace}/dp/{asin}/', VARIANT_PAGE)
+    planner = CrawlPlanner(['com', 'de'], stub_server.URL('/{marketplace}/dp/{asin}/'), variants_enabled=True)
+    args = make_args('--selenium-fallback-disabled', '--stats-interval', '0', '--info-type', 'textual')
+    results = dict()
+
+    AsyncCrawler(args, result_handler=results.__setitem__, page_handler=planner.discover).run(planner.plan(['B000000001']))
+
+    assert sorted(results) == sorted(stub_server.URL(f'/{marketplace}/dp/{asin}/') for marketplace in ['com', 'de']
+                                     for asin in ['B000000001', 'B000000002', 'B000000003', 'B000000004'])
+    assert planner.num_planned_pages == 8
@@ -0,0 +1,137 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from dataextractiontools.fetchers import HTTPFetcher, PageFetchError, PageFetcher, is_captcha_page
+from dataextractiontools.page_acquisition import PageAcquisition
+
+
+PRODUCT_PAGE = '<html><body><div id="title_feature_div"><span>Widget</span></div></body></html>'
+EMPTY_PAGE = '<html><body><div id="nav">nothing to extract</div></body></html>'
+CAPTCHA_PAGE = '<html><body><form action="/errors/validateCaptcha"></form></body></html>'
+
+
+class RecordingFetcher(PageFetcher):
+    def __init__(self, page_source):
+        self.page_source = page_source
+        self.URLs = []
+        self.num_closes = 0
+
+    def fetch(self, URL):
+        self.URLs.append(URL)
+        return self.page_source
+
+    def close(self):
+        self.num_closes += 1
+
+
+def test_fetch_returns_the_page_source(stub_server):
+    stub_server.add('/dp/B000000001/', PRODUCT_PAGE)
+
+    assert HTTPFetcher().fetch(stub_server.URL('/dp/B000000001/')) == PRODUCT_PAGE
+
+
+@pytest.mark.parametrize('status_code', [403, 404, 503])
+def test_fetch_raises_on_error_status(stub_server, status_code):
+    stub_server.add('/dp/B000000001/', (status_code, 'error', dict()))
+
+    with pytest.raises(PageFetchError) as excinfo:
+        HTTPFetcher().fetch(stub_server.URL('/dp/B000000001/'))
+    assert excinfo.value.status_code == status_code
+
+
+def test_fetch_raises_without_status_when_unreachable(stub_server):
+    URL = stub_server.URL('/dp/B000000001/')
+    stub_server.close()
+
+    with pytest.raises(PageFetchError) as excinfo:
+        HTTPFetcher(timeout=2).fetch(URL)
+    assert excinfo.value.status_code is None
+
+
+def test_fetch_if_modified_sends_the_validators_and_handles_304(stub_server):
+    path = '/dp/B000000001/'
+    stub_server.add(path, (200, PRODUCT_PAGE, {'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}), (304, '', dict()))
+    fetcher = HTTPFetcher()
+
+    page_source, validators = fetcher.fetch_if_modified(stub_server.URL(path), dict())
+    assert page_source == PRODUCT_PAGE
+    assert validators == {'etag': '"v1"', 'last_modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+
+    page_source, new_validators = fetcher.fetch_if_modified(stub_server.URL(path), validators)
+    assert page_source is None
+    assert new_validators == validators
+
+    headers = stub_server.get_requests(path)[-1]
+    assert headers['If-None-Match'] == '"v1"'
+    assert headers['If-Modified-Since'] == 'Mon, 01 Jan 2024 00:00:00 GMT'
+
+
+def test_is_captcha_page():
+    assert is_captcha_page(CAPTCHA_PAGE)
+    assert is_captcha_page('<p>Type the characters you see in this image</p>')
+    assert not is_captcha_page(PRODUCT_PAGE)
+
+
+def create_page_acquisition(make_args, stub_server, fallback_page_source=PRODUCT_PAGE):
+    page_acquisition = PageAcquisition(make_args())
+    page_acquisition.fetcher = HTTPFetcher()
+    page_acquisition.fallback_fetcher = RecordingFetcher(fallback_page_source)
+
+    return page_acquisition
+
+
+@pytest.mark.parametrize('acquire', ['acquire_page_source', 'acquire'])
+def test_no_fallback_when_the_page_has_product_info(make_args, stub_server, acquire):
+    stub_server.add('/dp/B000000001/', PRODUCT_PAGE)
+    page_acquisition = create_page_acquisition(make_args, stub_server, 'fallback')
+
+    result = getattr(page_acquisition, acquire)(stub_server.URL('/dp/B000000001/'))
+
+    assert (result if acquire == 'acquire_page_source' else result[0]) == PRODUCT_PAGE
+    assert page_acquisition.fallback_fetcher.URLs == []
+    assert page_acquisition.num_fallbacks == 0
+
+
+@pytest.mark.parametrize('acquire', ['acquire_page_source', 'acquire'])
+@pytest.mark.parametrize('response', [EMPTY_PAGE, (503, 'unavailable', dict())])
+def test_fallback_on_empty_page_or_fetch_error(make_args, stub_server, acquire, response):
+    stub_server.add('/dp/B000000001/', response)
+    page_acquisition = create_page_acquisition(make_args, stub_server)
+    URL = stub_server.URL('/dp/B000000001/')
+
+    result = getattr(page_acquisition, acquire)(URL)
+
+    assert (result if acquire == 'acquire_page_source' else result[0]) == PRODUCT_PAGE
+    assert page_acquisition.fallback_fetcher.URLs == [URL]
+    assert page_acquisition.num_fallbacks == 1
+
+
+def test_fetch_error_is_raised_when_the_fallback_is_disabled(make_args, stub_server):
+    stub_server.add('/dp/B000000001/', (503, 'unavailable', dict()))
+    page_acquisition = create_page_acquisition(make_args, stub_server)
+    page_acquisition.fallback_fetcher = None
+
+    with pytest.raises(PageFetchError):
+        page_acquisition.acquire_page_source(stub_server.URL('/dp/B000000001/'))
+
+
+def test_fallbacks_are_counted_across_threads(make_args, stub_server):
+    page_acquisition = create_page_acquisition(make_args, stub_server)
+    page_acquisition.fetcher = RecordingFetcher(EMPTY_PAGE)
+    URLs = [f'https://www.amazon.com/dp/B{i:09d}/' for i in range(400)]
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(page_acquisition.acquire_page_source, URLs))
+
+    assert page_acquisition.num_fallbacks == len(URLs)
+
+
+def test_close_closes_the_fetcher_and_the_fallback(make_args, stub_server):
+    page_acquisition = create_page_acquisition(make_args, stub_server)
+    page_acquisition.fetcher = RecordingFetcher(PRODUCT_PAGE)
+
+    page_acquisition.close()
+
+    assert page_acquisition.fetcher.num_closes == 1
+    assert page_acquisition.fallback_fetcher.num_closes == 1
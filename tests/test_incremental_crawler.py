@@ -0,0 +1,102 @@
+import math
+
+import pytest
+
+from dataextractiontools import incremental_crawler
+from dataextractiontools.benchmark import DEFAULT_CORPUS_PATH
+from dataextractiontools.incremental_crawler import CrawlState, IncrementalCrawler, fingerprint_sections
+
+
+DAY = 86400
+
+PAGE = (DEFAULT_CORPUS_PATH / 'type1.html').read_text()
+# the same product, whose Best Sellers Rank moved
+RANK_MOVED_PAGE = PAGE.replace('#1,018 in Electronics', '#2,036 in Electronics')
+# the same product, whose title changed
+TITLE_CHANGED_PAGE = PAGE.replace('Apple Watch Series 6 (GPS, 40mm)', 'Apple Watch Series 6 (GPS, 44mm)')
+
+
+@pytest.fixture
+def create_crawler(make_args):
+    def _create_crawler(*argv):
+        return IncrementalCrawler(make_args('--selenium-fallback-disabled', '--stats-interval', '0', '--incremental-enabled', *argv))
+
+    return _create_crawler
+
+
+def test_the_best_sellers_rank_is_not_fingerprinted():
+    info_dict = {'product_detail_table': {'ASIN': 'B08J5SCX5C', 'Best Sellers Rank': ['#1,018 in Electronics']}, 'title': 'Watch'}
+    moved_info_dict = {'product_detail_table': {'ASIN': 'B08J5SCX5C', 'Best Sellers Rank': ['#2,036 in Electronics']}, 'title': 'Watch'}
+
+    assert fingerprint_sections(info_dict) == fingerprint_sections(moved_info_dict)
+    assert set(fingerprint_sections(info_dict)) == {'product_detail_table', 'title'}
+
+
+def test_check_statuses(create_crawler, stub_server):
+    stub_server.add('/dp/B08J5SCX5C/', (200, PAGE, {'ETag': '"v1"'}), (200, PAGE, {'ETag': '"v1"'}), (304, '', dict()), RANK_MOVED_PAGE, TITLE_CHANGED_PAGE)
+    URL = stub_server.URL('/dp/B08J5SCX5C/')
+    crawler = create_crawler('--info-type', 'all')
+
+    assert crawler.check(URL) == 'changed'
+    assert crawler.check(URL) == 'same_page'
+    assert crawler.check(URL) == 'not_modified'
+    # the validators of the first download are sent back
+    assert stub_server.get_requests('/dp/B08J5SCX5C/')[2]['If-None-Match'] == '"v1"'
+
+    assert crawler.check(URL) == 'unchanged'
+    entry = crawler.crawl_state.get(URL)
+    assert entry['best_sellers_ranks'] == {'Electronics': 2036, 'Smartwatches': 34}
+    assert entry['rank_volatility'] == pytest.approx(0.3 * math.log(2) / 2)
+
+    assert crawler.check(URL) == 'changed'
+    assert crawler.crawl_state.get(URL)['changed_at'] is not None
+
+
+def test_changed_sections_are_dumped(create_crawler, stub_server, monkeypatch):
+    stub_server.add('/dp/B08J5SCX5C/', PAGE, TITLE_CHANGED_PAGE)
+    URL = stub_server.URL('/dp/B08J5SCX5C/')
+    crawler = create_crawler('--info-type', 'all', '--dump-info-enabled')
+    written = []
+
+    class OutputSink():
+        def write(self, record, on_written=None):
+            written.append((record, on_written))
+
+    monkeypatch.setattr(incremental_crawler, 'get_output_sink', lambda args, name: OutputSink())
+
+    assert crawler.check(URL) == 'changed'
+    # the check is only recorded once the record is written, so a lost record is emitted by the next run
+    assert crawler.crawl_state.get(URL) is None
+    record, on_written = written.pop()
+    on_written()
+    assert crawler.crawl_state.get(URL)['fingerprints'] == fingerprint_sections(record)
+
+    assert crawler.check(URL) == 'changed'
+    record, _ = written.pop()
+    assert record['changed_sections'] == ['title']
+
+
+def test_crawl_state_is_reloaded(tmp_path):
+    crawl_state = CrawlState(tmp_path / 'crawl_state.jsonl')
+    crawl_state.update('https://www.amazon.com/dp/B000000001/', checked_at=1, change_rate=0.5)
+    crawl_state.update('https://www.amazon.com/dp/B000000001/', checked_at=2)
+    with crawl_state.state_path.open('a') as fh:
+        fh.write('{"asin": "B0000')
+
+    entries = CrawlState(tmp_path / 'crawl_state.jsonl').entries
+
+    assert entries == {'B000000001': {'asin': 'B000000001', 'URL': 'https://www.amazon.com/dp/B000000001/', 'checked_at': 2, 'change_rate': 0.5}}
+
+
+def test_priority_order(tmp_path):
+    crawl_state = CrawlState(tmp_path / 'crawl_state.jsonl')
+    now = 10 * DAY
+    URLs = {name: f'https://www.amazon.com/dp/B00000000{i}/' for i, name in enumerate(['never', 'stale', 'fresh', 'volatile', 'changing'])}
+    crawl_state.update(URLs['stale'], checked_at=now - 4 * DAY)
+    crawl_state.update(URLs['fresh'], checked_at=now - 1 * DAY)
+    crawl_state.update(URLs['volatile'], checked_at=now - 2 * DAY, rank_volatility=0.8)
+    crawl_state.update(URLs['changing'], checked_at=now - 2 * DAY, change_rate=0.6)
+
+    assert crawl_state.get_priority(crawl_state.get(URLs['never']), now) == math.inf
+    assert crawl_state.get_priority(crawl_state.get(URLs['volatile']), now) == pytest.approx(3.6)
+    assert crawl_state.prioritize(list(URLs.values()), now) == [URLs[name] for name in ['never', 'stale', 'volatile', 'changing', 'fresh']]
@@ -0,0 +1,14 @@
+from dataextractiontools.metrics import Metrics
+
+
+def test_prometheus_label_values_are_escaped():
+    metrics = Metrics()
+    metrics.increment('selector_matches', rule='say "hi"\\n\nnext line')
+    metrics.observe('extract', 0.5, extractor='title')
+
+    lines = metrics.to_prometheus_text().splitlines()
+
+    assert 'attarii_selector_matches_total{rule="say \\"hi\\"\\\\n\\nnext line"} 1' in lines
+    assert 'attarii_stage_seconds_count{stage="extract",extractor="title"} 1' in lines
+    # every sample stays on a single line
+    assert all(line.startswith(('# ', 'attarii_')) for line in lines)
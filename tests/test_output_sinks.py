@@ -0,0 +1,96 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from dataextractiontools.output_sinks import JSONLSink, SQLiteSink
+
+
+class FailingSink(JSONLSink):
+    """a sink whose first batch of records fails to be written"""
+
+    def __init__(self, path):
+        self.failed = threading.Event()
+        super().__init__(path)
+
+    def _write_records(self, records):
+        if not self.failed.is_set():
+            self.failed.set()
+            raise OSError('disk full')
+        super()._write_records(records)
+
+
+def test_writer_error_is_raised_by_the_next_write_and_by_close(tmp_path):
+    output_sink = FailingSink(tmp_path / 'out.jsonl')
+
+    output_sink.write({'asin': 'B000000001'})
+    assert output_sink.failed.wait(5)
+    deadline = time.monotonic() + 5
+    while output_sink._error is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    with pytest.raises(OSError, match='disk full'):
+        output_sink.write({'asin': 'B000000002'})
+
+    # the writer thread is still running, so close() returns and raises the error as well
+    assert output_sink._writer.is_alive()
+    with pytest.raises(OSError, match='disk full'):
+        output_sink.close()
+    assert not output_sink._writer.is_alive()
+
+
+def count_records(output_sink):
+    if output_sink.output_format == 'sqlite':
+        import sqlite3
+        with sqlite3.connect(output_sink.path) as connection:
+            return connection.execute('SELECT COUNT(*) FROM products').fetchone()[0]
+
+    return len(output_sink.path.read_text().splitlines())
+
+
+@pytest.mark.parametrize('output_format', ['jsonl', 'sqlite'])
+def test_on_written_is_called_once_the_record_is_in_the_file(tmp_path, output_format):
+    output_sink = JSONLSink(tmp_path / 'out.jsonl') if output_format == 'jsonl' else SQLiteSink(tmp_path / 'out.sqlite', batch_size=2)
+    num_records_when_written = []
+
+    for i in range(3):
+        output_sink.write({'asin': f'B00000000{i}', 'URL': f'https://www.amazon.com/dp/B00000000{i}/'},
+                          lambda: num_records_when_written.append(count_records(output_sink)))
+    output_sink.close()
+
+    # the callbacks of a batch are called once the whole batch is in the file
+    assert len(num_records_when_written) == 3
+    assert all(num_records >= i + 1 for i, num_records in enumerate(num_records_when_written))
+
+
+def test_on_written_is_not_called_for_lost_records(tmp_path):
+    output_sink = FailingSink(tmp_path / 'out.jsonl')
+    written = []
+
+    output_sink.write({'asin': 'B000000001'}, lambda: written.append('B000000001'))
+    with pytest.raises(OSError):
+        output_sink.close()
+
+    assert written == []
+
+
+def test_resumed_parquet_batch_keeps_the_records_of_the_earlier_runs(make_args, stub_server):
+    pyarrow_parquet = pytest.importorskip('pyarrow.parquet')
+    from dataextractiontools.async_crawler import AsyncCrawler
+
+    page = '<html><body><div id="title_feature_div"><span>Widget</span></div></body></html>'
+    URLs = [stub_server.URL(f'/dp/B00000000{i}/') for i in range(3)]
+    stub_server.add('/dp/B000000000/', page)
+    stub_server.add('/dp/B000000001/', page)
+    # the last page fails in the first run, and is scraped by the resumed run
+    stub_server.add('/dp/B000000002/', (404, 'not found', dict()), page)
+    argv = ('--selenium-fallback-disabled', '--stats-interval', '0', '--info-type', 'textual', '--checkpoint-enabled',
+            '--dump-info-enabled', '--output-format', 'parquet')
+
+    for _ in range(2):
+        AsyncCrawler(make_args(*argv)).run(URLs)
+
+    part_paths = sorted(Path('extracted_info').glob('product_textual_info.*.parquet'))
+    assert len(part_paths) == 2
+    assert sorted(URL for part_path in part_paths for URL in pyarrow_parquet.read_table(part_path).column('URL').to_pylist()) == URLs
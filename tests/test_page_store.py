@@ -0,0 +1,97 @@
+import json
+import multiprocessing
+import time
+
+import pytest
+
+from dataextractiontools.page_store import PageStore, get_page_store
+
+
+DAY = 86400
+
+
+def get_object_paths(store_path):
+    return sorted(path.name for path in (store_path / 'objects').glob('*/*.html.gz'))
+
+
+def read_index(store_path):
+    with (store_path / 'index.jsonl').open() as fh:
+        return [json.loads(line) for line in fh]
+
+
+def test_evict_keeps_the_pages_stored_by_another_process(tmp_path):
+    first_store = PageStore(tmp_path, ttl_days=1, max_pages_per_asin=0)
+    second_store = PageStore(tmp_path, ttl_days=1, max_pages_per_asin=0)
+    now = 10 * DAY
+
+    first_store.put('https://www.amazon.com/dp/B000000001/', 'old page', fetched_at=now - 2 * DAY)
+    first_store.put('https://www.amazon.com/dp/B000000002/', 'fresh page', fetched_at=now)
+    second_store.put('https://www.amazon.com/dp/B000000003/', 'other page', fetched_at=now)
+
+    # the second store never saw the entries of the first one in memory
+    assert second_store.evict(now) == 1
+
+    assert sorted(entry['asin'] for entry in read_index(tmp_path)) == ['B000000002', 'B000000003']
+    assert sorted(second_store.entries) == ['B000000002', 'B000000003']
+    assert len(get_object_paths(tmp_path)) == 2
+    assert second_store.get_page_source(second_store.get_latest_entry('https://www.amazon.com/dp/B000000002/')) == 'fresh page'
+
+
+def test_evict_keeps_a_page_shared_with_a_kept_entry(tmp_path):
+    page_store = PageStore(tmp_path, ttl_days=1, max_pages_per_asin=0)
+    now = 10 * DAY
+
+    page_store.put('https://www.amazon.com/dp/B000000001/', 'same page', fetched_at=now - 2 * DAY)
+    page_store.put('https://www.amazon.com/dp/B000000001/', 'same page', fetched_at=now)
+
+    assert page_store.evict(now) == 1
+    assert len(get_object_paths(tmp_path)) == 1
+
+
+def test_evict_every_interval_of_puts(tmp_path):
+    page_store = PageStore(tmp_path, ttl_days=0, max_pages_per_asin=2, evict_interval=3)
+
+    for i in range(3):
+        page_store.put('https://www.amazon.com/dp/B000000001/', f'page {i}', fetched_at=i)
+        assert len(read_index(tmp_path)) == (i + 1 if i < 2 else 2)
+
+    assert [entry['fetched_at'] for entry in page_store.entries['B000000001']] == [1, 2]
+    assert len(get_object_paths(tmp_path)) == 2
+
+
+def _put_pages(store_path, worker_id, num_pages):
+    page_store = PageStore(store_path, ttl_days=0, max_pages_per_asin=1, evict_interval=5)
+    for i in range(num_pages):
+        page_store.put(f'https://www.amazon.com/dp/B{worker_id:04d}{i:05d}/', f'page {worker_id} {i}')
+
+
+def test_processes_sharing_a_store(tmp_path):
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=_put_pages, args=(tmp_path, worker_id, 40)) for worker_id in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert all(process.exitcode == 0 for process in processes)
+
+    # no entry is lost by the concurrent evictions, and every entry keeps its page
+    page_store = PageStore(tmp_path, ttl_days=0, max_pages_per_asin=1)
+    assert page_store.evict() == 0
+    assert len(page_store.entries) == 160
+    for URL in page_store.get_URLs():
+        assert page_store.get_page_source(page_store.get_latest_entry(URL)).startswith('page ')
+
+
+@pytest.mark.parametrize('argv, num_entries', [
+    (('--from-store',), 2),
+    (('--store-pages-enabled',), 1),
+])
+def test_only_a_store_storing_pages_is_evicted_when_opened(make_args, tmp_path, argv, num_entries):
+    page_store = PageStore(tmp_path / 'page_store', ttl_days=1, max_pages_per_asin=0)
+    page_store.put('https://www.amazon.com/dp/B000000001/', 'old page', fetched_at=time.time() - 2 * DAY)
+    page_store.put('https://www.amazon.com/dp/B000000002/', 'fresh page')
+
+    page_store = get_page_store(make_args('--page-store-path', str(tmp_path / 'page_store'), '--store-ttl-days', '1', *argv))
+
+    assert len(read_index(tmp_path / 'page_store')) == num_entries
+    assert len(page_store.get_URLs()) == num_entries
@@ -0,0 +1,41 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from dataextractiontools.benchmark import DEFAULT_CORPUS_PATH
+from dataextractiontools.fetchers import PageFetchError
+from dataextractiontools.page_acquisition import PageAcquisition
+from dataextractiontools.product import Product
+
+
+def test_product_does_not_import_the_command_line():
+    code = 'import sys, dataextractiontools.product; sys.exit("config" in sys.modules)'
+
+    assert subprocess.run([sys.executable, '-c', code], cwd=Path(__file__).resolve().parents[1]).returncode == 0
+
+
+def test_sections_are_extracted_without_the_command_line():
+    product = Product((DEFAULT_CORPUS_PATH / 'type1.html').read_text(), sections=['title', 'best_sellers_rank'])
+
+    assert product.best_sellers_rank == [(1018, 'Electronics'), (34, 'Smartwatches')]
+    assert product.title.startswith('Apple Watch Series 6')
+    assert product.is_released()
+
+
+def test_from_URL_closes_the_page_acquisition(make_args, stub_server, monkeypatch):
+    stub_server.add('/dp/B08J5SCX5C/', (DEFAULT_CORPUS_PATH / 'type1.html').read_text())
+    stub_server.add('/dp/B000000001/', (404, 'not found', dict()))
+    args = make_args('--selenium-fallback-disabled', '--info-type', 'all')
+    closed = []
+    close = PageAcquisition.close
+    monkeypatch.setattr(PageAcquisition, 'close', lambda self: closed.append(self) or close(self))
+
+    product = Product.from_URL(stub_server.URL('/dp/B08J5SCX5C/'), args)
+    assert product.title.startswith('Apple Watch Series 6')
+    assert len(closed) == 1
+
+    with pytest.raises(PageFetchError):
+        Product.from_URL(stub_server.URL('/dp/B000000001/'), args)
+    assert len(closed) == 2
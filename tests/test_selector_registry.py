@@ -0,0 +1,50 @@
+import pytest
+
+from dataextractiontools import selector_registry
+from dataextractiontools.browser_profile import get_product_info_containers_selector
+from dataextractiontools.page_acquisition import has_product_info, has_product_info_containers
+from dataextractiontools.selector_registry import get_product_info_containers, register_product_detail_table_layout
+from dataextractiontools.soup_builder import build_soup
+
+
+NEW_LAYOUT_PAGE = '''<html><body>
+<div id="nav">nothing to extract</div>
+<div id="newDetails"><table><tr><td>Screen</td><td>6 in</td></tr></table></div>
+</body></html>'''
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """restores the layouts of the registry and its derived matcher and containers after the test"""
+
+    monkeypatch.setattr(selector_registry, 'PRODUCT_DETAIL_TABLE_LAYOUTS', list(selector_registry.PRODUCT_DETAIL_TABLE_LAYOUTS))
+    monkeypatch.setattr(selector_registry, '_matcher', None)
+    monkeypatch.setattr(selector_registry, '_containers', None)
+
+
+def test_containers_are_derived_from_the_registry():
+    container_ids, container_classes = get_product_info_containers()
+
+    assert set(container_ids) == {
+        'prodDetails', 'detailBullets_feature_div', 'tech', 'productOverview_feature_div', 'title_feature_div',
+        'feature-bullets', 'productDescription', 'productDescription_feature_div',
+    }
+    assert container_classes == ('detail-bullet-list',)
+
+
+def test_registered_layout_is_seen_by_the_partial_soup_and_the_readiness_checks(registry):
+    assert not has_product_info_containers(NEW_LAYOUT_PAGE)
+    assert build_soup(NEW_LAYOUT_PAGE, 'partial').select_one('#newDetails') is None
+
+    register_product_detail_table_layout('type4', 'alternating_cells', {'cells': 'div#newDetails tr td'})
+
+    assert has_product_info_containers(NEW_LAYOUT_PAGE)
+    soup_obj = build_soup(NEW_LAYOUT_PAGE, 'partial')
+    assert [cell.get_text() for cell in soup_obj.select('div#newDetails tr td')] == ['Screen', '6 in']
+    assert has_product_info(soup_obj)
+    assert '#newDetails' in get_product_info_containers_selector().split(', ')
+
+
+def test_unanchored_selector_is_rejected(registry):
+    with pytest.raises(ValueError):
+        register_product_detail_table_layout('type4', 'alternating_cells', {'cells': 'table tr td'})
@@ -0,0 +1,26 @@
+import pytest
+
+from dataextractiontools.parsing_stage import extract_info_from_page_source
+from dataextractiontools.soup_builder import build_soup
+
+
+# no meta charset, so the encoding of the bytes is not declared in the page
+TITLE = 'Crème brûlée Torch – 日本語 ™'
+PAGE_SOURCE = f'<html><body><div id="title_feature_div"><span id="productTitle">{TITLE}</span></div></body></html>'
+
+
+@pytest.mark.parametrize('soup_parser', ['partial', 'full'])
+@pytest.mark.parametrize('page_source', [PAGE_SOURCE, PAGE_SOURCE.encode()], ids=['str', 'bytes'])
+def test_non_ascii_text_without_meta_charset(soup_parser, page_source):
+    soup_obj = build_soup(page_source, soup_parser)
+
+    assert soup_obj.select_one('div#title_feature_div').get_text(strip=True) == TITLE
+
+
+@pytest.mark.parametrize('soup_parser', ['partial', 'full'])
+def test_encoded_page_source_of_the_parse_workers(make_args, soup_parser):
+    args = make_args('--info-type', 'all', '--soup-parser', soup_parser)
+    URL = 'https://www.amazon.com/dp/B000000001/'
+
+    # the batch scraper hands the pages over to the parse workers as UTF-8 bytes
+    assert extract_info_from_page_source(args, URL, PAGE_SOURCE.encode()) == extract_info_from_page_source(args, URL, PAGE_SOURCE)
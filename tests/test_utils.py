@@ -0,0 +1,29 @@
+import re
+
+import pytest
+
+from dataextractiontools.utils import parse_best_sellers_rank, split_best_sellers_rank
+
+
+def split_best_sellers_rank_uncompiled(text):
+    # the splitting of the ranks by the extractors before the precompiled patterns of utils
+    return ["#" + re.sub(r'\(See .*\)', '', fragment).strip() for fragment in text.split("#")[1:]]
+
+
+@pytest.mark.parametrize('text', [
+    '#1,018 in Electronics (See Top 100 in Electronics) #34 in Smartwatches',
+    ' #12345 in Books (See Top 100 in Books)\n #7 in Science Fiction',
+    '#1 New Release in Smartwatches #2,000 in Electronics',
+    '#34 in Smartwatches #',
+    'no rank',
+])
+def test_split_best_sellers_rank_keeps_the_ranks_as_displayed(text):
+    assert split_best_sellers_rank(text) == split_best_sellers_rank_uncompiled(text)
+
+
+def test_best_sellers_rank():
+    text = '#12345 in Books (See Top 100 in Books) #1 New Release in Smartwatches #7 in Science Fiction'
+
+    assert split_best_sellers_rank(text) == ['#12345 in Books', '#1 New Release in Smartwatches', '#7 in Science Fiction']
+    # the structured ranks only hold the "#rank in category" pairs
+    assert parse_best_sellers_rank(text) == [(12345, 'Books'), (7, 'Science Fiction')]
@@ -0,0 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from dataextractiontools.webdriver_pool import WebDriverPool
+
+
+class FakeDriver():
+    def __init__(self):
+        self.num_quits = 0
+
+    def quit(self):
+        self.num_quits += 1
+
+
+class FakeBrowserProfile():
+    def __init__(self):
+        self.drivers = []
+
+    def create_driver(self):
+        driver = FakeDriver()
+        self.drivers.append(driver)
+        return driver
+
+    def load_page(self, driver, URL):
+        return f'<html>{URL}</html>'
+
+
+def test_drivers_are_recycled_across_threads():
+    browser_profile = FakeBrowserProfile()
+    driver_pool = WebDriverPool(4, 1, browser_profile)
+    URLs = [f'https://www.amazon.com/dp/B{i:09d}/' for i in range(400)]
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        page_sources = list(executor.map(driver_pool.get_page_source, URLs))
+    driver_pool.close()
+
+    assert page_sources == [f'<html>{URL}</html>' for URL in URLs]
+    # each driver serves a single page, then it is recycled
+    assert driver_pool.num_recycled_drivers == len(URLs)
+    assert len(browser_profile.drivers) == len(URLs)
+    assert all(driver.num_quits == 1 for driver in browser_profile.drivers)
@@ -0,0 +1,31 @@
+import time
+
+from dataextractiontools.work_queue import SQLiteWorkQueue
+
+
+def test_exhausted_tasks_do_not_hide_the_queued_tasks(tmp_path):
+    work_queue = SQLiteWorkQueue(tmp_path / 'queue.sqlite', lease_timeout=0.05, max_attempts=1)
+    work_queue.enqueue(['https://www.amazon.com/dp/B000000001/', 'https://www.amazon.com/dp/B000000002/'], 1)
+    # the lease of the first task expires on its last attempt, e.g. its worker crashed
+    assert [task['asin'] for task in work_queue.lease('crashed worker', 2)] == ['B000000001', 'B000000002']
+    time.sleep(0.1)
+    work_queue.enqueue(['https://www.amazon.com/dp/B000000003/'], 1)
+
+    tasks = work_queue.lease('worker', 1)
+
+    assert [task['asin'] for task in tasks] == ['B000000003']
+    assert work_queue.get_stats() == {'queued': 0, 'leased': 1, 'done': 0, 'failed': 2}
+    work_queue.close()
+
+
+def test_expired_lease_is_leased_again_until_the_maximum_attempts(tmp_path):
+    work_queue = SQLiteWorkQueue(tmp_path / 'queue.sqlite', lease_timeout=0.05, max_attempts=2)
+    work_queue.enqueue(['https://www.amazon.com/dp/B000000001/'], 1)
+
+    assert [task['attempt'] for task in work_queue.lease('worker', 1)] == [1]
+    time.sleep(0.1)
+    assert [task['attempt'] for task in work_queue.lease('worker', 1)] == [2]
+    time.sleep(0.1)
+    assert work_queue.lease('worker', 1) == []
+    assert work_queue.get_stats() == {'queued': 0, 'leased': 0, 'done': 0, 'failed': 1}
+    work_queue.close()
@@ -0,0 +1,67 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from dataextractiontools import worker
+from dataextractiontools.worker import MemoryBoundedWorker, get_descendant_pids, get_rss_mb
+
+
+pytestmark = pytest.mark.skipif(not Path('/proc/self/statm').exists() or not hasattr(os, 'killpg'), reason='requires /proc and process groups')
+
+# a stand-in for a browser process, which allocates memory and never exits on its own
+BROWSER_COMMAND = [sys.executable, '-c', 'import time; memory = bytearray(128 * 1024 * 1024); print("ready", flush=True); time.sleep(600)']
+
+
+def is_running(pid):
+    try:
+        with open(f'/proc/{pid}/stat') as fh:
+            # a zombie is dead, it is only waiting to be reaped
+            return fh.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except OSError:
+        return False
+
+
+def hanging_worker_process(args, connection):
+    """a worker process which starts a browser, then hangs and ignores SIGTERM"""
+
+    worker._start_process_group()
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    browser = subprocess.Popen(BROWSER_COMMAND, stdout=subprocess.PIPE)
+    browser.stdout.readline()
+    connection.send(browser.pid)
+    time.sleep(600)
+
+
+def test_rss_includes_the_descendant_processes():
+    rss_mb = get_rss_mb()
+    browser = subprocess.Popen(BROWSER_COMMAND, stdout=subprocess.PIPE)
+    try:
+        browser.stdout.readline()
+
+        assert browser.pid in get_descendant_pids(os.getpid())
+        assert get_rss_mb() - rss_mb >= 100
+    finally:
+        browser.kill()
+        browser.wait()
+
+
+def test_stop_kills_the_browser_processes_of_the_worker(make_args, monkeypatch):
+    monkeypatch.setattr(worker, '_run_worker_process', hanging_worker_process)
+    memory_bounded_worker = MemoryBoundedWorker(make_args('--worker-enabled'))
+
+    memory_bounded_worker._start()
+    assert memory_bounded_worker._connection.poll(60)
+    browser_pid = memory_bounded_worker._connection.recv()
+    assert is_running(browser_pid)
+
+    memory_bounded_worker._stop(timeout=1)
+
+    deadline = time.monotonic() + 5
+    while is_running(browser_pid) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not is_running(browser_pid)